@@ -0,0 +1,66 @@
+"""
+Benchmark of the import time of thermo modules, in fresh interpreters, as
+paid by CLI workers and serverless cold starts. Also lists the slowest
+modules each import pulls in (see `python -X importtime`).
+
+Run it with:
+    poetry run python benchmarks/import_time.py
+"""
+import argparse
+import subprocess
+import sys
+
+from prettytable import PrettyTable
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time of every module loaded by importing `module`
+    in a fresh interpreter, in microseconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--modules", nargs="+", default=["thermo.recommender", "thermo.serve"]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    table = PrettyTable(field_names=("Module", "Import (ms)", "Slowest imports"))
+    table.align["Slowest imports"] = "l"
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda times: times[module])
+        # slowest top-level packages, other than thermo itself
+        packages: dict[str, int] = {}
+        for name, time in best.items():
+            package = name.split(".")[0]
+            if package != "thermo":
+                packages[package] = max(packages.get(package, 0), time)
+        slowest = sorted(packages, key=packages.__getitem__, reverse=True)[: args.top]
+        table.add_row(
+            (
+                module,
+                f"{best[module] / 1e3:.1f}",
+                ", ".join(f"{name} ({packages[name] / 1e3:.1f})" for name in slowest),
+            )
+        )
+    print(table)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
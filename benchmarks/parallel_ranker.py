@@ -0,0 +1,100 @@
+"""
+Benchmark of FullRanker with and without a thread pool, for random
+buildings of increasing size.
+
+Run it with:
+    poetry run python benchmarks/parallel_ranker.py
+"""
+import argparse
+from functools import partial
+from timeit import repeat
+
+import numpy as np
+import scipy.sparse as sp
+from numpy.typing import NDArray
+from prettytable import PrettyTable
+
+from thermo.config import AMENITIES
+from thermo.costs import CostName, make_cost
+from thermo.ranker.full import FullRanker
+from thermo.utils.room import Room
+
+
+def random_building(
+    n_rooms: int, degree: float = 4.0, seed: int = 0
+) -> tuple[sp.csr_matrix, list[Room]]:
+    """Sparse random adjacency matrix and room descriptions."""
+    rng = np.random.default_rng(seed)
+    edges = rng.integers(0, n_rooms, size=(2, int(degree * n_rooms / 2)))
+    edges = edges[:, edges[0] != edges[1]]
+    A = sp.coo_matrix((np.ones(edges.shape[1]), edges), shape=(n_rooms, n_rooms))
+    A = ((A + A.T) > 0).astype(float)
+
+    rooms = [
+        Room(
+            name=f"Room {i}",
+            index=i,
+            capacity=int(rng.integers(5, 60)),
+            amenities=set(
+                rng.choice(AMENITIES, size=rng.integers(0, 4), replace=False)
+            ),
+        )
+        for i in range(n_rooms)
+    ]
+    return sp.csr_matrix(A), rooms
+
+
+def random_state(n_rooms: int, n_time_slots: int, seed: int = 0) -> NDArray:
+    """Random booking state with about 5% of the room-time slots booked."""
+    rng = np.random.default_rng(seed)
+    return (rng.random(n_rooms * n_time_slots) < 0.05).astype(float)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--time-slots", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    kwargs = {"n_time_slots": args.time_slots, "required_capacity": 20}
+    table = PrettyTable(
+        field_names=("Rooms", "Sequential (ms)", "Parallel (ms)", "Speedup")
+    )
+    for n_rooms in args.sizes:
+        adjacency, rooms = random_building(n_rooms)
+        costs = [
+            make_cost(name, adjacency=adjacency, room_descriptions=rooms)
+            for name in CostName.__args__
+        ]
+        # a batch of states, as in nightly what-if reports
+        state = np.stack([random_state(n_rooms, args.time_slots, s) for s in range(8)])
+
+        timings = []
+        for ranker in (
+            FullRanker(costs=costs),
+            FullRanker(costs=costs, max_workers=args.workers),
+        ):
+            try:
+                ranker.run(state, **kwargs)  # warm up caches
+                run = partial(ranker.run, state, **kwargs)
+                times = repeat(run, number=1, repeat=args.repeat)
+            finally:
+                ranker.close()
+            timings.append(1e3 * min(times))
+
+        sequential, parallel = timings
+        table.add_row(
+            (
+                n_rooms,
+                f"{sequential:.2f}",
+                f"{parallel:.2f}",
+                f"{sequential / parallel:.2f}x",
+            )
+        )
+    print(table)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from thermo.config import AMENITIES
+from thermo.costs import base
+from thermo.recommender import Recommender
+from thermo.utils import artifact, io
+
+
+@pytest.fixture
+def building_copy(tmp_path: Path, demo_building_name: str) -> Path:
+    """Copy of the config files of the demo building"""
+    building_path = io.get_building_path(demo_building_name)
+    copy_path = tmp_path / demo_building_name
+    copy_path.mkdir()
+    for file_name in artifact.SOURCE_FILES:
+        (copy_path / file_name).write_bytes((building_path / file_name).read_bytes())
+    yield copy_path
+
+
+def test_round_trip(building_copy: Path) -> None:
+    """Tests that a compiled building is loaded back as the building of
+    its config files, with the lookup tables of its costs."""
+    assert artifact.load_compiled(building_copy) is None
+    path = artifact.compile_building(building_copy)
+    assert path.stat().st_size % artifact.ALIGNMENT == 0
+
+    expected = io.load_building(building_copy)
+    compiled = artifact.load_compiled(building_copy)
+    assert compiled is not None
+    building, tables = compiled
+    assert np.array_equal(building.adjacency.toarray(), expected.adjacency)
+    assert building.room_descriptions == expected.room_descriptions
+    for attr in ("name", "municipality", "ranker", "costs"):
+        assert getattr(building, attr) == getattr(expected, attr)
+    assert set(tables) == {"CapacityCost", "AmenityCost"}
+    assert not tables["CapacityCost"].flags.writeable
+
+
+def test_stale_artifact(building_copy: Path) -> None:
+    """Tests that artifacts of previous config files or format versions
+    are not loaded."""
+    path = artifact.compile_building(building_copy)
+    with (building_copy / "config.yaml").open("a") as config:
+        config.write("\n# a change in the config\n")
+    assert artifact.load_compiled(building_copy) is None
+
+    artifact.compile_building(building_copy)
+    assert artifact.load_compiled(building_copy) is not None
+    path.write_bytes(
+        path.read_bytes().replace(b'"format_version": 1', b'"format_version": 0')
+    )
+    assert artifact.load_compiled(building_copy) is None
+
+
+def test_stale_tables(building_copy: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tests that artifacts whose cost tables were built by another version
+    of the costs, or for other amenities, are not loaded."""
+    artifact.compile_building(building_copy)
+    monkeypatch.setattr(base, "TABLES_VERSION", base.TABLES_VERSION + 1)
+    assert artifact.load_compiled(building_copy) is None
+    monkeypatch.undo()
+    assert artifact.load_compiled(building_copy) is not None
+    monkeypatch.setattr(base, "AMENITIES", AMENITIES + ("sauna",))
+    assert artifact.load_compiled(building_copy) is None
+
+
+def test_from_config(building_copy: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tests that recommenders of compiled buildings rank as those of the
+    config files."""
+    monkeypatch.setattr(io, "BUILDINGS_DIR", building_copy.parent)
+    n_rooms = 10
+    state = np.zeros(8 * n_rooms)
+    state[[3, 14, 25]] = 1
+
+    expected = Recommender.from_config(building_copy.name)
+    artifact.compile_building(building_copy)
+    recommender = Recommender.from_config(building_copy.name)
+    assert not isinstance(recommender.building.adjacency, np.ndarray)
+    for kwargs in ({"required_capacity": 10}, {"required_amenities": {"screen"}}):
+        assert np.allclose(
+            recommender.ranker.run(state, n_time_slots=8, **kwargs),
+            expected.ranker.run(state, n_time_slots=8, **kwargs),
+        )
@@ -5,6 +5,8 @@ import numpy as np
 import pytest
 from numpy.typing import NDArray
 
+from thermo.config import AMENITIES
+from thermo.costs import base
 from thermo.utils import io
 from thermo.utils.building import Building
 
@@ -71,3 +73,102 @@ def test_load_building(demo_building_name: Generator[str, None, None]) -> None:
     building_path = io.get_building_path(demo_building_name)
     building = io.load_building(building_path)
     assert isinstance(building, Building)
+
+
+def test_cost_tables(tmp_path: Path, demo_building_name: str) -> None:
+    """Tests that persisted cost tables are only loaded back for the
+    building config they were built for."""
+    building_path = io.get_building_path(demo_building_name)
+    for file_name in ("specifications.yaml", "config.yaml"):
+        (tmp_path / file_name).write_bytes((building_path / file_name).read_bytes())
+
+    assert io.load_cost_tables(tmp_path) == {}
+    io.save_cost_tables(tmp_path, {"CapacityCost": np.ones((3, 10))})
+    tables = io.load_cost_tables(tmp_path)
+    assert np.allclose(tables["CapacityCost"], 1)
+
+    with (tmp_path / "config.yaml").open("a") as config:
+        config.write("\n# a change in the config\n")
+    assert io.load_cost_tables(tmp_path) == {}
+
+
+def test_cost_tables_version(
+    tmp_path: Path, demo_building_name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tests that persisted cost tables are ignored after a change in how
+    they are built, or in the amenity vocabulary."""
+    building_path = io.get_building_path(demo_building_name)
+    for file_name in ("specifications.yaml", "config.yaml"):
+        (tmp_path / file_name).write_bytes((building_path / file_name).read_bytes())
+    io.save_cost_tables(tmp_path, {"CapacityCost": np.ones((3, 10))})
+    assert io.load_cost_tables(tmp_path)
+
+    monkeypatch.setattr(base, "AMENITIES", AMENITIES + ("sauna",))
+    assert io.load_cost_tables(tmp_path) == {}
+    monkeypatch.setattr(base, "AMENITIES", AMENITIES)
+    monkeypatch.setattr(base, "TABLES_VERSION", base.TABLES_VERSION + 1)
+    assert io.load_cost_tables(tmp_path) == {}
+
+
+def _copy_building(building_path: Path, copy_path: Path) -> Path:
+    copy_path.mkdir()
+    for file_name in ("adjacency.npy", "specifications.yaml", "config.yaml"):
+        (copy_path / file_name).write_bytes((building_path / file_name).read_bytes())
+    return copy_path
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_load_buildings(
+    tmp_path: Path, demo_building_name: str, processes: bool
+) -> None:
+    """Tests that buildings are loaded and validated concurrently, and that
+    the validation results are cached by content."""
+    building_path = io.get_building_path(demo_building_name)
+    valid = _copy_building(building_path, tmp_path / "valid")
+    invalid = _copy_building(building_path, tmp_path / "invalid")
+    adjacency = np.load(invalid / "adjacency.npy")
+    adjacency[0, 0] = 1
+    np.save(invalid / "adjacency.npy", adjacency)
+    cache_dir = tmp_path / "cache"
+
+    for cached in (False, True):
+        buildings, reports = io.load_buildings(
+            [valid, invalid], max_workers=2, processes=processes, cache_dir=cache_dir
+        )
+        assert len(buildings) == 2
+        assert [report.cached for report in reports] == [cached, cached]
+        assert reports[0].errors == ()
+        assert reports[1].errors == ("The graph includes self-interactions.",)
+        assert all(report.load_time > 0 for report in reports)
+
+
+def test_load_all_buildings(
+    tmp_path: Path, demo_building_name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tests that invalid buildings are reported when validated."""
+    building_path = io.get_building_path(demo_building_name)
+    (tmp_path / "buildings").mkdir()
+    invalid = _copy_building(building_path, tmp_path / "buildings" / "invalid")
+    np.save(invalid / "adjacency.npy", np.ones((10, 9)))
+    monkeypatch.setattr(io, "BUILDINGS_DIR", tmp_path / "buildings")
+
+    assert len(io.load_all_buildings()) == 1
+    with pytest.raises(ValueError, match="invalid.*not square"):
+        io.load_all_buildings(validate=True, cache_dir=tmp_path / "cache")
+
+
+def test_validation_version(
+    tmp_path: Path, demo_building_name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tests that results cached by another version of the checks are not
+    reused."""
+    building_path = io.get_building_path(demo_building_name)
+    cache_dir = tmp_path / "cache"
+    _, (report,) = io.load_buildings([building_path], cache_dir=cache_dir)
+    assert not report.cached
+
+    monkeypatch.setattr(io, "VALIDATION_VERSION", io.VALIDATION_VERSION + 1)
+    _, (report,) = io.load_buildings([building_path], cache_dir=cache_dir)
+    assert not report.cached
+    _, (report,) = io.load_buildings([building_path], cache_dir=cache_dir)
+    assert report.cached
@@ -0,0 +1,150 @@
+import json
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+
+from thermo.adapter.bulk import (
+    HOURS,
+    ByteBudgetError,
+    RequestError,
+    get_states,
+    parse_bookings,
+)
+from thermo.utils.time import get_time_slots
+
+ROOMS = ["Room A", "Room B", "Room C"]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the booking report of a day, failing the first request of
+    the days in `server.flaky`"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        server = self.server
+        with server.lock:
+            server.clients.add(self.client_address)
+            server.requests.append(params)
+            fail = params["day"] in server.flaky
+            server.flaky.discard(params["day"])
+        if fail or params.get("gruppe") != "30":
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        day = date.fromisoformat(params["day"])
+        bookings = [
+            {"room": "Room B", "start": "15:00", "end": "16:30"},
+            {"room": "Room Z", "start": "08:00", "end": "09:00"},
+        ]
+        if day.day % 2:
+            bookings.append({"room": "Room A", "start": "08:00", "end": "09:00"})
+        body = json.dumps({"day": params["day"], "bookings": bookings}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.clients, server.requests, server.flaky = set(), [], set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    server.url = f"http://{host}:{port}/report?gruppe=30&type=json"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_bookings():
+    report = {
+        "bookings": [
+            {"room": "Room C", "start": "07:00", "end": "08:15"},
+            {"room": "Room A", "start": "22:00", "end": "23:00"},
+            {"room": "Room D", "start": "10:00", "end": "11:00"},
+        ]
+    }
+    state = parse_bookings(report, ROOMS)
+    assert state.shape == (len(HOURS), 3)
+    assert np.flatnonzero(state[:, 2]).tolist() == [0]
+    assert np.flatnonzero(state[:, 0]).tolist() == [len(HOURS) - 1]
+    assert state.sum() == 2
+
+
+def test_parse_bookings_outside_hours():
+    """Bookings entirely before or after the hours of the grid book
+    nothing."""
+    report = {
+        "bookings": [
+            {"room": "Room A", "start": "06:00", "end": "07:00"},
+            {"room": "Room B", "start": f"{HOURS[-1] + 1}:00", "end": "23:59"},
+            {"room": "Room C", "start": "03:00", "end": f"{HOURS[0]}:00"},
+        ]
+    }
+    assert parse_bookings(report, ROOMS).sum() == 0
+
+
+def test_get_states(stub_server):
+    start = date(2023, 4, 17)
+    stub_server.flaky = {"2023-04-19"}
+    states = get_states(
+        "demo_school",
+        start,
+        start + timedelta(days=13),
+        url=stub_server.url,
+        room_names=ROOMS,
+        max_workers=4,
+        backoff=0.01,
+    )
+    assert states.shape == (14, len(HOURS), 3)
+    # one retried request, over at most max_workers persistent connections
+    assert len(stub_server.requests) == 15
+    assert len(stub_server.clients) <= 4
+    assert {r["building"] for r in stub_server.requests} == {"demo_school"}
+
+    for i, state in enumerate(states):
+        day = start + timedelta(days=i)
+        assert state[HOURS.index(15), 1] == state[HOURS.index(16), 1] == 1
+        assert state[0, 0] == day.day % 2
+        assert state.sum() == 2 + day.day % 2
+        # the flat state of the day only has its own time slots
+        flat = state[-get_time_slots(day) :].flatten()
+        assert flat.size == get_time_slots(day) * 3
+
+
+def test_get_states_errors(stub_server):
+    day = date(2023, 4, 17)
+    kwargs = {"room_names": ROOMS, "backoff": 0.01}
+    with pytest.raises(ByteBudgetError):
+        get_states(
+            "demo_school",
+            day,
+            day + timedelta(days=6),
+            stub_server.url,
+            max_bytes=500,
+            **kwargs,
+        )
+
+    url = stub_server.url.replace("gruppe=30", "gruppe=31")
+    with pytest.raises(RequestError, match="HTTP 503"):
+        get_states("demo_school", day, day, url, retries=2, **kwargs)
+    assert len(stub_server.requests) >= 3
+
+    assert get_states(
+        "demo_school", day, day - timedelta(days=1), stub_server.url, **kwargs
+    ).shape == (0, len(HOURS), 3)
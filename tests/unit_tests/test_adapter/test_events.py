@@ -0,0 +1,127 @@
+from datetime import date
+from threading import Event, Thread
+
+import numpy as np
+import pytest
+
+from thermo.adapter.cache import StateCache
+from thermo.adapter.events import BookingEvent, BookingLedger, write_events
+from thermo.recommender import Recommender
+
+DAY = date(2023, 4, 20)  # a school day, with 8 time slots
+
+
+def event(action="create", room=3, slot=2, duration=2, day=DAY):
+    return BookingEvent(action, "demo_school", day, room, slot, duration)
+
+
+def test_apply_events():
+    ledger = BookingLedger({"demo_school": 10})
+    changes = []
+    ledger.subscribe(lambda *args: changes.append(args))
+
+    assert ledger.apply(event()).tolist() == [23, 33]
+    # already booked cells do not change
+    assert ledger.apply(event(slot=3, duration=3)).tolist() == [43, 53]
+    assert ledger.apply(event("cancel", duration=1)).tolist() == [23]
+    # bookings past the end of the day are cut
+    assert ledger.apply(event(room=0, slot=7, duration=4)).tolist() == [70]
+    assert ledger.apply(event("cancel", room=5)).size == 0
+
+    state = ledger.state("demo_school", DAY)
+    assert state.shape == (80,)
+    assert np.flatnonzero(state).tolist() == [33, 43, 53, 70]
+    assert len(changes) == 4
+    building, day, changed, values = changes[2]
+    assert (building, day, changed.tolist(), values.tolist()) == (
+        "demo_school",
+        DAY,
+        [23],
+        [0.0],
+    )
+    assert ledger.n_events == 5
+
+
+def test_replay_and_snapshots(tmp_path):
+    events = [event(room=r, slot=r % 8) for r in range(10)] + [
+        event("cancel", room=4, slot=4),
+        event(room=1, day=date(2023, 4, 22)),
+    ]
+    path = tmp_path / "events.jsonl"
+    write_events(path, events)
+
+    ledger = BookingLedger({"demo_school": 10}, snapshot_dir=tmp_path, snapshot_every=5)
+    assert ledger.replay(path) == 12
+    expected = {
+        day: ledger.state("demo_school", day) for day in [DAY, date(2023, 4, 22)]
+    }
+
+    # resumes from the snapshot after 10 events, and replays the rest
+    resumed = BookingLedger({"demo_school": 10}, snapshot_dir=tmp_path)
+    assert resumed.n_events == 10
+    assert resumed.replay(path) == 2
+    for day, state in expected.items():
+        assert np.array_equal(resumed.state("demo_school", day), state)
+    assert ledger.state("demo_school", date(2023, 4, 22)).shape == (150,)
+
+
+def test_initial_state():
+    initial = np.zeros(80)
+    initial[[3, 13]] = 1
+    ledger = BookingLedger({"demo_school": 10}, initial_state=lambda b, d: initial)
+    assert ledger.apply(event("cancel", room=3, slot=0, duration=2)).tolist() == [3, 13]
+    assert not ledger.state("demo_school", DAY).any()
+
+
+def test_initial_state_outside_lock():
+    """Fetching the initial state of a day does not block the other days"""
+    fetching, fetched = Event(), Event()
+
+    def initial_state(building, day):
+        if day == DAY:
+            fetching.set()
+            assert fetched.wait(timeout=5)
+        return np.zeros(80)
+
+    ledger = BookingLedger({"demo_school": 10}, initial_state=initial_state)
+    thread = Thread(target=ledger.apply, args=(event(),))
+    thread.start()
+    assert fetching.wait(timeout=5)
+    other_day = date(2023, 4, 21)
+    assert ledger.apply(event(day=other_day)).tolist() == [23, 33]
+    fetched.set()
+    thread.join()
+    assert ledger.state("demo_school", DAY).sum() == 2
+    assert ledger.state("demo_school", other_day).sum() == 2
+
+
+def test_notify_recommender():
+    """The changed cells update the state cache and the recommendations"""
+    ledger = BookingLedger({"demo_school": 10})
+    cache = StateCache(fetch=ledger.state)
+    recommender = Recommender.from_config("demo_school", state_cache=cache)
+    recommender.watch(ledger)
+    held = recommender.hold(DAY, required_capacity=5)
+    assert recommender.hold(DAY, required_capacity=5) is held
+    version = cache.version("demo_school", DAY)
+
+    ledger.apply(event(room=1, slot=0, duration=3))
+    ledger.apply(event("cancel", room=1, slot=2))
+    ledger.apply(event(day=date(2023, 4, 21)))
+    cache.close()
+
+    assert cache.version("demo_school", DAY) > version
+    assert np.array_equal(
+        cache.get("demo_school", DAY).state, ledger.state("demo_school", DAY)
+    )
+    assert cache.version("demo_school", date(2023, 4, 21)) is None
+    updated = recommender.hold(DAY, required_capacity=5)
+    expected = recommender.run(DAY, required_capacity=5)
+    assert np.array_equal(updated.state, expected.state)
+    assert np.allclose(updated.costs, expected.costs)
+
+    recommender.release(DAY)
+    assert recommender.hold(DAY, required_capacity=5) is not updated
+
+    with pytest.raises(ValueError):
+        Recommender.from_config("demo_school").watch(ledger)
@@ -0,0 +1,168 @@
+import threading
+from datetime import date
+
+import numpy as np
+import pytest
+
+from thermo.adapter.cache import StateCache
+from thermo.recommender import Recommender
+
+
+class FakeAPI:
+    """Booking API whose states and response delays are set by the test"""
+
+    def __init__(self):
+        self.states: dict[date, np.ndarray] = {}
+        self.calls = 0
+        self.fail = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, building: str, day: date) -> np.ndarray:
+        self.release.wait(timeout=5)
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("API down")
+        return self.states.setdefault(day, np.zeros(80))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def api() -> FakeAPI:
+    return FakeAPI()
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+def test_hits_and_misses(api, clock):
+    cache = StateCache(api, ttl=10, clock=clock)
+    day = date(2023, 4, 20)
+    first = cache.get("demo_school", day)
+    assert cache.get("demo_school", day) is first
+    assert first.booking.shape == (8, 10)
+    cache.get("strandskolen", day)
+    assert cache.version("demo_school", date(2023, 4, 21)) is None
+
+    assert api.calls == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    cache.close()
+
+
+def test_stale_while_revalidate(api, clock):
+    cache = StateCache(api, ttl=10, clock=clock)
+    day = date(2023, 4, 20)
+    first = cache.get("demo_school", day)
+
+    # the state changes in the API and the cached one becomes stale
+    api.states[day] = np.ones(80)
+    api.release.clear()
+    clock.now = 11
+    stale = cache.get("demo_school", day)
+    assert stale is first
+    assert cache.get("demo_school", day) is first  # refreshed only once
+    api.release.set()
+    cache.close()
+
+    fresh = cache.get("demo_school", day)
+    assert np.array_equal(fresh.state, np.ones(80))
+    assert fresh.version > first.version
+    assert cache.stats()["stale_hits"] == 2
+    assert cache.stats()["refreshes"] == 1
+    assert api.calls == 2
+
+
+def test_refresh_after_put(api, clock):
+    """A revalidation started before a `put` does not overwrite the state
+    it stored."""
+    cache = StateCache(api, ttl=10, clock=clock)
+    day = date(2023, 4, 20)
+    cache.get("demo_school", day)
+
+    api.release.clear()
+    clock.now = 11
+    cache.get("demo_school", day)  # starts a revalidation, blocked in the API
+    booked = np.zeros(80)
+    booked[4] = 1
+    current = cache.put("demo_school", day, booked)
+    api.release.set()
+    cache.close()
+
+    assert cache.stats()["refreshes"] == 1
+    assert cache.version("demo_school", day) == current.version
+    assert np.array_equal(cache.get("demo_school", day).state, booked)
+
+
+def test_versions(api, clock):
+    cache = StateCache(api, ttl=10, clock=clock)
+    day = date(2023, 4, 20)
+    first = cache.get("demo_school", day)
+
+    # an unchanged state keeps its version, a changed one gets a new one
+    assert cache.put("demo_school", day, np.zeros(80)).version == first.version
+    booked = np.zeros(80)
+    booked[4] = 1
+    second = cache.put("demo_school", day, booked)
+    other = cache.put("strandskolen", day, booked)
+    assert first.version < second.version < other.version
+    assert cache.version("demo_school", day) == second.version
+
+    cache.invalidate("demo_school", day)
+    assert cache.version("demo_school", day) is None
+    cache.close()
+
+
+def test_patch(api, clock):
+    cache = StateCache(api, ttl=10, clock=clock)
+    day = date(2023, 4, 20)
+    assert cache.patch("demo_school", day, [4], [1]) is None
+    first = cache.get("demo_school", day)
+
+    patched = cache.patch("demo_school", day, np.array([4, 14, 15]), np.ones(3))
+    assert patched.version > first.version
+    assert np.flatnonzero(patched.state).tolist() == [4, 14, 15]
+    assert not first.state.any()
+    cancelled = cache.patch("demo_school", day, np.array([14]), np.zeros(1))
+    assert np.flatnonzero(cancelled.state).tolist() == [4, 15]
+    assert cache.get("demo_school", day) is cancelled
+    assert api.calls == 1
+    cache.close()
+
+
+def test_refresh_errors(api, clock):
+    cache = StateCache(api, ttl=10, clock=clock, max_entries=1)
+    day = date(2023, 4, 20)
+    first = cache.get("demo_school", day)
+    api.fail = True
+    clock.now = 11
+    assert cache.get("demo_school", day) is first
+    cache.close()
+    assert cache.stats()["refresh_errors"] == 1
+
+    api.fail = False
+    cache.get("demo_school", date(2023, 4, 21))
+    assert cache.stats()["size"] == 1
+
+
+def test_recommender_state_cache():
+    cache = StateCache(ttl=60)
+    recommender = Recommender.from_config("demo_school", state_cache=cache)
+    day = date(2023, 4, 20)
+    recommendation = recommender.run(day)
+    recommender.run(day)
+    cache.close()
+
+    assert np.array_equal(recommendation.state, cache.get("demo_school", day).state)
+    assert cache.stats()["misses"] == 1
+    expected = Recommender.from_config("demo_school").run(day)
+    assert np.array_equal(recommendation.costs, expected.costs)
@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from thermo.adapter.bulk import HOURS
+from thermo.adapter.state_connection import get_state
+from thermo.adapter.store import AvailabilityStore
+from thermo.utils.time import get_time_slots
+
+START = date(2023, 5, 1)  # a Monday
+
+
+@pytest.fixture
+def store(demo_building):
+    store = AvailabilityStore()
+    store.add_building(demo_building)
+    yield store
+    store.close()
+
+
+def test_put_and_get_state(store):
+    days = [START + timedelta(days=i) for i in range(7)]
+    for day in days:
+        store.put_state("demo_school", day, get_state(day))
+
+    for day in days:
+        assert np.array_equal(store.get_state("demo_school", day), get_state(day))
+    # replacing a day removes its previous bookings
+    store.put_state("demo_school", days[0], np.zeros(80))
+    assert not store.get_state("demo_school", days[0]).any()
+
+    states = store.get_states("demo_school", days[1], days[-1])
+    assert states.shape == (6, len(HOURS), 10)
+    for day, state in zip(days[1:], states):
+        n_slots = get_time_slots(day)
+        assert np.array_equal(state[-n_slots:].flatten(), get_state(day))
+        assert not state[:-n_slots].any()
+
+    with pytest.raises(KeyError):
+        store.get_state("unknown", START)
+
+
+def test_upsert(store):
+    store.upsert("demo_school", [(START, 0, 1, True), (START, 2, 3, True)])
+    store.upsert("demo_school", [(START, 0, 1, False), (START, 4, 5, True)])
+    state = store.get_state("demo_school", START)
+    assert np.flatnonzero(state).tolist() == [23, 45]
+
+
+def test_find_rooms(store):
+    assert store.find_rooms("demo_school", 30, {"projector"}) == [0, 3]
+    assert store.find_rooms("demo_school", amenities=["screen", "whiteboard"]) == [6, 8]
+    assert len(store.find_rooms("demo_school")) == 10
+    assert store.find_rooms("demo_school", 31) == []
+
+
+def test_free_rooms(store):
+    """Rooms for 30 people with a projector, free 17:00-19:00 on Tuesdays"""
+    tuesdays = [START + timedelta(days=1 + 7 * i) for i in range(5)]
+    # Room A (0) is booked on the first Tuesday at 18:00, on a school day
+    # schedule starting at 15:00, and Room D (3) on the second one at 20:00
+    store.upsert(
+        "demo_school",
+        [(tuesdays[0], 18 - 15, 0, True), (tuesdays[1], 20 - 15, 3, True)],
+    )
+
+    free = store.free_rooms(
+        "demo_school",
+        START,
+        START + timedelta(days=30),
+        hours=range(17, 19),
+        min_capacity=30,
+        amenities={"projector"},
+        weekdays={1},
+    )
+    assert list(free) == tuesdays
+    assert free[tuesdays[0]] == ["Room D"]
+    assert free[tuesdays[1]] == ["Room A", "Room D"]
+
+    # on school days, the schedule starts at 15:00
+    morning = store.free_rooms("demo_school", START, START, hours=range(9, 11))
+    assert morning == {}
+    holiday = date(2023, 5, 18)  # Ascension day
+    free = store.free_rooms("demo_school", holiday, holiday, range(9, 11))
+    assert len(free[holiday]) == 10
+
+
+@pytest.mark.parametrize(
+    "hours, message",
+    [(range(17, 17), "No hours"), (range(6, 9), r"\[6, 7\] are outside")],
+)
+def test_free_rooms_hours(store, hours, message):
+    with pytest.raises(ValueError, match=message):
+        store.free_rooms("demo_school", START, START, hours=hours)
+
+
+def test_persistence(tmp_path, demo_building):
+    path = tmp_path / "bookings.sqlite"
+    store = AvailabilityStore(path)
+    store.add_building(demo_building)
+    store.put_state("demo_school", START, get_state(START))
+    store.close()
+
+    reopened = AvailabilityStore(path)
+    assert np.array_equal(reopened.get_state("demo_school", START), get_state(START))
+    reopened.close()
+
+
+def test_get_bookings(store):
+    days = [START + timedelta(days=i) for i in range(7)]
+    for day in days:
+        store.put_state("demo_school", day, get_state(day))
+
+    bookings = store.get_bookings("demo_school", days[0], days[-1])
+    for day, booking in zip(days, bookings):
+        assert booking.shape == (get_time_slots(day), 10)
+        assert np.array_equal(booking.to_vector(), get_state(day))
@@ -56,3 +56,19 @@ def test_homogenity(
         .reshape(timeslots, -1)
     )
     assert np.unique(costs, axis=0).shape == (1, len(demo_rooms))
+
+
+def test_unknown_amenities(timeslots: Generator[int, None, None]) -> None:
+    """Amenities outside config.AMENITIES are still taken into account."""
+    rooms = [Room(name="A", amenities={"piano"}), Room(name="B", amenities={"screen"})]
+    model = AmenityCost(rooms, amenity_utilization_coeff=0.5)
+    state = np.zeros(2 * timeslots)
+
+    costs = model.run(state, n_time_slots=timeslots, required_amenities={"piano"})
+    assert np.allclose(costs.reshape(timeslots, -1), [[0.0, 1e5]] * timeslots)
+
+    costs = model.run(state, n_time_slots=timeslots)
+    assert np.allclose(costs.reshape(timeslots, -1), [[0.5, 0.5]] * timeslots)
+
+    costs = model.run(state, n_time_slots=timeslots, required_amenities={"sofa"})
+    assert np.allclose(costs, 1e5)
@@ -1,9 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pytest
 from numpy.typing import NDArray
 
 from thermo.config import UNAVAILABLE_COST
 from thermo.costs import CostModel, CostName, make_cost
+from thermo.costs.base import expand_factor
 from thermo.utils.room import Room
 
 
@@ -67,3 +70,95 @@ def test_unavailable_cost(
         required_amenities={"whiteboard"},  # trigger unavailable cost for amenities
     )
     assert np.allclose(result[np.argwhere(result > T)], UNAVAILABLE_COST, atol=1e-10)
+
+
+@pytest.mark.parametrize(
+    "changed_indices, new_values",
+    [([4], [1]), ([2, 14], [0, 1]), ([4, 4], [1, 1]), ([4, 14, 4], [1, 1, 0])],
+)
+def test_apply_delta(
+    cost: CostModel,
+    demo_state: NDArray,
+    changed_indices: list[int],
+    new_values: list[int],
+) -> None:
+    """Checks that patching the costs after a change in the state gives
+    the same costs as running the cost model on the new state."""
+    kwargs = {"n_time_slots": 3, "required_capacity": 20}
+    new_state = demo_state.copy()
+    new_state[changed_indices] = new_values
+
+    result = cost.apply_delta(
+        cost.run(demo_state, **kwargs),
+        changed_indices=np.array(changed_indices),
+        new_values=np.array(new_values),
+        state=demo_state,
+        **kwargs,
+    )
+    assert np.allclose(result, cost.run(new_state, **kwargs))
+
+
+def test_batched_costs(cost: CostModel, demo_state: NDArray) -> None:
+    """Checks that running a cost on a batch of states gives the same
+    costs as running it on each state."""
+    kwargs = {"n_time_slots": 3, "required_capacity": 20}
+    states = np.stack([demo_state, np.zeros_like(demo_state), 1 - demo_state])
+
+    result = cost.run(states, **kwargs)
+    assert result.shape == states.shape
+    for state, costs in zip(states, result):
+        assert np.allclose(costs, cost.run(state, **kwargs))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"required_capacity": 0},
+        {"required_capacity": 15, "required_amenities": {"whiteboard"}},
+        {"required_capacity": 31, "required_amenities": {"screen", "projector"}},
+        {"required_capacity": 12.5, "required_amenities": {"instruments"}},
+    ],
+)
+def test_precompute(cost: CostModel, demo_state: NDArray, kwargs: dict) -> None:
+    """Checks that the lookup tables give the same costs as computing them."""
+    expected = cost.run(demo_state, n_time_slots=3, **kwargs)
+    table = cost.precompute()
+    assert cost.precompute(table) is table
+    assert np.allclose(cost.run(demo_state, n_time_slots=3, **kwargs), expected)
+
+
+def test_run_factor(cost: CostModel, demo_state: NDArray) -> None:
+    """Checks that the factorized costs expand to the output of run."""
+    kwargs = {"n_time_slots": 3, "required_capacity": 15}
+    costs = cost.run_factor(demo_state, **kwargs)
+    if cost.factor == "room":
+        assert costs.shape == (10,)
+    expanded = expand_factor(costs, cost.factor, demo_state, n_time_slots=3)
+    assert np.allclose(expanded, cost.run(demo_state, **kwargs))
+
+
+def test_concurrent_runs(cost: CostModel, demo_state: NDArray) -> None:
+    """Checks that a shared cost model gives the same costs when it is run
+    from several threads at once, with different states and numbers of
+    time slots."""
+    n_rooms = 10
+    calls = [
+        (state, n_time_slots, required_capacity)
+        for n_time_slots, state in [
+            (3, demo_state),
+            (2, demo_state[: 2 * n_rooms]),
+            (4, np.concatenate([demo_state, np.ones(n_rooms)])),
+        ]
+        for required_capacity in [0, 15, 31]
+    ] * 20
+
+    def run(call: tuple[NDArray, int, int]) -> NDArray:
+        state, n_time_slots, required_capacity = call
+        return cost.run(
+            state, n_time_slots=n_time_slots, required_capacity=required_capacity
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(run, calls))
+    for call, result in zip(calls, results):
+        assert np.array_equal(result, run(call))
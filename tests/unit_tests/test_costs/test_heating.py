@@ -1,5 +1,10 @@
+import threading
+
 import numpy as np
+import pytest
+import scipy.sparse as sp
 
+from thermo.config import MATRIX_FREE_MIN_ROOMS
 from thermo.costs.heating import HeatingCost
 
 
@@ -15,3 +20,108 @@ def test_heating(demo_graph, timeslots, demo_state):
     assert np.allclose(
         model.run(demo_state, n_time_slots=timeslots).reshape(timeslots, -1), expected
     )
+
+
+def test_matrix_free_heating(demo_graph, timeslots, demo_state):
+    """The matrix-free operator gives the same costs as the full graph."""
+    full = HeatingCost(adjacency=demo_graph, t_weight=0.7, matrix_free=False)
+    matrix_free = HeatingCost(adjacency=demo_graph, t_weight=0.7, matrix_free=True)
+    assert np.allclose(
+        matrix_free.run(demo_state, n_time_slots=timeslots),
+        full.run(demo_state, n_time_slots=timeslots),
+    )
+
+
+def test_matrix_free_default():
+    """Large buildings default to the matrix-free operator."""
+    assert not HeatingCost(adjacency=np.zeros((10, 10))).matrix_free
+    assert HeatingCost(adjacency=sp.identity(MATRIX_FREE_MIN_ROOMS)).matrix_free
+
+
+def test_matrix_free_heating_batch(demo_graph, timeslots, demo_state):
+    states = np.stack([demo_state, 1 - demo_state])
+    full = HeatingCost(adjacency=demo_graph, matrix_free=False)
+    matrix_free = HeatingCost(adjacency=demo_graph, matrix_free=True)
+    assert np.allclose(
+        matrix_free.run(states, n_time_slots=timeslots),
+        full.run(states, n_time_slots=timeslots),
+    )
+
+
+@pytest.mark.parametrize("matrix_free", [True, False])
+def test_heating_masked(demo_graph, timeslots, demo_state, matrix_free):
+    model = HeatingCost(adjacency=demo_graph, matrix_free=matrix_free)
+    mask = np.zeros(demo_state.shape, dtype=bool)
+    mask[[1, 2, 13, 29]] = True
+    costs = model.run(demo_state, n_time_slots=timeslots)
+    assert np.allclose(
+        model.run_masked(demo_state, mask, n_time_slots=timeslots), costs[mask]
+    )
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+@pytest.mark.parametrize("matrix_free", [True, False])
+def test_heating_components(
+    demo_graph, timeslots, demo_state, matrix_free, max_workers
+):
+    """A building of two disconnected copies of the demo graph costs the
+    same as each copy on its own."""
+    n_rooms = demo_graph.shape[0]
+    graph = sp.block_diag([demo_graph, demo_graph])
+    model = HeatingCost(
+        adjacency=graph,
+        matrix_free=matrix_free,
+        max_workers=max_workers,
+        min_component_rooms=1,
+    )
+    try:
+        assert model.components is not None
+        assert [c.tolist() for c in model.components] == [
+            list(range(n_rooms)),
+            list(range(n_rooms, 2 * n_rooms)),
+        ]
+
+        other_state = 1 - demo_state
+        states = np.stack([demo_state, other_state])
+        state = np.concatenate(
+            [s.reshape(timeslots, -1) for s in states], axis=1
+        ).flatten()
+        single = HeatingCost(adjacency=demo_graph, matrix_free=matrix_free)
+        expected = np.concatenate(
+            [
+                single.run(s, n_time_slots=timeslots).reshape(timeslots, -1)
+                for s in states
+            ],
+            axis=1,
+        ).flatten()
+        assert np.allclose(model.run(state, n_time_slots=timeslots), expected)
+
+        batch = np.stack([state, state[::-1]])
+        assert np.allclose(
+            model.run(batch, n_time_slots=timeslots),
+            HeatingCost(
+                adjacency=graph,
+                matrix_free=matrix_free,
+                min_component_rooms=2 * n_rooms,
+            ).run(batch, n_time_slots=timeslots),
+        )
+    finally:
+        model.close()
+
+
+def test_small_components():
+    """Components smaller than `min_component_rooms` are grouped together."""
+    assert HeatingCost(adjacency=np.zeros((10, 10))).components is None
+    graph = sp.block_diag([np.ones((3, 3)) - np.eye(3), np.zeros((2, 2))])
+    model = HeatingCost(adjacency=graph, min_component_rooms=3)
+    assert [c.tolist() for c in model.components] == [[0, 1, 2], [3, 4]]
+
+
+def test_heating_close(demo_graph, timeslots, demo_state):
+    """The threads evaluating the components stop on close."""
+    graph = sp.block_diag([demo_graph, demo_graph])
+    model = HeatingCost(adjacency=graph, max_workers=2, min_component_rooms=1)
+    model.run(np.tile(demo_state, 2), n_time_slots=timeslots)
+    assert any(t.name.startswith("heating") for t in threading.enumerate())
+    model.close()
+    assert not any(t.name.startswith("heating") for t in threading.enumerate())
@@ -1,4 +1,5 @@
 import numpy as np
+import scipy.sparse as sp
 
 from thermo.graph import adjacency
 
@@ -43,3 +44,53 @@ def test_is_not_connected():
     # two separate buildings with two rooms each.
     A = np.array([[0, 1, 0, 0], [1, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]])
     assert not adjacency.is_connected(A)
+
+
+def test_sparse_checks(demo_graph):
+    A = sp.csr_matrix(demo_graph)
+    assert adjacency.is_symmetric(A)
+    assert adjacency.no_self_interactions(A)
+    assert adjacency.is_connected(A)
+    assert np.all(adjacency.get_degree_vector(A) == demo_graph.sum(axis=1))
+    L = adjacency.get_laplacian(A)
+    assert sp.issparse(L)
+    assert np.all(L.toarray() == adjacency.get_laplacian(demo_graph))
+
+    assert not adjacency.is_symmetric(sp.csr_matrix(np.array([[0, 1], [0, 0]])))
+    assert not adjacency.is_symmetric(sp.csr_matrix(np.ones((2, 3))))
+    assert not adjacency.no_self_interactions(sp.eye(2, format="csr"))
+
+
+def test_connected_components():
+    # rooms 0, 2 and 4 in one wing, 1 and 3 in another, 5 on its own
+    A = np.zeros((6, 6))
+    for i, j in [(0, 2), (2, 4), (1, 3)]:
+        A[i, j] = A[j, i] = 1
+    n_components, labels = adjacency.connected_components(A)
+    assert n_components == 3
+    assert labels.tolist() == [0, 1, 0, 1, 0, 2]
+    assert not adjacency.is_connected(A)
+
+
+def test_large_path_graph():
+    """A graph of a million rooms in a row is checked without dense
+    matrices."""
+    n_rooms = 10**6
+    A = sp.diags([np.ones(n_rooms - 1)] * 2, offsets=[-1, 1], format="csr")
+    assert adjacency.validate_adjacency(A) == []
+    A = A + sp.csr_matrix(([2.0], ([0], [0])), shape=A.shape)
+    assert adjacency.validate_adjacency(A) == [
+        "The graph includes self-interactions.",
+        "The graph is a weighted graph.",
+    ]
+
+
+def test_validate_adjacency():
+    assert adjacency.validate_adjacency(np.zeros((1, 1))) == []
+    assert adjacency.validate_adjacency(np.ones((2, 3))) == [
+        "The adjacency of shape (2, 3) is not square."
+    ]
+    A = np.array([[0, 1, 0, 0], [1, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]])
+    assert adjacency.validate_adjacency(A) == [
+        "The graph could be split into 2 graphs."
+    ]
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from thermo.costs.heating import HeatingCost
+from thermo.graph.adjacency import get_time_adjacency
+from thermo.graph.cache import (
+    GRAPH_CACHE,
+    GraphCache,
+    adjacency_hash,
+    get_cached_time_adjacency,
+    sparse_nbytes,
+)
+
+
+@pytest.fixture
+def graph_cache():
+    GRAPH_CACHE.clear()
+    yield GRAPH_CACHE
+    GRAPH_CACHE.clear()
+
+
+def test_adjacency_hash(demo_graph):
+    key = adjacency_hash(demo_graph)
+    assert adjacency_hash(sp.coo_matrix(demo_graph)) == key
+    assert adjacency_hash(sp.csc_matrix(demo_graph, dtype=float)) == key
+
+    other = demo_graph.copy()
+    other[0, 1] = other[1, 0] = 2
+    assert adjacency_hash(other) != key
+
+
+def test_shared_graph(graph_cache, demo_graph, demo_state, timeslots):
+    """Heating costs of the same building share one time-space adjacency"""
+    costs = [
+        HeatingCost(adjacency=demo_graph, matrix_free=False),
+        HeatingCost(adjacency=sp.csr_matrix(demo_graph), matrix_free=False),
+    ]
+    results = [cost.run(demo_state, n_time_slots=timeslots) for cost in costs]
+    assert np.array_equal(*results)
+
+    info = graph_cache.info()
+    assert (info.hits, info.misses, info.size) == (1, 1, 1)
+    G = costs[0]._get_full_graph(timeslots)
+    assert G is costs[1]._get_full_graph(timeslots)
+    assert not G.data.flags.writeable
+
+    HeatingCost(adjacency=demo_graph, t_weight=2.0)._get_full_graph(timeslots)
+    assert graph_cache.info().size == 2
+
+
+def test_cache_bound(demo_graph):
+    def build(n_times):
+        return lambda: get_time_adjacency(demo_graph, n_times=n_times)
+
+    nbytes = sparse_nbytes(build(2)())
+    cache = GraphCache(max_bytes=int(2.5 * nbytes))
+    first = cache.get("first", build(2))
+    cache.get("second", build(2))
+    assert cache.get("first", build(2)) is first
+    # evicts the least recently used matrix
+    cache.get("third", build(2))
+    info = cache.info()
+    assert (info.size, info.evictions, info.nbytes) == (2, 1, 2 * nbytes)
+    cache.get("second", build(2))
+    assert cache.info().misses == 4
+
+    # larger than the whole budget: returned, but not stored
+    large = cache.get("large", build(10))
+    assert large.shape == (100, 100)
+    assert cache.info().size == 2
+
+
+def test_cached_time_adjacency(graph_cache, demo_graph):
+    G = get_cached_time_adjacency(demo_graph, n_times=4, time_weight=0.5)
+    expected = get_time_adjacency(demo_graph, n_times=4, time_weight=0.5)
+    assert (G != expected).nnz == 0
+    assert get_cached_time_adjacency(demo_graph, n_times=4, time_weight=0.5) is G
@@ -0,0 +1,84 @@
+import numpy as np
+import scipy.sparse as sp
+
+from thermo.graph.adjacency import (
+    get_time_adjacency,
+    get_time_neighbors,
+    time_adjacency_gather,
+    time_adjacency_matvec,
+)
+
+
+def dense_time_adjacency(A, n_times, time_weight):
+    """Reference block construction of the time-space adjacency."""
+    n = A.shape[0]
+    eye = time_weight * np.eye(n)
+    zero = np.zeros((n, n))
+
+    def choose_block(i, j):
+        if i == j:
+            return A
+        elif abs(i - j) == 1:
+            return eye
+        return zero
+
+    return np.block(
+        [[choose_block(i, j) for i in range(n_times)] for j in range(n_times)]
+    )
+
+
+def test_time_adjacency_is_sparse(demo_graph, timeslots):
+    G = get_time_adjacency(demo_graph, n_times=timeslots)
+    assert sp.isspmatrix_csr(G)
+    n = demo_graph.shape[0] * timeslots
+    assert G.shape == (n, n)
+    # one entry per wall in each time slot, plus the links between time slots
+    n_links = 2 * demo_graph.shape[0] * (timeslots - 1)
+    assert G.nnz == timeslots * np.count_nonzero(demo_graph) + n_links
+
+
+def test_time_adjacency_matches_block_form(demo_graph, timeslots):
+    G = get_time_adjacency(demo_graph, n_times=timeslots, time_weight=0.3)
+    expected = dense_time_adjacency(demo_graph, timeslots, 0.3)
+    assert np.allclose(G.toarray(), expected)
+
+
+def test_time_adjacency_from_sparse(demo_graph, timeslots):
+    dense = get_time_adjacency(demo_graph, n_times=timeslots)
+    sparse = get_time_adjacency(sp.csr_matrix(demo_graph), n_times=timeslots)
+    assert (dense != sparse).nnz == 0
+
+
+def test_time_adjacency_matvec(demo_graph, timeslots, demo_state):
+    G = get_time_adjacency(demo_graph, n_times=timeslots, time_weight=0.3)
+    result = time_adjacency_matvec(demo_graph, demo_state, timeslots, time_weight=0.3)
+    assert result.shape == demo_state.shape
+    assert np.allclose(result, G @ demo_state)
+
+
+def test_get_time_neighbors(demo_graph, timeslots):
+    G = get_time_adjacency(demo_graph, n_times=timeslots, time_weight=0.3).toarray()
+    indices = np.array([0, 14, 29])
+    rows, columns, weights = get_time_neighbors(
+        demo_graph, indices, n_times=timeslots, time_weight=0.3
+    )
+    result = np.zeros((G.shape[0], indices.size))
+    np.add.at(result, (rows, columns), weights)
+    assert np.allclose(result, G[:, indices])
+
+
+def test_time_adjacency_matvec_batch(demo_graph, timeslots, demo_state):
+    G = get_time_adjacency(demo_graph, n_times=timeslots)
+    states = np.stack([demo_state, 1 - demo_state])
+    result = time_adjacency_matvec(demo_graph, states, timeslots)
+    assert result.shape == states.shape
+    assert np.allclose(result, (G @ states.T).T)
+
+
+def test_time_adjacency_gather(demo_graph, timeslots, demo_state):
+    G = get_time_adjacency(demo_graph, n_times=timeslots, time_weight=0.3)
+    indices = np.array([29, 0, 3, 14, 15])
+    result = time_adjacency_gather(
+        demo_graph, demo_state, indices, n_times=timeslots, time_weight=0.3
+    )
+    assert np.allclose(result, (G @ demo_state)[indices])
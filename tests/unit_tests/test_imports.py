@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+import pytest
+
+from thermo import config
+
+
+@pytest.mark.parametrize("module", ["thermo.recommender", "thermo.serve"])
+def test_lazy_imports(module: str) -> None:
+    """Ranking needs neither pandas, workalendar nor networkx, nor the list
+    of buildings, so importing the recommenders must not load them"""
+    code = (
+        f"import sys, {module}, thermo.config as config; "
+        "print(*(m for m in ('pandas', 'workalendar', 'networkx') "
+        "if m in sys.modules)); "
+        "print(config.get_building_names.cache_info().currsize)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    loaded, n_cached = result.stdout.splitlines()
+    assert loaded == ""
+    assert n_cached == "0"
+
+
+def test_building_names() -> None:
+    assert "demo_school" in config.BUILDING_NAMES
+    assert config.BUILDING_NAMES is config.get_building_names()
+    with pytest.raises(AttributeError):
+        config.UNKNOWN_SETTING
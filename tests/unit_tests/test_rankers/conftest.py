@@ -1,7 +1,9 @@
 import numpy as np
 import pytest
 
+from thermo.costs import CostName, make_cost
 from thermo.costs.base import CostModel
+from thermo.ranker import make_ranker
 
 
 class MockCost(CostModel):
@@ -20,3 +22,28 @@ def mock_heatingcost():
 @pytest.fixture
 def mock_occupationcost():
     return MockCost(30)
+
+
+@pytest.fixture
+def demo_costs(demo_graph, demo_rooms, request):
+    """All the costs of the demo building. Parametrize it indirectly with
+    True or False to set the `matrix_free` mode of the heating cost."""
+    matrix_free = getattr(request, "param", None)
+    return [
+        make_cost(
+            name,
+            adjacency=demo_graph,
+            room_descriptions=demo_rooms,
+            **({"matrix_free": matrix_free} if name == "HeatingCost" else {}),
+        )
+        for name in CostName.__args__
+    ]
+
+
+@pytest.fixture
+def parallel_ranker(demo_costs):
+    """FullRanker of the demo costs with a thread pool, closed after the
+    test"""
+    ranker = make_ranker("FullRanker", costs=demo_costs, max_workers=2)
+    yield ranker
+    ranker.close()
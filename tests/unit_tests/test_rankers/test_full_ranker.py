@@ -1,8 +1,20 @@
 import numpy as np
+import pytest
 
+from thermo.config import UNAVAILABLE_COST
+from thermo.costs import CostModel
+from thermo.costs.base import expand_factor
 from thermo.ranker.full import FullRanker
 
 
+def masked_sum(costs, state, **kwargs):
+    """Sum of the costs, where the costs with a `full` factor are only added
+    on the cells the other costs leave available"""
+    static = sum(cost.run(state, **kwargs) for cost in costs if cost.factor != "full")
+    full = sum(cost.run(state, **kwargs) for cost in costs if cost.factor == "full")
+    return np.where(static < UNAVAILABLE_COST, static + full, static)
+
+
 def test_fullranker(demo_state, mock_heatingcost, mock_occupationcost):
     ranker = FullRanker(costs=[mock_occupationcost, mock_heatingcost])
     ranking = ranker.run(state=demo_state)
@@ -42,3 +54,134 @@ def test_fullranker(demo_state, mock_heatingcost, mock_occupationcost):
     )
     assert ranking.shape == demo_state.shape
     assert np.allclose(ranking, expected)
+
+
+def test_fullranker_apply_delta(demo_state, demo_costs):
+    ranker = FullRanker(costs=demo_costs)
+    new_state = demo_state.copy()
+    new_state[[5, 12]] = 1
+
+    ranking = ranker.apply_delta(
+        ranker.run(demo_state, n_time_slots=3),
+        changed_indices=np.array([5, 12]),
+        new_values=np.array([1, 1]),
+        state=demo_state,
+        n_time_slots=3,
+    )
+    assert np.allclose(ranking, ranker.run(new_state, n_time_slots=3))
+
+
+def test_fullranker_apply_delta_unavailable(demo_state, demo_costs):
+    """Cells that `run` leaves out of the heating cost, e.g. rooms too small
+    for the booking, are left out of the incremental updates too."""
+    ranker = FullRanker(costs=demo_costs)
+    kwargs = {"n_time_slots": 3, "required_capacity": 20}
+    # room C is too small, and booked in the first time slot
+    assert demo_state[2] == 1
+    changed_indices = np.array([2, 16])
+    new_values = np.array([0, 1])
+    new_state = demo_state.copy()
+    new_state[changed_indices] = new_values
+
+    ranking = ranker.apply_delta(
+        ranker.run(demo_state, **kwargs),
+        changed_indices=changed_indices,
+        new_values=new_values,
+        state=demo_state,
+        **kwargs,
+    )
+    expected = ranker.run(new_state, **kwargs)
+    assert np.allclose(ranking, expected)
+    assert ranking[2] >= UNAVAILABLE_COST
+
+
+def test_fullranker_batch(demo_state, demo_costs):
+    ranker = FullRanker(costs=demo_costs)
+    states = np.stack([demo_state, np.roll(demo_state, 7)])
+
+    ranking = ranker.run(states, n_time_slots=3)
+    assert ranking.shape == states.shape
+    for state, expected in zip(states, ranking):
+        assert np.allclose(ranker.run(state, n_time_slots=3), expected)
+
+
+class MockSlotCost(CostModel):
+    """A cost that only depends on the time slot"""
+
+    factor = "slot"
+
+    def run_factor(self, state, n_time_slots, **kwargs):
+        return np.arange(n_time_slots, dtype=float)
+
+    def run(self, state, n_time_slots, **kwargs):
+        costs = self.run_factor(state, n_time_slots)
+        return expand_factor(costs, self.factor, state, n_time_slots)
+
+
+def test_fullranker_factors(demo_state, demo_costs):
+    """Factorized costs add up to the same costs as the expanded ones."""
+    costs = demo_costs + [MockSlotCost()]
+    kwargs = {"n_time_slots": 3, "required_capacity": 15}
+    states = np.stack([demo_state, 1 - demo_state])
+
+    ranking = FullRanker(costs=costs).run(states, **kwargs)
+    assert np.allclose(ranking, masked_sum(costs, states, **kwargs))
+
+
+def test_fullranker_masked(demo_state, demo_costs):
+    """Available room-time combinations get the sum of all costs, and
+    unavailable ones a cost of at least the unavailable cost."""
+    kwargs = {"n_time_slots": 3, "required_capacity": 15}
+    ranking = FullRanker(costs=demo_costs).run(demo_state, **kwargs)
+    expected = sum(cost.run(demo_state, **kwargs) for cost in demo_costs)
+
+    available = expected < UNAVAILABLE_COST
+    assert not available.all()
+    assert np.allclose(ranking[available], expected[available])
+    assert np.all(ranking[~available] >= UNAVAILABLE_COST)
+
+
+def test_fullranker_parallel(demo_state, demo_costs, parallel_ranker):
+    """Evaluating the costs in a thread pool gives the same costs."""
+    kwargs = {"n_time_slots": 3, "required_capacity": 10}
+    states = np.stack([demo_state, 1 - demo_state])
+
+    for state in (demo_state, states):
+        expected = sum(cost.run(state, **kwargs) for cost in demo_costs)
+        assert np.allclose(parallel_ranker.run(state, **kwargs), expected)
+
+
+def test_fullranker_run_batch(demo_state, demo_costs):
+    """Each request of a batch gets the costs of running it alone."""
+    requirements = [
+        {"required_capacity": 10},
+        {"required_capacity": 20, "required_amenities": {"screen"}},
+        {"required_capacity": 10, "required_amenities": {"whiteboard"}},
+        {},
+    ]
+    ranker = FullRanker(costs=demo_costs)
+    ranking = ranker.run_batch(demo_state, requirements, n_time_slots=3)
+
+    assert ranking.shape == (len(requirements), demo_state.size)
+    for request, costs_request in zip(requirements, ranking):
+        expected = masked_sum(demo_costs, demo_state, n_time_slots=3, **request)
+        assert np.allclose(costs_request, expected)
+        assert np.array_equal(
+            costs_request, ranker.run(demo_state, n_time_slots=3, **request)
+        )
+
+
+@pytest.mark.parametrize("demo_costs", [True, False], indirect=True)
+def test_fullranker_paths_identical(demo_state, demo_costs, parallel_ranker):
+    """The serial, parallel and batch evaluations mask the same cells, and
+    give exactly the same rankings."""
+    kwargs = {"n_time_slots": 3, "required_capacity": 20}
+    states = np.stack([demo_state, 1 - demo_state, np.roll(demo_state, 7)])
+    serial = FullRanker(costs=demo_costs)
+
+    expected = np.stack([serial.run(state, **kwargs) for state in states])
+    assert not serial.available(demo_state, **kwargs).all()
+    assert np.array_equal(serial.run(states, **kwargs), expected)
+    assert np.array_equal(parallel_ranker.run(states, **kwargs), expected)
+    for state, ranking in zip(states, expected):
+        assert np.array_equal(parallel_ranker.run(state, **kwargs), ranking)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from thermo.config import UNAVAILABLE_COST
+from thermo.ranker import make_ranker
+from thermo.ranker.full import FullRanker
+from thermo.ranker.topk import TopKRanker
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"required_capacity": 20},
+        {"required_capacity": 15, "required_amenities": {"whiteboard"}},
+    ],
+)
+@pytest.mark.parametrize("k", [1, 5, 30])
+def test_topk(demo_costs, demo_state, timeslots, k, kwargs):
+    """The top k recommendations are the k best of the full ranking."""
+    ranking = FullRanker(costs=demo_costs).run(
+        demo_state, n_time_slots=timeslots, **kwargs
+    )
+    available = np.flatnonzero(ranking < UNAVAILABLE_COST)
+    expected = np.sort(ranking[available])[:k]
+
+    top = TopKRanker(costs=demo_costs, k=k).top(
+        demo_state, n_time_slots=timeslots, **kwargs
+    )
+    assert top.size == min(k, available.size)
+    assert np.allclose(top["score"], expected)
+    assert np.allclose(ranking[top["slot"] * 10 + top["room"]], top["score"])
+
+
+def test_topk_run(demo_costs, demo_state, timeslots):
+    ranker = make_ranker("TopKRanker", costs=demo_costs, k=3)
+    costs = ranker.run(demo_state, n_time_slots=timeslots, required_capacity=20)
+    assert costs.shape == demo_state.shape
+    assert np.count_nonzero(costs < UNAVAILABLE_COST) == 3
+
+
+def test_topk_run_batch(demo_costs, demo_state, timeslots):
+    """The base implementation runs the ranker once per request."""
+    ranker = TopKRanker(costs=demo_costs, k=3)
+    requirements = [{"required_capacity": 20}, {"required_capacity": 5}]
+    ranking = ranker.run_batch(demo_state, requirements, n_time_slots=timeslots)
+    for request, costs in zip(requirements, ranking):
+        expected = ranker.run(demo_state, n_time_slots=timeslots, **request)
+        assert np.array_equal(costs, expected)
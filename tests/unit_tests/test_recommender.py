@@ -1,3 +1,4 @@
+import threading
 from datetime import date
 from itertools import chain, combinations
 from typing import Any, Iterable
@@ -78,3 +79,69 @@ def test_multiple_costs(
     recommendation = recommender.run(date(2023, 4, 20))
     assert isinstance(recommendation, Recommendation)
     assert recommendation.shape == (8, 10)
+
+
+def test_apply_delta(demo_building: Building) -> None:
+    """Tests that updating a recommendation after a booking gives the same
+    costs as ranking the new booking state from scratch."""
+    recommender = Recommender.from_config(demo_building.name)
+    recommendation = recommender.run(date(2023, 4, 20), required_capacity=15)
+    booked = np.flatnonzero(recommendation.state == 0)[:1]
+
+    updated = recommender.apply_delta(
+        recommendation, booked, np.ones(1), required_capacity=15
+    )
+    expected = recommender.ranker.run(
+        updated.state, n_time_slots=8, required_capacity=15
+    )
+    assert updated.state[booked] == 1
+    assert np.allclose(updated.costs, expected)
+
+
+def test_run_batch(demo_building: Building) -> None:
+    """Tests that a batch of requests gives the recommendation of each."""
+    recommender = Recommender.from_config(demo_building.name)
+    day = date(2023, 4, 20)
+    requirements = [{"required_capacity": 15}, {"required_capacity": 5}]
+    recommendations = recommender.run_batch(day, requirements)
+
+    assert len(recommendations) == 2
+    for request, recommendation in zip(requirements, recommendations):
+        expected = recommender.run(day, **request)
+        available = expected.costs < 1e4
+        assert np.allclose(recommendation.costs[available], expected.costs[available])
+        assert np.array_equal(recommendation.state, expected.state)
+
+
+def test_ranker_params(demo_building: Building) -> None:
+    """Tests that the ranker can be configured with parameters."""
+    demo_building.ranker = {"TopKRanker": {"k": 4}}
+    assert demo_building.ranker_name == "TopKRanker"
+    assert demo_building.ranker_params == {"k": 4}
+
+    ranker = make_ranker(
+        demo_building.ranker_name, costs=[], **demo_building.ranker_params
+    )
+    assert ranker.k == 4
+
+
+def test_recommendation_shape(demo_recommender: Recommender) -> None:
+    recommendation = demo_recommender.run(date(2023, 4, 20))
+    assert recommendation.shape == recommendation.ranking.shape
+
+
+def test_close(demo_building: Building) -> None:
+    """Tests that leaving the recommender stops the threads of its ranker."""
+    costs = [
+        make_cost(
+            name,
+            adjacency=demo_building.adjacency,
+            room_descriptions=demo_building.room_descriptions,
+        )
+        for name in CostName.__args__
+    ]
+    ranker = make_ranker("FullRanker", costs=costs, max_workers=2)
+    with Recommender(demo_building, ranker) as recommender:
+        recommender.ranker.run(np.zeros(3 * 10), n_time_slots=3)
+        assert any(t.name.startswith("ranker") for t in threading.enumerate())
+    assert not any(t.name.startswith("ranker") for t in threading.enumerate())
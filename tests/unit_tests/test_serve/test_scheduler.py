@@ -0,0 +1,96 @@
+import asyncio
+from datetime import date
+
+import numpy as np
+import pytest
+
+from thermo.recommender import Recommender
+from thermo.serve import BatchScheduler, RecommendationService
+
+
+class CountingRecommender(Recommender):
+    """Recommender that records the size of its batches"""
+
+    def __init__(self, recommender: Recommender):
+        super().__init__(building=recommender.building, ranker=recommender.ranker)
+        self.batches: list[int] = []
+
+    def run_batch(self, day, requirements, **kwargs):
+        self.batches.append(len(requirements))
+        if any(r.get("required_capacity") == -1 for r in requirements):
+            raise ValueError("Invalid capacity")
+        return super().run_batch(day, requirements, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def demo_recommender() -> Recommender:
+    return Recommender.from_config("demo_school")
+
+
+def test_batching(demo_recommender: Recommender) -> None:
+    recommender = CountingRecommender(demo_recommender)
+    scheduler = BatchScheduler({"demo_school": recommender}, window=0.2)
+    days = [date(2023, 4, 20), date(2023, 4, 21)]
+    requests = [(day, capacity) for day in days for capacity in [5, 10, 15]]
+    futures = [
+        scheduler.submit("demo_school", day, required_capacity=capacity)
+        for day, capacity in requests
+    ]
+    results = [future.result(timeout=5) for future in futures]
+    scheduler.close()
+
+    # one batch per day
+    assert sorted(recommender.batches) == [3, 3]
+    for (day, capacity), result in zip(requests, results):
+        expected = demo_recommender.run(day, required_capacity=capacity)
+        available = expected.costs < 1e4
+        assert np.allclose(result.costs[available], expected.costs[available])
+
+    stats = scheduler.stats()
+    assert (stats["requests"], stats["batches"]) == (6, 2)
+    assert (stats["mean_batch_size"], stats["max_batch_size"]) == (3, 3)
+    assert 0 < stats["p50_latency_ms"] <= stats["p99_latency_ms"]
+
+
+def test_batch_errors(demo_recommender: Recommender) -> None:
+    recommender = CountingRecommender(demo_recommender)
+    scheduler = BatchScheduler({"demo_school": recommender}, window=0.2)
+    day = date(2023, 4, 20)
+    futures = [
+        scheduler.submit("demo_school", day, required_capacity=capacity)
+        for capacity in [5, -1]
+    ]
+    with pytest.raises(KeyError):
+        scheduler.submit("unknown", day)
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    scheduler.close()
+    assert scheduler.stats() == {"requests": 0, "batches": 0}
+
+
+def test_service_batching(demo_recommender: Recommender) -> None:
+    service = RecommendationService({"demo_school": demo_recommender}, batch_window=0.1)
+    reference = RecommendationService({"demo_school": demo_recommender})
+    day = date(2023, 4, 20)
+
+    async def requests(service):
+        return await asyncio.gather(
+            *(
+                service.recommend("demo_school", day, required_capacity=capacity)
+                for capacity in [5, 10, 10, 15]
+            )
+        )
+
+    results = asyncio.run(requests(service))
+    for result, expected in zip(results, asyncio.run(requests(reference))):
+        assert [r["room"] for r in result] == [r["room"] for r in expected]
+        assert [r["score"] for r in result] == pytest.approx(
+            [r["score"] for r in expected]
+        )
+    stats = service.stats()
+    service.close()
+    reference.close()
+    assert stats["computations"] == 3
+    assert stats["batching"]["batches"] == 1
+    assert stats["batching"]["requests"] == 3
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+from datetime import date
+
+import numpy as np
+import pytest
+
+from thermo.recommender import Recommender
+from thermo.serve import RecommendationService, start_server
+from thermo.serve.loadtest import _get, make_targets, run_load
+
+
+class BlockingRecommender(Recommender):
+    """Recommender whose runs wait for an event, to overlap requests"""
+
+    def __init__(self, recommender: Recommender):
+        super().__init__(building=recommender.building, ranker=recommender.ranker)
+        self.release = threading.Event()
+
+    def run(self, day: date, **kwargs):
+        self.release.wait(timeout=5)
+        return super().run(day, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def demo_recommender() -> Recommender:
+    return Recommender.from_config("demo_school")
+
+
+def test_coalescing(demo_recommender: Recommender) -> None:
+    recommender = BlockingRecommender(demo_recommender)
+    service = RecommendationService({"demo_school": recommender}, max_workers=4)
+    day = date(2023, 4, 20)
+
+    async def requests():
+        identical = [
+            service.recommend("demo_school", day, required_capacity=10)
+            for _ in range(5)
+        ]
+        other = service.recommend("demo_school", day, required_capacity=20)
+        tasks = [asyncio.ensure_future(r) for r in [*identical, other]]
+        await asyncio.sleep(0.05)
+        assert service.stats()["in_flight"] == 2
+        recommender.release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(requests())
+    service.close()
+
+    assert service.stats() == {
+        "buildings": ["demo_school"],
+        "requests": 6,
+        "computations": 2,
+        "coalesced": 4,
+        "in_flight": 0,
+    }
+    assert all(result == results[0] for result in results[:5])
+    assert len(results[0]) == service.top
+    best = demo_recommender.run(day, required_capacity=10).top_recommendations()
+    assert results[0][0]["room"] == best["Room"].iloc[0]
+    assert results[0][0]["score"] == pytest.approx(best["Score"].iloc[0])
+
+
+def test_unknown_building(demo_recommender: Recommender) -> None:
+    service = RecommendationService({"demo_school": demo_recommender})
+    with pytest.raises(KeyError):
+        asyncio.run(service.recommend("unknown", date(2023, 4, 20)))
+    service.close()
+
+
+def test_http(demo_recommender: Recommender) -> None:
+    service = RecommendationService({"demo_school": demo_recommender})
+
+    async def session():
+        server = await start_server(service, port=0)
+        host, port = server.sockets[0].getsockname()[:2]
+        async with server:
+            targets = make_targets(["demo_school"], 2, [5, 10], date(2023, 4, 20))
+            result = await run_load(host, port, targets, 40, concurrency=8)
+
+            reader, writer = await asyncio.open_connection(host, port)
+            responses = [
+                await _get(reader, writer, host, target)
+                for target in [
+                    "/health",
+                    "/recommend?building=unknown&day=2023-04-20",
+                    "/recommend?building=demo_school&day=20-04-2023",
+                    "/recommend?building=demo_school",
+                    "/unknown",
+                    "/recommend?building=demo_school&day=2023-04-20"
+                    "&capacity=5&amenities=screen,whiteboard",
+                ]
+            ]
+            writer.close()
+        return result, responses
+
+    result, responses = asyncio.run(session())
+    service.close()
+
+    assert result["errors"] == 0
+    assert len(result["latencies"]) == 40
+    assert result["stats"]["requests"] == 40
+    assert [status for status, _ in responses] == [200, 404, 400, 400, 404, 200]
+    assert {"time_slot", "room", "score"} == set(responses[-1][1][0])
+
+
+class FailingRecommender(Recommender):
+    """Recommender whose runs fail with a KeyError, as a bug would"""
+
+    def __init__(self, recommender: Recommender):
+        super().__init__(building=recommender.building, ranker=recommender.ranker)
+
+    def run(self, day: date, **kwargs):
+        raise KeyError("bug")
+
+
+def test_http_errors(demo_recommender: Recommender, caplog) -> None:
+    """Tests that only unknown buildings are answered with a 404, and that
+    errors of the recommenders are answered with a 500 and logged."""
+    service = RecommendationService(
+        {"demo_school": FailingRecommender(demo_recommender)}
+    )
+
+    async def get(target: str):
+        server = await start_server(service, port=0)
+        host, port = server.sockets[0].getsockname()[:2]
+        async with server:
+            reader, writer = await asyncio.open_connection(host, port)
+            response = await _get(reader, writer, host, target)
+            writer.close()
+        return response
+
+    status, body = asyncio.run(get("/recommend?building=unknown&day=2023-04-20"))
+    assert (status, body) == (404, {"error": "Building unknown is not served."})
+    status, body = asyncio.run(get("/recommend?day=2023-04-20"))
+    assert (status, body) == (400, {"error": "Missing parameter 'building'"})
+    status, _ = asyncio.run(get("/recommend?building=demo_school&day=2023-04-20"))
+    assert status == 500
+    assert "Error serving a request" in caplog.text
+    service.close()
+
+
+def test_state_versions() -> None:
+    """The service ranks the cached states, and picks up their new versions"""
+    service = RecommendationService.from_config(["demo_school"], state_ttl=60)
+    day = date(2023, 4, 20)
+
+    async def request():
+        return await service.recommend("demo_school", day, required_capacity=10)
+
+    before = asyncio.run(request())
+    state = service.state_cache.get("demo_school", day).state.copy()
+    best = np.flatnonzero(state == 0)[0]
+    state[best] = 1
+    service.state_cache.put("demo_school", day, state)
+    after = asyncio.run(request())
+    stats = service.stats()
+    service.close()
+
+    assert before != after
+    assert stats["computations"] == 2
+    assert stats["states"]["misses"] == 1
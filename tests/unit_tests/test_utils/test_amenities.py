@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from thermo.config import AMENITIES
+from thermo.utils.amenities import (
+    encode_amenities,
+    encode_rooms,
+    get_vocabulary,
+    popcount,
+)
+
+
+def test_vocabulary() -> None:
+    """Amenities outside config.AMENITIES get the bits after them."""
+    vocabulary = get_vocabulary([{"projector"}, {"sofa", "piano"}, set()])
+    assert vocabulary == AMENITIES + ("piano", "sofa")
+
+
+@pytest.mark.parametrize(
+    "amenities, expected",
+    [(set(), 0), ({"screen"}, 1), ({"projector", "whiteboard"}, 6), (AMENITIES, 31)],
+)
+def test_encode_amenities(amenities: set[str], expected: int) -> None:
+    assert encode_amenities(amenities) == expected
+
+
+def test_encode_unknown_amenity() -> None:
+    with pytest.raises(KeyError):
+        encode_amenities({"sofa"})
+
+
+def test_popcount(demo_rooms) -> None:
+    amenities = [room.amenities for room in demo_rooms]
+    masks = encode_rooms(amenities)
+    assert masks.dtype == np.uint64
+    assert np.all(popcount(masks) == [len(a) for a in amenities])
+    assert np.all(popcount(np.array([2**64 - 1, 0], dtype=np.uint64)) == [64, 0])
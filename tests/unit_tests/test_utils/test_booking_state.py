@@ -0,0 +1,50 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from thermo.adapter.state_connection import get_state
+from thermo.utils.booking_state import BookingState
+
+
+@pytest.fixture
+def state() -> np.ndarray:
+    return get_state(date(2023, 4, 20))
+
+
+def test_round_trip(state):
+    booking = BookingState.from_array(state, n_rooms=10)
+    assert booking.shape == (8, 10)
+    assert booking.nbytes == 10
+    assert np.array_equal(booking.to_vector(), state)
+    assert booking.to_vector().dtype == float
+    assert np.array_equal(booking.unpack(), state.reshape(8, 10) > 0)
+    assert BookingState.from_array(state.reshape(8, 10)) == booking
+
+    with pytest.raises(ValueError):
+        BookingState.from_array(state)
+    with pytest.raises(ValueError):
+        BookingState(8, 10, np.zeros(3, dtype=np.uint8))
+
+
+def test_book_cancel_query(state):
+    booking = BookingState.from_array(state, n_rooms=10)
+    expected = state.reshape(8, 10).copy()
+    slots, rooms = np.array([0, 3, 7, 7]), np.array([9, 4, 0, 0])
+
+    booking.book(slots, rooms)
+    expected[slots, rooms] = 1
+    assert np.array_equal(booking.to_vector(), expected.flatten())
+    assert booking.query(slots, rooms).all()
+
+    booking.cancel(3, [4, 5, 6])
+    expected[3, [4, 5, 6]] = 0
+    assert np.array_equal(booking.to_vector(), expected.flatten())
+    assert not booking.query([3, 3], [4, 5]).any()
+    assert booking.query(*np.nonzero(expected)).all()
+
+    copy = booking.copy()
+    copy.cancel(0, 9)
+    assert copy != booking
+    with pytest.raises(IndexError):
+        booking.book(8, 0)
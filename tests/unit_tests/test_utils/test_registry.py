@@ -0,0 +1,78 @@
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+from numpy.typing import NDArray
+
+from thermo.recommender import Recommender
+from thermo.utils.registry import BuildingRegistry
+
+N_TIME_SLOTS = 8
+
+
+def _state(n_rooms: int) -> NDArray:
+    state = np.zeros(N_TIME_SLOTS * n_rooms)
+    state[[3, 14, 25]] = 1
+    return state
+
+
+def _worker_ranking(block_names: dict[str, str], building_name: str) -> NDArray:
+    """Ranking computed by a worker process attached to the registry"""
+    registry = BuildingRegistry.attach(block_names)
+    recommender = registry.recommender(building_name)
+    n_rooms = len(recommender.building.room_descriptions)
+    ranking = recommender.ranker.run(
+        _state(n_rooms), n_time_slots=N_TIME_SLOTS, required_capacity=10
+    )
+    del recommender
+    registry.close()
+    return ranking
+
+
+@pytest.fixture
+def registry(demo_building_name: str) -> BuildingRegistry:
+    registry = BuildingRegistry.create([demo_building_name])
+    yield registry
+    registry.close()
+
+
+def test_shared_arrays(registry: BuildingRegistry, demo_building_name: str) -> None:
+    """Tests that the cost tables are read-only views of the shared blocks."""
+    attached = BuildingRegistry.attach(registry.block_names)
+    building, tables = attached.load(demo_building_name)
+    expected = Recommender.from_config(demo_building_name).building
+
+    assert building.room_descriptions == expected.room_descriptions
+    assert np.array_equal(building.adjacency.toarray(), expected.adjacency)
+    assert tables.keys() == {"CapacityCost", "AmenityCost"}
+    assert not any(t.flags.owndata or t.flags.writeable for t in tables.values())
+    with pytest.raises(KeyError):
+        attached.load("unknown_building")
+
+    del building, tables
+    attached.close()
+
+
+def test_worker_processes(registry: BuildingRegistry, demo_building_name: str) -> None:
+    """Tests that worker processes rank as recommenders of the config files,
+    and that the blocks outlive them until the registry is closed."""
+    recommender = Recommender.from_config(demo_building_name)
+    n_rooms = len(recommender.building.room_descriptions)
+    expected = recommender.ranker.run(
+        _state(n_rooms), n_time_slots=N_TIME_SLOTS, required_capacity=10
+    )
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(2) as pool:
+        rankings = pool.starmap(
+            _worker_ranking, [(registry.block_names, demo_building_name)] * 2
+        )
+    for ranking in rankings:
+        assert np.allclose(ranking, expected)
+
+    block_names = registry.block_names
+    SharedMemory(name=block_names[demo_building_name]).close()
+    registry.close()
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=block_names[demo_building_name])
@@ -0,0 +1,245 @@
+"""
+Bulk fetching of booking states over a range of days, e.g. for week and
+month views or backtests.
+
+The days are fetched concurrently from the booking report, over a pool of
+persistent HTTP connections. We assume the JSON report of a day, requested
+with the extra query parameters `building=<name>&day=<YYYY-MM-DD>`, has the
+following format:
+
+    {
+        "day": "2023-04-20",
+        "bookings": [
+            {"room": "Room A", "start": "15:00", "end": "17:00"},
+            ...
+        ]
+    }
+
+A booking occupies all the hourly time slots it overlaps. Bookings of
+rooms that are not in the building are ignored.
+"""
+import http.client
+import json
+import math
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from threading import Lock
+from typing import Any
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+from numpy.typing import NDArray
+
+from thermo.config import BOOKING_API_URL, DAY_HOUR_END, WEEKEND_HOUR_START
+from thermo.utils import io
+
+HOURS = list(range(WEEKEND_HOUR_START, DAY_HOUR_END))
+"""Start hours of the time slots of the common grid of `get_states`"""
+
+# HTTP statuses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ByteBudgetError(RuntimeError):
+    """The responses exceed the byte budget of a bulk fetch"""
+
+
+class RequestError(RuntimeError):
+    """A request failed after all retries"""
+
+
+class ConnectionPool:
+    def __init__(self, url: str, size: int = 8, timeout: float = 10.0):
+        """
+        Thread-safe pool of persistent HTTP(S) connections to the host of
+        `url`. A connection is reused by the following requests, unless it
+        failed.
+
+        Args:
+            url: URL of the server, with the base path and query string of
+                the requests.
+            size: maximum number of idle connections kept.
+            timeout: timeout of the connections, in seconds.
+        """
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.path = parts.path or "/"
+        self.query = parts.query
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(
+            maxsize=size
+        )
+        self._lock = Lock()
+        self.n_connections = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.n_connections += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def get(self, params: dict[str, str], max_bytes: int) -> tuple[int, bytes]:
+        """
+        Sends a GET request with extra query parameters.
+
+        Args:
+            params: query parameters added to those of the URL.
+            max_bytes: maximum size of the response body.
+
+        Returns:
+            The status and the body of the response.
+
+        Raises:
+            ByteBudgetError: if the body is larger than `max_bytes`.
+        """
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+
+        query = "&".join(q for q in [self.query, urlencode(params)] if q)
+        try:
+            connection.request("GET", f"{self.path}?{query}")
+            response = connection.getresponse()
+            length = response.getheader("Content-Length")
+            if length is not None and int(length) > max_bytes:
+                raise ByteBudgetError(f"Response of {length} bytes")
+            body = response.read(max_bytes + 1)
+            if len(body) > max_bytes or not response.isclosed():
+                raise ByteBudgetError(f"Response of more than {max_bytes} bytes")
+        except BaseException:
+            connection.close()
+            raise
+
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+        return response.status, body
+
+    def close(self) -> None:
+        """Closes the idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def parse_bookings(report: dict[str, Any], room_names: list[str]) -> NDArray:
+    """
+    Booking state of a day on the grid of `HOURS`, from its report.
+
+    Args:
+        report: JSON report of the day.
+        room_names: names of the rooms of the building, in order.
+
+    Returns:
+        An array of shape (len(HOURS), n_rooms), with 1 if the room is
+            booked at that hour and 0 otherwise.
+    """
+    rooms = {name: i for i, name in enumerate(room_names)}
+    state = np.zeros((len(HOURS), len(room_names)))
+    for booking in report.get("bookings", []):
+        room = rooms.get(booking["room"])
+        if room is None:
+            continue
+        start_hour, start_minute = map(int, booking["start"].split(":"))
+        end_hour, end_minute = map(int, booking["end"].split(":"))
+        # hours of the grid the booking overlaps, if any
+        first = min(max(start_hour - HOURS[0], 0), len(HOURS))
+        end = math.ceil(end_hour + end_minute / 60) - HOURS[0]
+        last = max(min(end, len(HOURS)), 0)
+        if last <= first:
+            continue
+        state[first:last, room] = 1
+    return state
+
+
+def get_states(
+    building: str,
+    start: date,
+    end: date,
+    url: str = BOOKING_API_URL,
+    room_names: list[str] | None = None,
+    max_workers: int = 8,
+    retries: int = 3,
+    backoff: float = 0.2,
+    max_bytes: int = 16 * 2**20,
+) -> NDArray:
+    """
+    Fetches the booking states of a building for every day from `start`
+    to `end` (both included).
+
+    The states are stacked on a common grid of hourly time slots, `HOURS`.
+    Both school days and holidays end at the same hour, so the flat state
+    of a day (see `get_state`) is
+    `states[i, -get_time_slots(day):].flatten()`.
+
+    Args:
+        building: name of the building.
+        start: first day.
+        end: last day.
+        url: URL of the booking report.
+        room_names: names of the rooms of the building, in order. By
+            default, they are read from the building config.
+        max_workers: number of concurrent requests (and of pooled
+            connections).
+        retries: number of times a failed request is retried, with
+            exponential backoff.
+        backoff: seconds before the first retry.
+        max_bytes: maximum number of bytes of all the responses.
+
+    Returns:
+        An array of shape (n_days, len(HOURS), n_rooms), with 1 if the
+            room is booked at that hour and 0 otherwise.
+
+    Raises:
+        RequestError: if a day cannot be fetched.
+        ByteBudgetError: if the responses exceed `max_bytes`.
+    """
+    if room_names is None:
+        room_names = io.load_building(io.get_building_path(building)).get_room_attr(
+            "name"
+        )
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    pool = ConnectionPool(url, size=max_workers)
+    budget = {"left": max_bytes}
+    lock = Lock()
+
+    def fetch(day: date) -> NDArray:
+        params = {"building": building, "day": day.isoformat()}
+        for attempt in range(retries + 1):
+            with lock:
+                left = budget["left"]
+            try:
+                status, body = pool.get(params, max_bytes=left)
+            except (OSError, http.client.HTTPException) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                with lock:
+                    budget["left"] -= len(body)
+                    if budget["left"] < 0:
+                        raise ByteBudgetError(f"Responses exceed {max_bytes} bytes")
+                if status == 200:
+                    return parse_bookings(json.loads(body), room_names)
+                error = f"HTTP {status}"
+                if status not in RETRY_STATUSES:
+                    break
+            if attempt < retries:
+                time.sleep(backoff * 2**attempt)
+        raise RequestError(f"Could not fetch the bookings of {day}: {error}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            states = list(executor.map(fetch, days))
+    finally:
+        pool.close()
+    return np.stack(states) if states else np.zeros((0, len(HOURS), len(room_names)))
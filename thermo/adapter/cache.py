@@ -0,0 +1,239 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from threading import Lock
+from typing import Any, Callable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from thermo.adapter.state_connection import get_state
+from thermo.utils.booking_state import BookingState
+from thermo.utils.time import get_time_slots
+
+StateKey = tuple[str, date]
+"""Building name and day of a booking state"""
+
+
+def fetch_state(building: str, day: date) -> NDArray:
+    """Fetches the booking state of a building for a day from the booking
+    API (see `get_state`)"""
+    return get_state(day)
+
+
+@dataclass(frozen=True)
+class CachedState:
+    """A bit-packed booking state with its version, and when it was fetched"""
+
+    booking: BookingState
+    version: int
+    fetched: float
+
+    @property
+    def state(self) -> NDArray:
+        """The state as a flat vector, as taken by the costs"""
+        return self.booking.to_vector()
+
+
+class StateCache:
+    def __init__(
+        self,
+        fetch: Callable[[str, date], NDArray] = fetch_state,
+        ttl: float = 60.0,
+        max_entries: int = 1024,
+        refresh_workers: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Cache of booking states by building and day, shared by the
+        recommenders. States are kept bit-packed (see `BookingState`).
+
+        States younger than `ttl` seconds are served from the cache.
+        Older states are still served (stale-while-revalidate), while a
+        background thread fetches them again, so the latency of a
+        recommendation only includes a round-trip to the booking API the
+        first time a day is requested.
+
+        Every time the state of a building and day changes, it gets a new
+        version. Versions increase monotonically across the whole cache,
+        so a request for a given version always sees the same state.
+
+        Args:
+            fetch: function fetching the state of a building for a day.
+            ttl: seconds after which a cached state is revalidated.
+            max_entries: number of states kept. The least recently used
+                ones are evicted first.
+            refresh_workers: number of threads revalidating states.
+            clock: monotonic clock, in seconds.
+        """
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[StateKey, CachedState] = OrderedDict()
+        self._refreshing: set[StateKey] = set()
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="thermo-state"
+        )
+        self._last_version = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get(self, building: str, day: date) -> CachedState:
+        """
+        Gets the state of a building for a day. It is fetched on a miss,
+        and revalidated in the background if it is stale.
+
+        Args:
+            building: name of the building
+            day: day of the state
+
+        Returns:
+            The cached state, with its version.
+        """
+        key = (building, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if self.clock() - entry.fetched < self.ttl:
+                    self.hits += 1
+                    return entry
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._executor.submit(self._refresh, key, entry)
+                return entry
+            self.misses += 1
+
+        return self._store(key, self.fetch(building, day))
+
+    def put(self, building: str, day: date, state: NDArray) -> CachedState:
+        """
+        Stores a state known to be current, e.g. right after a booking is
+        made through thermo.
+
+        Args:
+            building: name of the building
+            day: day of the state
+            state: the booking state
+
+        Returns:
+            The cached state, with its version.
+        """
+        return self._store((building, day), state)
+
+    def patch(
+        self, building: str, day: date, changed: NDArray, values: NDArray
+    ) -> CachedState | None:
+        """
+        Sets some cells of a cached state, e.g. those changed by a booking
+        event (see `thermo.adapter.events.BookingLedger.subscribe`), with a
+        new version. Only the bits of the state are copied, since the
+        cached entries are shared with the readers.
+
+        Args:
+            building: name of the building
+            day: day of the state
+            changed: flat indices of the cells, as in `CachedState.state`.
+            values: new values of those cells, 1 if booked and 0 otherwise.
+
+        Returns:
+            The cached state, with its version, or None if the state is not
+                cached, in which case the next request fetches it.
+        """
+        key = (building, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            booking = entry.booking.copy()
+            slots, rooms = np.divmod(np.asarray(changed, dtype=int), booking.n_rooms)
+            booked = np.broadcast_to(np.asarray(values, dtype=bool), slots.shape)
+            booking.book(slots[booked], rooms[booked])
+            booking.cancel(slots[~booked], rooms[~booked])
+            return self._insert(key, booking)
+
+    def version(self, building: str, day: date) -> int | None:
+        """Version of the cached state of a building for a day, if any,
+        without fetching it"""
+        with self._lock:
+            entry = self._entries.get((building, day))
+        return None if entry is None else entry.version
+
+    def invalidate(self, building: str, day: date) -> None:
+        """Removes the state of a building for a day, so that the next
+        request fetches it"""
+        with self._lock:
+            self._entries.pop((building, day), None)
+
+    @staticmethod
+    def _pack(key: StateKey, state: NDArray) -> BookingState:
+        """Bit-packed state, on the time slots of its day"""
+        _, day = key
+        return BookingState.from_array(np.reshape(state, (get_time_slots(day), -1)))
+
+    def _store(self, key: StateKey, state: NDArray) -> CachedState:
+        """Stores a fetched state, with a new version if it changed"""
+        booking = self._pack(key, state)
+        with self._lock:
+            return self._insert(key, booking)
+
+    def _insert(self, key: StateKey, booking: BookingState) -> CachedState:
+        """Stores a state, with a new version if it changed. The lock must
+        be held."""
+        previous = self._entries.get(key)
+        if previous is not None and previous.booking == booking:
+            version = previous.version
+        else:
+            self._last_version += 1
+            version = self._last_version
+        entry = CachedState(booking=booking, version=version, fetched=self.clock())
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def _refresh(self, key: StateKey, stale: CachedState) -> None:
+        """
+        Fetches a stale state again, in a background thread. The fetched
+        state is only stored if the stale entry is still cached: a state
+        stored in the meantime, e.g. by `put` after a booking event, is
+        newer than the fetched one, or the entry was invalidated.
+        """
+        try:
+            booking = self._pack(key, self.fetch(*key))
+            with self._lock:
+                if self._entries.get(key) is stale:
+                    self._insert(key, booking)
+                self.refreshes += 1
+        except Exception:
+            # keep serving the stale state, and retry on the next request
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> dict[str, Any]:
+        """Hit, stale hit, miss and refresh counters, and number of states"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "size": len(self._entries),
+            }
+
+    def close(self) -> None:
+        """Waits for the running revalidations and stops the workers"""
+        self._executor.shutdown(wait=True)
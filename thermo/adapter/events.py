@@ -0,0 +1,238 @@
+"""
+Event-sourced booking states. Instead of fetching the state of a whole day
+on every request, the booking states are kept in memory and updated with
+a stream of booking events, e.g. from the booking system or from a JSONL
+event file.
+"""
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Iterable, Literal
+
+import numpy as np
+from numpy.typing import NDArray
+
+from thermo.utils.booking_state import BookingState
+from thermo.utils.time import get_time_slots
+
+EventType = Literal["create", "cancel"]
+
+Listener = Callable[[str, date, NDArray, NDArray], None]
+"""Called with the building, the day, and the flat indices and new values
+of the entries of the state changed by an event."""
+
+SNAPSHOT_FILE = "snapshot.npz"
+
+
+@dataclass(frozen=True)
+class BookingEvent:
+    """
+    A booking made or cancelled.
+
+    Args:
+        action: `create` or `cancel`.
+        building: name of the building.
+        day: day of the booking.
+        room: index of the room in the building.
+        slot: first time slot of the booking.
+        duration: number of time slots of the booking.
+    """
+
+    action: EventType
+    building: str
+    day: date
+    room: int
+    slot: int
+    duration: int = 1
+
+    @classmethod
+    def from_dict(cls, event: dict[str, Any]) -> "BookingEvent":
+        """Event from its JSON representation"""
+        return cls(**{**event, "day": date.fromisoformat(event["day"])})
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON representation of the event"""
+        return {**asdict(self), "day": self.day.isoformat()}
+
+
+def read_events(path: Path) -> Iterable[BookingEvent]:
+    """Reads the events of a JSONL file, one event per line"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield BookingEvent.from_dict(json.loads(line))
+
+
+def write_events(path: Path, events: Iterable[BookingEvent]) -> None:
+    """Appends events to a JSONL file"""
+    with open(path, "a") as f:
+        for event in events:
+            f.write(json.dumps(event.to_dict()) + "\n")
+
+
+class BookingLedger:
+    def __init__(
+        self,
+        n_rooms: dict[str, int],
+        initial_state: Callable[[str, date], NDArray] | None = None,
+        snapshot_dir: Path | None = None,
+        snapshot_every: int = 1000,
+    ):
+        """
+        In-memory booking states of several buildings, by day, kept up to
+        date by applying booking events. The states are kept bit-packed
+        (see `BookingState`). Each event only touches the cells
+        it books or cancels, and the listeners are notified of the cells
+        that changed (see `subscribe`), so that the costs can be updated
+        incrementally (see `Recommender.apply_delta`).
+
+        The states are periodically saved to a snapshot, from which a new
+        ledger resumes. Replaying an event file then skips the events the
+        snapshot already includes.
+
+        Args:
+            n_rooms: number of rooms of each building.
+            initial_state: function returning the state of a building for
+                a day before any event, e.g. from the booking API. By
+                default, days start without bookings.
+            snapshot_dir: directory of the snapshots. Without it, no
+                snapshots are taken.
+            snapshot_every: number of events between snapshots.
+        """
+        self.n_rooms = n_rooms
+        self.initial_state = initial_state
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_every = snapshot_every
+        self._states: dict[tuple[str, date], BookingState] = {}
+        self._listeners: list[Listener] = []
+        self._lock = Lock()
+        self.n_events = 0
+        if snapshot_dir is not None and (snapshot_dir / SNAPSHOT_FILE).exists():
+            self._load_snapshot()
+
+    def subscribe(self, listener: Listener) -> None:
+        """Calls `listener` with the cells changed by every event"""
+        self._listeners.append(listener)
+
+    def _ensure_day(self, building: str, day: date) -> None:
+        """
+        Adds the state of a building for a day if it is missing. The initial
+        state, which may come from the booking API, is fetched without
+        holding the lock, so that the events of the other days are not
+        blocked meanwhile. If another thread added the day first, its state
+        is kept.
+        """
+        key = (building, day)
+        with self._lock:
+            if key in self._states:
+                return
+        n_rooms = self.n_rooms[building]
+        if self.initial_state is None:
+            state = BookingState(get_time_slots(day), n_rooms)
+        else:
+            initial = self.initial_state(building, day)
+            state = BookingState.from_array(initial, n_rooms=n_rooms)
+        with self._lock:
+            self._states.setdefault(key, state)
+
+    def state(self, building: str, day: date) -> NDArray:
+        """
+        Current booking state of a building for a day.
+
+        Returns:
+            A flat array containing 1 if the room is booked at that time
+                and 0 otherwise, as expected by `CostModel.run`.
+        """
+        self._ensure_day(building, day)
+        with self._lock:
+            return self._states[building, day].to_vector()
+
+    def apply(self, event: BookingEvent) -> NDArray:
+        """
+        Applies an event to the state of its day, in time proportional to
+        its duration, and notifies the listeners of the changes.
+
+        Args:
+            event: the booking event.
+
+        Returns:
+            The flat indices of the entries of the state that changed.
+        """
+        booked = event.action == "create"
+        self._ensure_day(event.building, event.day)
+        with self._lock:
+            state = self._states[event.building, event.day]
+            end = min(event.slot + event.duration, state.n_slots)
+            slots = np.arange(event.slot, end)
+            slots = slots[state.query(slots, event.room) != booked]
+            if booked:
+                state.book(slots, event.room)
+            else:
+                state.cancel(slots, event.room)
+            self.n_events += 1
+            if self.snapshot_dir is not None and (
+                self.n_events % self.snapshot_every == 0
+            ):
+                self._save_snapshot()
+
+        changed = slots * state.n_rooms + event.room
+        if changed.size:
+            values = np.full(changed.size, float(booked))
+            for listener in self._listeners:
+                listener(event.building, event.day, changed, values)
+        return changed
+
+    def replay(self, path: Path) -> int:
+        """
+        Applies the events of a JSONL file, skipping those already applied,
+        e.g. when resuming from a snapshot.
+
+        Args:
+            path: the event file, one JSON event per line.
+
+        Returns:
+            The number of events applied.
+        """
+        n_applied = 0
+        for i, event in enumerate(read_events(path)):
+            if i >= self.n_events:
+                self.apply(event)
+                n_applied += 1
+        return n_applied
+
+    def snapshot(self) -> None:
+        """Saves the states now"""
+        with self._lock:
+            self._save_snapshot()
+
+    def _save_snapshot(self) -> None:
+        """Saves the states, atomically replacing the previous snapshot"""
+        if self.snapshot_dir is None:
+            raise ValueError("The ledger has no snapshot directory.")
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        arrays: dict[str, Any] = {
+            f"{building}/{day.isoformat()}": state.bits
+            for (building, day), state in self._states.items()
+        }
+        arrays["n_events"] = np.array(self.n_events)
+        path = self.snapshot_dir / SNAPSHOT_FILE
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def _load_snapshot(self) -> None:
+        """Restores the states of the last snapshot"""
+        assert self.snapshot_dir is not None
+        with np.load(self.snapshot_dir / SNAPSHOT_FILE) as snapshot:
+            self.n_events = int(snapshot["n_events"])
+            for key in snapshot.files:
+                if key == "n_events":
+                    continue
+                building, day_str = key.rsplit("/", 1)
+                day = date.fromisoformat(day_str)
+                self._states[(building, day)] = BookingState(
+                    get_time_slots(day), self.n_rooms[building], snapshot[key]
+                )
@@ -25,12 +25,13 @@ def mock_api(
         if the room is booked at that time, 0 otherwise.
     """
     timeslots = get_time_slots(date) if not timeslots else timeslots
-    # Set random seed to date to get reproducible results
-    np.random.seed(int(date.isoformat().replace("-", "")))
+    # Seed with the date to get reproducible results. A local generator
+    # (same stream as the global one) is safe to use from several threads.
+    rng = np.random.RandomState(int(date.isoformat().replace("-", "")))
 
     # initialize state, fetch n random values, sets values to 1
     state = np.zeros((timeslots, rooms))
-    indices = np.random.randint(0, state.size, size=n_booked)
+    indices = rng.randint(0, state.size, size=n_booked)
     state.flat[indices] = 1
     return state.flatten()
 
@@ -0,0 +1,311 @@
+"""
+Local SQLite store of the bookings of several buildings, to answer range
+queries such as "which rooms for at least 20 people with a projector are
+free from 17:00 to 19:00 on every Tuesday of next month" without fetching
+and ranking day by day.
+
+Bookings are stored by (building, day, slot, room), where `slot` is the
+index of the time slot in the schedule of the day (see `get_time_slots`),
+as in the flat states of `get_state`. `AvailabilityStore.get_state` has
+the signature of the fetch function of a `thermo.adapter.cache.StateCache`,
+so the recommenders can read their states from the store.
+"""
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from thermo.adapter.bulk import HOURS
+from thermo.utils.booking_state import BookingState
+from thermo.utils.building import Building
+from thermo.utils.time import get_time_slots
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    building TEXT NOT NULL,
+    day TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    room INTEGER NOT NULL,
+    booked INTEGER NOT NULL,
+    PRIMARY KEY (building, day, slot, room)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bookings_day ON bookings (day);
+CREATE INDEX IF NOT EXISTS bookings_room ON bookings (building, room, day);
+CREATE TABLE IF NOT EXISTS rooms (
+    building TEXT NOT NULL,
+    room INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    capacity INTEGER,
+    PRIMARY KEY (building, room)
+);
+CREATE TABLE IF NOT EXISTS room_amenities (
+    building TEXT NOT NULL,
+    room INTEGER NOT NULL,
+    amenity TEXT NOT NULL,
+    PRIMARY KEY (building, room, amenity)
+);
+CREATE INDEX IF NOT EXISTS room_amenities_amenity
+    ON room_amenities (building, amenity);
+"""
+
+UPSERT = """
+INSERT INTO bookings (building, day, slot, room, booked) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (building, day, slot, room) DO UPDATE SET booked = excluded.booked
+"""
+
+
+def _days(start: date, end: date) -> list[date]:
+    """Days from start to end, both included"""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class AvailabilityStore:
+    def __init__(self, path: Path | str = ":memory:"):
+        """
+        SQLite store of bookings and room descriptions. The connection is
+        shared by all threads, one statement at a time.
+
+        Args:
+            path: path of the database file, created if needed. By
+                default, the store is in memory.
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def add_building(self, building: Building) -> None:
+        """Stores (or replaces) the rooms of a building, with their capacity
+        and amenities"""
+        names = building.get_room_attr("name")
+        capacities = building.get_room_attr("capacity")
+        rooms = [
+            (building.name, i, name, capacity)
+            for i, (name, capacity) in enumerate(zip(names, capacities))
+        ]
+        amenities = [
+            (building.name, i, amenity)
+            for i, room_amenities in enumerate(building.get_room_attr("amenities"))
+            for amenity in room_amenities
+        ]
+        with self._lock, self._connection:
+            for table in ("rooms", "room_amenities"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE building = ?", (building.name,)
+                )
+            self._connection.executemany("INSERT INTO rooms VALUES (?, ?, ?, ?)", rooms)
+            self._connection.executemany(
+                "INSERT INTO room_amenities VALUES (?, ?, ?)", amenities
+            )
+
+    def n_rooms(self, building: str) -> int:
+        """Number of rooms of a building"""
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM rooms WHERE building = ?", (building,)
+            ).fetchone()
+        if count == 0:
+            raise KeyError(f"Building {building} is not in the store.")
+        return count
+
+    def upsert(
+        self,
+        building: str,
+        bookings: Iterable[tuple[date, int, int, bool]],
+    ) -> None:
+        """
+        Inserts or updates bookings in bulk, in a single transaction.
+
+        Args:
+            building: name of the building.
+            bookings: (day, slot, room, booked) of each cell, where
+                `booked` is False for cancelled bookings.
+        """
+        rows = (
+            (building, day.isoformat(), int(slot), int(room), int(booked))
+            for day, slot, room, booked in bookings
+        )
+        with self._lock, self._connection:
+            self._connection.executemany(UPSERT, rows)
+
+    def put_state(self, building: str, day: date, state: NDArray) -> None:
+        """
+        Replaces the bookings of a building for a day by a state.
+
+        Args:
+            building: name of the building.
+            day: day of the state.
+            state: a flat array containing 1 if the room is booked at that
+                time a zero otherwise, as returned by `get_state`.
+        """
+        slots, rooms = np.nonzero(np.reshape(state, (-1, self.n_rooms(building))))
+        rows = [
+            (building, day.isoformat(), slot, room, 1)
+            for slot, room in zip(slots.tolist(), rooms.tolist())
+        ]
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM bookings WHERE building = ? AND day = ?",
+                (building, day.isoformat()),
+            )
+            self._connection.executemany(UPSERT, rows)
+
+    def _booked_cells(
+        self, building: str, start: date, end: date
+    ) -> tuple[NDArray, NDArray, NDArray]:
+        """Days (as offsets from start), slots and rooms of the bookings"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT julianday(day) - julianday(?), slot, room FROM bookings "
+                "WHERE building = ? AND day BETWEEN ? AND ? AND booked = 1",
+                (start.isoformat(), building, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        cells = np.array(rows, dtype=int).reshape(-1, 3)
+        return cells[:, 0], cells[:, 1], cells[:, 2]
+
+    def get_state(self, building: str, day: date) -> NDArray:
+        """
+        Booking state of a building for a day, decoded in one query.
+
+        Returns:
+            A flat array containing 1 if the room is booked at that time
+                and 0 otherwise, as returned by `get_state`.
+        """
+        state = np.zeros((get_time_slots(day), self.n_rooms(building)))
+        _, slots, rooms = self._booked_cells(building, day, day)
+        state[slots, rooms] = 1
+        return state.flatten()
+
+    def get_states(self, building: str, start: date, end: date) -> NDArray:
+        """
+        Booking states of a building for every day from `start` to `end`
+        (both included), decoded in one query, on the common grid of hourly
+        time slots of `thermo.adapter.bulk.get_states`.
+
+        Returns:
+            An array of shape (n_days, len(HOURS), n_rooms), with 1 if the
+                room is booked at that hour and 0 otherwise.
+        """
+        days = _days(start, end)
+        states = np.zeros((len(days), len(HOURS), self.n_rooms(building)))
+        offsets, slots, rooms = self._booked_cells(building, start, end)
+        # the schedules of all days end at the same hour
+        first_slot = len(HOURS) - np.array([get_time_slots(day) for day in days])
+        states[offsets, first_slot[offsets] + slots, rooms] = 1
+        return states
+
+    def get_bookings(self, building: str, start: date, end: date) -> list[BookingState]:
+        """
+        Bit-packed booking states of a building for every day from `start`
+        to `end` (both included), e.g. to keep the history of a year in
+        memory.
+
+        Returns:
+            The state of each day, on the time slots of its schedule.
+        """
+        states = self.get_states(building, start, end)
+        return [
+            BookingState.from_array(state[-get_time_slots(day) :])
+            for day, state in zip(_days(start, end), states)
+        ]
+
+    def find_rooms(
+        self,
+        building: str,
+        min_capacity: int = 0,
+        amenities: Iterable[str] = (),
+    ) -> list[int]:
+        """Indices of the rooms with at least `min_capacity` seats and all
+        the `amenities`"""
+        amenities = sorted(set(amenities))
+        query = (
+            "SELECT room FROM rooms WHERE building = ? AND COALESCE(capacity, 0) >= ?"
+        )
+        params: list = [building, min_capacity]
+        if amenities:
+            placeholders = ", ".join("?" * len(amenities))
+            query += (
+                " AND room IN (SELECT room FROM room_amenities"
+                f" WHERE building = ? AND amenity IN ({placeholders})"
+                " GROUP BY room HAVING COUNT(*) = ?)"
+            )
+            params += [building, *amenities, len(amenities)]
+        with self._lock:
+            rows = self._connection.execute(query + " ORDER BY room", params)
+            return [room for (room,) in rows]
+
+    def free_rooms(
+        self,
+        building: str,
+        start: date,
+        end: date,
+        hours: range,
+        min_capacity: int = 0,
+        amenities: Iterable[str] = (),
+        weekdays: Iterable[int] | None = None,
+    ) -> dict[date, list[str]]:
+        """
+        Rooms free for a whole time range, on every day of a date range.
+
+        Args:
+            building: name of the building.
+            start: first day.
+            end: last day (included).
+            hours: start hours of the time slots, e.g. `range(17, 19)`
+                for 17:00 to 19:00.
+            min_capacity: minimum capacity of the rooms.
+            amenities: amenities the rooms must have.
+            weekdays: days of the week to consider (0 is Monday). By
+                default, all days.
+
+        Returns:
+            The names of the free rooms of each day, for the days with at
+                least one free room.
+
+        Raises:
+            ValueError: if `hours` is empty or has hours outside of
+                `thermo.adapter.bulk.HOURS`.
+        """
+        if not hours:
+            raise ValueError("No hours requested.")
+        outside = sorted(set(hours) - set(HOURS))
+        if outside:
+            raise ValueError(
+                f"Hours {outside} are outside of the schedule, "
+                f"from {HOURS[0]} to {HOURS[-1]}."
+            )
+        rooms = np.array(self.find_rooms(building, min_capacity, amenities), dtype=int)
+        if rooms.size == 0:
+            return {}
+        days = _days(start, end)
+        hour_slots = [HOURS.index(hour) for hour in hours]
+        booked = self.get_states(building, start, end)[:, hour_slots][:, :, rooms]
+
+        # hours before the start of the schedule of a day are not bookable
+        first_slot = len(HOURS) - np.array([get_time_slots(day) for day in days])
+        bookable = min(hour_slots) >= first_slot
+        if weekdays is not None:
+            bookable &= np.isin([day.weekday() for day in days], list(weekdays))
+        free = ~booked.any(axis=1) & bookable[:, np.newaxis]
+
+        with self._lock:
+            names = dict(
+                self._connection.execute(
+                    "SELECT room, name FROM rooms WHERE building = ?", (building,)
+                ).fetchall()
+            )
+        return {
+            day: [names[room] for room in rooms[free_rooms]]
+            for day, free_rooms in zip(days, free)
+            if free_rooms.any()
+        }
+
+    def close(self) -> None:
+        """Closes the connection to the database"""
+        with self._lock:
+            self._connection.close()
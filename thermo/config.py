@@ -1,17 +1,51 @@
+from functools import cache
 from pathlib import Path
+from typing import Any
 
 WORKDIR = Path(__file__).parents[1]
 BUILDINGS_DIR = WORKDIR / "buildings"
+# validation results of the building adjacencies, by content hash
+VALIDATION_CACHE_DIR = WORKDIR / ".cache" / "validation"
 
 # Default cost for unavailable room-time slots
 UNAVAILABLE_COST = 1e5
 
+# Buildings with at least this many rooms compute the heating cost
+# matrix-free, without materializing the time-space adjacency matrix
+MATRIX_FREE_MIN_ROOMS = 100
+
+# Connected components of a building with fewer rooms than this are not
+# evaluated on their own by the heating cost, but together
+COMPONENT_MIN_ROOMS = 10
+
+# Memory budget of the time-space adjacency matrices shared by all
+# heating costs, see `thermo.graph.cache`
+GRAPH_CACHE_MAX_BYTES = 256 * 2**20
+
 # default start of daily schedule
 WEEKDAY_HOUR_START = 15
 WEEKEND_HOUR_START = 8
+# end of daily schedule (exclusive)
+DAY_HOUR_END = 23
 
-# names of all buildings
-BUILDING_NAMES = [b.name for b in BUILDINGS_DIR.iterdir() if b.is_dir()]
+# Report of the bookings of a day (see `thermo.adapter.bulk`)
+BOOKING_API_URL = (
+    "https://book01.webbook.dk/favrskov/_rapporter/"
+    "simpel_dagsoversigt_output.php?gruppe=30&type=json"
+)
 
 # names of all amenities
 AMENITIES = ("screen", "projector", "whiteboard", "speaker", "instruments")
+
+
+@cache
+def get_building_names() -> list[str]:
+    """Names of all buildings, discovered in `BUILDINGS_DIR` on first use"""
+    return [b.name for b in BUILDINGS_DIR.iterdir() if b.is_dir()]
+
+
+def __getattr__(name: str) -> Any:
+    # `BUILDING_NAMES` is computed on first access, not at import time
+    if name == "BUILDING_NAMES":
+        return get_building_names()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
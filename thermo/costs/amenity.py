@@ -1,14 +1,24 @@
-from functools import cached_property
-
 import numpy as np
 from numpy.typing import NDArray
 
 from thermo.config import UNAVAILABLE_COST
-from thermo.costs.base import CostModel
+from thermo.costs.base import CostFactor, CostModel, expand_factor
+from thermo.utils.amenities import (
+    encode_amenities,
+    encode_rooms,
+    get_vocabulary,
+    popcount,
+)
 from thermo.utils.room import Room
 
+# largest number of different amenities for which a lookup table is built
+MAX_TABLE_AMENITIES = 10
+
 
 class AmenityCost(CostModel):
+    factor: CostFactor = "room"
+    requirements = ("required_amenities",)
+
     def __init__(
         self,
         room_descriptions: list[Room],
@@ -29,6 +39,8 @@ class AmenityCost(CostModel):
         amenities.
 
         Note: We assume that room amenities are fixed across time.
+        They are encoded once as bitmasks (see `thermo.utils.amenities`),
+        so that the costs are computed with vectorized bitwise operations.
 
         Args:
             room_descriptions: list of Room objects describing the
@@ -40,20 +52,83 @@ class AmenityCost(CostModel):
 
         """
         self.room_descriptions = room_descriptions
+        self.room_amenities: list[set[str]] = [
+            room.amenities for room in room_descriptions
+        ]
         self.unavailable_cost = unavailable_cost
         self.coeff = amenity_utilization_coeff
-        self.len_map = np.vectorize(len)
+        self.vocabulary = get_vocabulary(self.room_amenities)
+        self.room_masks = encode_rooms(self.room_amenities, self.vocabulary)
+        self._table: NDArray | None = None
+
+    def _calculate_costs(self, required_mask: np.uint64 | NDArray) -> NDArray:
+        """Calculate costs for each room, from the number of amenities
+        of the room that are not required"""
+        return self.coeff * popcount(self.room_masks & ~required_mask)
+
+    def _get_room_costs(self, required_mask: np.uint64 | NDArray) -> NDArray:
+        """Calculate the cost of each room for the required amenities (or,
+        with a column of bitmasks, one row per set of amenities)"""
+        useful_rooms = (self.room_masks & required_mask) == required_mask
+        utilization = self._calculate_costs(required_mask)
+        return np.where(useful_rooms, utilization, self.unavailable_cost)
+
+    def precompute(self, table: NDArray | None = None) -> NDArray | None:
+        """
+        Builds a lookup table with the cost of each room for every subset
+        of the amenities found in the building, indexed by its bitmask.
+        For the amenities in `thermo.config.AMENITIES` this is 32 rows.
+        Buildings with more than `MAX_TABLE_AMENITIES` different amenities
+        do not use a table.
+
+        Args:
+            table: a table built previously for the same rooms and
+                parameters. It is rebuilt if its shape does not match.
+
+        Returns:
+            The lookup table, of shape (2**n_amenities, n_rooms), or None.
+        """
+        if len(self.vocabulary) > MAX_TABLE_AMENITIES:
+            return None
+
+        shape = (2 ** len(self.vocabulary), len(self.room_masks))
+        if table is None or table.shape != shape:
+            masks = np.arange(shape[0], dtype=np.uint64)[:, np.newaxis]
+            table = self._get_room_costs(masks)
+        table.flags.writeable = False
+        self._table = table
+        return table
+
+    def run_factor(
+        self,
+        state: NDArray,
+        required_amenities: set[str] = set(),  # noqa: B006
+        **kwargs
+    ) -> NDArray:
+        """
+        Calculate the amenity cost of each room, setting the cost to a
+        very high number if the room does not have the required amenities.
+
+        Args:
+            state: ones and zeros representing bookings. Unused, since
+                room amenities are fixed across time.
+            required_amenities: required amenities for the
+                booking, e.g. {"projector", "whiteboard"}
 
-    @cached_property
-    def room_amenities(self) -> list[set[str]]:
-        """Amenities of all rooms"""
-        return [room.amenities for room in self.room_descriptions]
+        Returns:
+            cost: where the lower the better and very high if room
+                does not have required amenities. Shape = (n_rooms,).
+                It may be a (read-only) row of the lookup table.
+        """
+        if not required_amenities.issubset(self.vocabulary):
+            # no room has some of the required amenities
+            return np.full(self.room_masks.shape, self.unavailable_cost)
 
-    def _calculate_costs(self, required_amenities: set[str]) -> NDArray:
-        """Calculate costs for each room-time combination"""
-        return self.coeff * self.len_map(
-            np.array(self.room_amenities) - required_amenities
-        )
+        required_mask = encode_amenities(required_amenities, self.vocabulary)
+        if self._table is not None:
+            # table lookup, see `precompute`
+            return self._table[required_mask]
+        return self._get_room_costs(np.uint64(required_mask))
 
     def run(
         self,
@@ -73,20 +148,19 @@ class AmenityCost(CostModel):
 
         Args:
             state: ones and zeros representing bookings
-                shape = (n_rooms, n_time_slots)
+                shape = (n_rooms*n_time_slots,), or a batch of states
+                of shape (n_states, n_rooms*n_time_slots)
             n_time_slots: number of time slots to consider
             required_amenities: required amenities for the
                 booking, e.g. {"projector", "whiteboard"}
 
         Returns:
             cost: where the lower the better and very high if room
-                does not have required amenities
-                shape = (n_rooms*n_time_slots,)
+                does not have required amenities. Same shape as the
+                state; for a batch, a read-only view broadcasting the
+                same costs to all states.
         """
-        useful_rooms = [*map(required_amenities.issubset, self.room_amenities)]
-        utilization = self._calculate_costs(required_amenities)
-
-        costs = np.where(useful_rooms, utilization, self.unavailable_cost)
+        costs = self.run_factor(state, required_amenities=required_amenities)
 
         # return exploded values to match state's shape
-        return np.tile(costs, n_time_slots)
+        return expand_factor(costs, self.factor, state, n_time_slots)
@@ -1,7 +1,58 @@
 from abc import ABC, abstractmethod
+from typing import Literal
 
+import numpy as np
 from numpy.typing import NDArray
 
+from thermo.config import AMENITIES
+
+TABLES_VERSION = 1
+"""Version of the cost lookup tables (see `CostModel.precompute`). Bump it
+when the costs that build tables change, so that the tables persisted for
+a building are built again."""
+
+CostFactor = Literal["full", "room", "slot"]
+"""Axes a cost varies along: `full` costs vary with the room and the time slot,
+`room` costs only with the room and `slot` costs only with the time slot."""
+
+
+def expand_factor(
+    costs: NDArray, factor: CostFactor, state: NDArray, n_time_slots: int
+) -> NDArray:
+    """
+    Expands factorized costs (see `CostModel.run_factor`) to the shape
+    of the state.
+
+    Args:
+        costs: costs of shape (n_rooms,) for `room` costs, (n_time_slots,)
+            for `slot` costs or the shape of the state for `full` costs.
+        factor: axes the costs vary along.
+        state: the state, or batch of states, the costs are computed for.
+        n_time_slots: number of time slots in the schedule (per day)
+
+    Returns:
+        An array of the same shape as the state. For a batch, the costs
+        of `room` and `slot` factors are a read-only view broadcasting the
+        same costs to all states.
+    """
+    match factor:
+        case "room":
+            costs = np.tile(costs, n_time_slots)
+        case "slot":
+            costs = np.repeat(costs, state.shape[-1] // n_time_slots)
+        case _:
+            return costs
+    return np.broadcast_to(costs, state.shape) if state.ndim > 1 else costs
+
+
+def tables_signature() -> bytes:
+    """
+    Identifies how cost lookup tables are built, besides the config files
+    of the building: the version of the tables and the amenity vocabulary
+    they are indexed by. It is part of the key of persisted tables.
+    """
+    return f"tables-v{TABLES_VERSION}:{','.join(AMENITIES)}".encode()
+
 
 class CostModel(ABC):
     """
@@ -10,8 +61,21 @@ class CostModel(ABC):
         - HeatingCost for the heating
         - CapacityCost for the capacity of the room
         - etc.
+
+    Cost models are not modified by `run` and the other evaluation
+    methods, so a single instance (once precomputed) can be shared by
+    concurrent requests from several threads.
     """
 
+    factor: CostFactor = "full"
+    """Axes the costs vary along. Costs with a `room` or `slot` factor do not
+    depend on the state, and rankers broadcast them lazily."""
+
+    requirements: tuple[str, ...] = ()
+    """Run-time keyword arguments describing the booking (e.g.
+    `required_capacity`) the costs depend on. Rankers evaluate the costs
+    once per distinct combination of them in a batch of requests."""
+
     @abstractmethod
     def run(self, state: NDArray, n_time_slots: int, **kwargs) -> NDArray:
         """
@@ -20,7 +84,8 @@ class CostModel(ABC):
 
         Args:
             state: a flat array containing 1 if the room is booked
-                at that time a zero otherwise.
+                at that time a zero otherwise. It can also be a batch
+                of states, of shape (n_states, n_rooms*n_time_slots).
             n_time_slots: number of time slots in the schedule
                 (per day)
             kwargs: other possible arguments to the run method.
@@ -29,3 +94,149 @@ class CostModel(ABC):
             An array of the same shape as the state, containing the costs.
         """
         pass
+
+    def run_factor(self, state: NDArray, **kwargs) -> NDArray:
+        """
+        Computes the costs in factorized form, i.e. without repeating the
+        costs along the axes they do not vary along (see `factor`).
+
+        Args:
+            state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise, or a batch of states.
+            kwargs: other possible arguments to the run method.
+
+        Returns:
+            An array of shape (n_rooms,) for costs with a `room` factor,
+            (n_time_slots,) for a `slot` factor or the shape of the state
+            for a `full` factor.
+        """
+        return self.run(state, **kwargs)
+
+    def run_masked(
+        self, state: NDArray, mask: NDArray, n_time_slots: int, **kwargs
+    ) -> NDArray:
+        """
+        Computes the costs only for the entries of the state selected by
+        `mask`, e.g. the room-time combinations that are still feasible
+        after evaluating cheaper costs.
+
+        The base implementation runs the cost model on the full state.
+        Cost models that can evaluate a subset of entries faster should
+        override it.
+
+        Args:
+            state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise.
+            mask: boolean array of the same shape as the state.
+            n_time_slots: number of time slots in the schedule
+                (per day)
+            kwargs: other possible arguments to the run method.
+
+        Returns:
+            A flat array with the costs of the selected entries, in order.
+        """
+        return self.run(state, n_time_slots=n_time_slots, **kwargs)[mask]
+
+    def close(self) -> None:
+        """
+        Releases the resources of the cost model, e.g. its thread pool.
+        The base implementation does nothing.
+        """
+        return None
+
+    def precompute(self, table: NDArray | None = None) -> NDArray | None:
+        """
+        Builds a lookup table with the costs of all rooms for every
+        possible booking requirement, so that serving a request becomes a
+        table lookup. Only cost models that do not depend on the state
+        and whose requirements can be enumerated build a table; the base
+        implementation does nothing.
+
+        Args:
+            table: a table built previously for the same rooms and
+                parameters, e.g. loaded from disk. It is rebuilt if its
+                shape does not match.
+
+        Returns:
+            The lookup table, or None if the cost model does not use one.
+        """
+        return None
+
+    def delta(
+        self,
+        state: NDArray,
+        n_time_slots: int,
+        changed_indices: NDArray,
+        new_values: NDArray,
+        **kwargs,
+    ) -> tuple[NDArray, NDArray]:
+        """
+        Computes how the costs change when the entries `changed_indices`
+        of the state are set to `new_values`, e.g. after a booking is made
+        or cancelled.
+
+        Costs with a `room` or `slot` factor do not depend on the state,
+        so they do not change. Otherwise, the base implementation runs the
+        cost model on the old and new states. Cost models that can update
+        their costs locally should override it.
+
+        Args:
+            state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise, before the change.
+            n_time_slots: number of time slots in the schedule
+                (per day)
+            changed_indices: flat indices of the entries of the state
+                that change.
+            new_values: new values of those entries.
+            kwargs: other possible arguments to the run method.
+
+        Returns:
+            A tuple (indices, differences) with the flat indices of the
+            costs that change and how much they change. Indices may repeat,
+            in which case the differences add up.
+        """
+        if self.factor != "full":
+            return np.array([], dtype=int), np.array([], dtype=float)
+
+        new_state = state.copy()
+        new_state[changed_indices] = new_values
+        difference = self.run(new_state, n_time_slots=n_time_slots, **kwargs)
+        difference -= self.run(state, n_time_slots=n_time_slots, **kwargs)
+        indices = np.flatnonzero(difference)
+        return indices, difference[indices]
+
+    def apply_delta(
+        self,
+        prev_costs: NDArray,
+        changed_indices: NDArray,
+        new_values: NDArray,
+        state: NDArray,
+        n_time_slots: int,
+        **kwargs,
+    ) -> NDArray:
+        """
+        Updates, in place, the costs computed for `state` after the
+        entries `changed_indices` of the state are set to `new_values`.
+
+        Args:
+            prev_costs: output of the run method for `state`.
+            changed_indices: flat indices of the entries of the state
+                that change.
+            new_values: new values of those entries.
+            state: the state `prev_costs` were computed for.
+            n_time_slots: number of time slots in the schedule
+                (per day)
+            kwargs: other possible arguments to the run method.
+
+        Returns:
+            prev_costs, updated to the new state.
+        """
+        indices, differences = self.delta(
+            state,
+            n_time_slots=n_time_slots,
+            changed_indices=changed_indices,
+            new_values=new_values,
+            **kwargs,
+        )
+        np.add.at(prev_costs, indices, differences)
+        return prev_costs
@@ -1,14 +1,15 @@
-from functools import cached_property
-
 import numpy as np
 from numpy.typing import NDArray
 
 from thermo.config import UNAVAILABLE_COST
-from thermo.costs.base import CostModel
+from thermo.costs.base import CostFactor, CostModel, expand_factor
 from thermo.utils.room import Room
 
 
 class CapacityCost(CostModel):
+    factor: CostFactor = "room"
+    requirements = ("required_capacity",)
+
     def __init__(
         self,
         room_descriptions: list[Room],
@@ -38,23 +39,80 @@ class CapacityCost(CostModel):
 
         """
         self.room_descriptions = room_descriptions
+        self.room_capacities: NDArray = np.array(
+            [room.capacity for room in room_descriptions], dtype=int
+        )
         self.coeff = capacity_utilization_coeff
         self.unavailable_cost = unavailable_cost
-
-    @cached_property
-    def room_capacities(self) -> NDArray:
-        """Capacities of all rooms"""
-        return np.array([room.capacity for room in self.room_descriptions], dtype=int)
+        self._table: NDArray | None = None
 
     @property
     def n_rooms(self) -> int:
         """Number of rooms"""
         return self.room_capacities.shape[0]
 
-    def _calculate_costs(self, capacities: NDArray, required_capacity: int) -> NDArray:
+    def _calculate_costs(
+        self, capacities: NDArray, required_capacity: int | NDArray
+    ) -> NDArray:
         """Calculate costs for each room-time combination"""
         return self.coeff * (capacities - required_capacity) / capacities
 
+    def _get_room_costs(self, required_capacity: int | NDArray) -> NDArray:
+        """Calculate the cost of each room for the required capacity (or,
+        with a column of required capacities, one row per capacity)"""
+        _filter = self.room_capacities < required_capacity
+        capacity_costs = self._calculate_costs(self.room_capacities, required_capacity)
+        return np.where(_filter, self.unavailable_cost, capacity_costs)
+
+    def precompute(self, table: NDArray | None = None) -> NDArray:
+        """
+        Builds a lookup table with the cost of each room for every
+        required capacity from 0 to the largest room capacity. Row
+        `max capacity + 1` holds the costs of any larger requirement,
+        for which all rooms are too small.
+
+        Args:
+            table: a table built previously for the same rooms and
+                parameters. It is rebuilt if its shape does not match.
+
+        Returns:
+            The lookup table, of shape (max capacity + 2, n_rooms).
+        """
+        n_capacities = self.room_capacities.max(initial=0) + 2
+        if table is None or table.shape != (n_capacities, self.n_rooms):
+            required = np.arange(n_capacities)[:, np.newaxis]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                table = self._get_room_costs(required)
+        table.flags.writeable = False
+        self._table = table
+        return table
+
+    def run_factor(
+        self, state: NDArray, required_capacity: int = 10, **kwargs
+    ) -> NDArray:
+        """
+        Calculate the capacity cost of each room, setting the cost to a
+        very high number if the room is too small.
+
+        Args:
+            state: ones and zeros representing bookings. Unused, since
+                room capacities are fixed across time.
+            required_capacity: required room capacity to
+                hold the party of the booker.
+
+        Returns:
+            cost: where the lower the better and very high if room
+                is too small. Shape = (n_rooms,). It may be a read-only
+                row of the lookup table.
+        """
+        table = self._table
+        # non-negative integer requirements are looked up, see `precompute`
+        if table is not None and required_capacity >= 0:
+            if float(required_capacity).is_integer():
+                row = min(int(required_capacity), table.shape[0] - 1)
+                return table[row]
+        return self._get_room_costs(required_capacity)
+
     def run(
         self, state: NDArray, n_time_slots: int, required_capacity: int = 10, **kwargs
     ) -> NDArray:
@@ -64,19 +122,18 @@ class CapacityCost(CostModel):
 
         Args:
             state: ones and zeros representing bookings
-                shape = (n_rooms, n_time_slots)
+                shape = (n_rooms*n_time_slots,), or a batch of states
+                of shape (n_states, n_rooms*n_time_slots)
             n_time_slots: number of time slots to consider
             required_capacity: required room capacity to
                 hold the party of the booker.
 
         Returns:
             cost: where the lower the better and very high if room
-                is too small. Shape = (n_rooms*n_time_slots,)
+                is too small. Same shape as the state; for a batch,
+                a read-only view broadcasting the same costs to all states.
         """
-
-        _filter = self.room_capacities < required_capacity
-        capacity_costs = self._calculate_costs(self.room_capacities, required_capacity)
-        room_costs = np.where(_filter, self.unavailable_cost, capacity_costs)
+        room_costs = self.run_factor(state, required_capacity=required_capacity)
 
         # return explodes capacities to match state shape
-        return np.tile(room_costs, n_time_slots)
+        return expand_factor(room_costs, self.factor, state, n_time_slots)
@@ -1,52 +1,188 @@
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
+import scipy.sparse as sp
 from numpy.typing import NDArray
 
-from thermo.config import UNAVAILABLE_COST
+from thermo.config import (
+    COMPONENT_MIN_ROOMS,
+    MATRIX_FREE_MIN_ROOMS,
+    UNAVAILABLE_COST,
+)
 from thermo.costs.base import CostModel
-from thermo.graph.adjacency import get_time_adjacency
+from thermo.graph.adjacency import (
+    connected_components,
+    get_time_neighbors,
+    time_adjacency_gather,
+    time_adjacency_matvec,
+)
+from thermo.graph.cache import adjacency_hash, get_cached_time_adjacency
 
 
 class HeatingCost(CostModel):
     def __init__(
         self,
         *,
-        adjacency: NDArray,
+        adjacency: NDArray | sp.spmatrix,
         t_weight: float = 1.0,
         message_importance: float = 0.5,
         heat_cost: NDArray | None = None,
         unavailable_cost: float = UNAVAILABLE_COST,
+        matrix_free: bool | None = None,
+        max_workers: int | None = None,
+        min_component_rooms: int = COMPONENT_MIN_ROOMS,
         **kwargs
     ):
         """
         Class to simulate the heating cost of a room.
         Args:
-            adjacency: Adjacency matrix for space (n_rooms x n_rooms)
-                tb_added.
+            adjacency: Adjacency matrix for space (n_rooms x n_rooms),
+                dense or sparse. It is stored in sparse (CSR) format.
             unavailable_cost: number associated to the room already
                 being booked
             t_weight: weight of time in the adjacency matrix
             message_importance: weight of the message in the cost
                 function
             heat_cost: cost of heating each room
+            matrix_free: if True, the messages are computed slot by slot
+                from the spatial adjacency, without building the
+                time-space adjacency matrix. If None, it is enabled for
+                buildings with at least `config.MATRIX_FREE_MIN_ROOMS`
+                rooms.
+            max_workers: if given, and the building graph has several
+                connected components, they are evaluated concurrently by
+                a pool of this many threads, stopped by `close`.
+            min_component_rooms: components with fewer rooms are
+                evaluated together rather than one by one.
+
+        If the graph of the building splits into connected components
+        (e.g. the wings of a school, or the buildings of a campus), no
+        message goes from one to another. The messages are then computed
+        for each component on its own, smaller, graph, whose time-space
+        adjacency is cached separately (see `thermo.graph.cache`), and
+        scattered back into the costs of the building.
         """
-        self.As = adjacency
+        self.As = sp.csr_matrix(adjacency, dtype=float)
+        self._As_csc = self.As.tocsc()
         self.n_rooms = self.As.shape[0]
         self.t_weight = t_weight
         self.message_importance = message_importance
-        self.heat_cost = heat_cost if heat_cost else np.ones(self.n_rooms)
+        self.heat_cost = heat_cost if heat_cost is not None else np.ones(self.n_rooms)
         self.unavailable_cost = unavailable_cost
+        self.matrix_free = (
+            self.n_rooms >= MATRIX_FREE_MIN_ROOMS
+            if matrix_free is None
+            else matrix_free
+        )
+        self.adjacency_key = adjacency_hash(self.As)
 
-    @lru_cache(maxsize=5)
-    def _get_full_graph(self, n_time_slots: int):
-        return get_time_adjacency(
-            A=self.As, n_times=n_time_slots, time_weight=self.t_weight
+        self.components = self._split_components(min_component_rooms)
+        self._component_graphs: list[tuple[sp.csr_matrix, str, bool]] = []
+        if self.components is not None:
+            for component in self.components:
+                As = self.As[component][:, component]
+                component_matrix_free = (
+                    len(component) >= MATRIX_FREE_MIN_ROOMS
+                    if matrix_free is None
+                    else matrix_free
+                )
+                graph = (As, adjacency_hash(As), component_matrix_free)
+                self._component_graphs.append(graph)
+        self._executor = (
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="heating")
+            if max_workers and self.components is not None
+            else None
         )
 
-    @lru_cache(maxsize=5)
-    def _get_full_cost(self, n_time_slots: int):
-        return np.hstack([self.heat_cost] * n_time_slots)
+    def close(self) -> None:
+        """Stops the threads evaluating the components, if any"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def _split_components(self, min_rooms: int) -> list[NDArray] | None:
+        """
+        Rooms of each connected component of the building, in order. The
+        components with fewer than `min_rooms` rooms are merged into one
+        group, which is also disconnected from the others.
+
+        Returns:
+            The room indices of each group, or None if there is only one.
+        """
+        n_components, labels = connected_components(self.As)
+        sizes = np.bincount(labels, minlength=n_components)
+        small = sizes < min_rooms
+        if small.any():
+            # relabel the small components as one, after the others
+            groups = np.cumsum(~small) - 1
+            groups[small] = groups[-1] + 1
+            labels = groups[labels]
+            n_components = groups.max() + 1
+            sizes = np.bincount(labels, minlength=n_components)
+        if n_components <= 1:
+            return None
+        rooms = np.argsort(labels, kind="stable")
+        return np.split(rooms, np.cumsum(sizes)[:-1])
+
+    def _get_full_graph(self, n_time_slots: int) -> sp.csr_matrix:
+        """Time-space adjacency for `n_time_slots`, shared by all heating
+        costs of the same building (see `thermo.graph.cache`)"""
+        return get_cached_time_adjacency(
+            self.As,
+            n_times=n_time_slots,
+            time_weight=self.t_weight,
+            adjacency_key=self.adjacency_key,
+        )
+
+    def _get_graph_messages(
+        self,
+        As: sp.csr_matrix,
+        adjacency_key: str,
+        matrix_free: bool,
+        state: NDArray,
+        n_time_slots: int,
+    ) -> NDArray:
+        """Messages received by each room-time node of a graph from its
+        booked neighbors"""
+        if matrix_free:
+            return time_adjacency_matvec(
+                As, state, n_times=n_time_slots, time_weight=self.t_weight
+            )
+        graph = get_cached_time_adjacency(
+            As,
+            n_times=n_time_slots,
+            time_weight=self.t_weight,
+            adjacency_key=adjacency_key,
+        )
+        return (graph @ state.T).T
+
+    def _get_messages(self, state: NDArray, n_time_slots: int) -> NDArray:
+        """Messages received by each room-time node from its booked
+        neighbors, component by component if the graph splits"""
+        if self.components is None:
+            return self._get_graph_messages(
+                self.As, self.adjacency_key, self.matrix_free, state, n_time_slots
+            )
+
+        batch_shape = state.shape[:-1]
+        states = state.reshape(*batch_shape, n_time_slots, self.n_rooms)
+        messages = np.empty(states.shape)
+
+        def evaluate(i: int) -> None:
+            rooms = self.components[i]  # type: ignore[index]
+            component_state = states[..., rooms].reshape(*batch_shape, -1)
+            component_messages = self._get_graph_messages(
+                *self._component_graphs[i], component_state, n_time_slots
+            )
+            messages[..., rooms] = component_messages.reshape(
+                *batch_shape, n_time_slots, len(rooms)
+            )
+
+        if self._executor is None:
+            for i in range(len(self.components)):
+                evaluate(i)
+        else:
+            list(self._executor.map(evaluate, range(len(self.components))))
+        return messages.reshape(state.shape)
 
     def run(self, state: NDArray, n_time_slots: int, **kwargs) -> NDArray:
         """
@@ -55,17 +191,104 @@ class HeatingCost(CostModel):
 
         Args:
             state: ones and zeros representing bookings
-                shape = (n_rooms*n_time_slots,),
+                shape = (n_rooms*n_time_slots,), or a batch of states of
+                shape (n_states, n_rooms*n_time_slots). A batch is
+                computed with a single matrix-matrix product.
             n_time_slots: number of time slots in the schedule
                 (per day)
 
         Returns:
             cost_vector: where the lower the better.
-                shape = (n_rooms*n_time_slots,),
+                Same shape as the state,
                 if room already booked, its np.nan
         """
-        self.A = self._get_full_graph(n_time_slots=n_time_slots)
-        self._full_heat_cost = self._get_full_cost(n_time_slots=n_time_slots)
+        messages = self._get_messages(state, n_time_slots=n_time_slots)
+        out = self.unavailable_cost * state - self.message_importance * messages
+        # add the heating cost of each room to every time slot, in place
+        out.reshape(*out.shape[:-1], n_time_slots, self.n_rooms)[...] += self.heat_cost
+        return out
 
-        out = self._full_heat_cost - self.message_importance * np.matmul(self.A, state)
-        return self.unavailable_cost * state + out
+    def run_masked(
+        self, state: NDArray, mask: NDArray, n_time_slots: int, **kwargs
+    ) -> NDArray:
+        """
+        Compute the cost of the possible bookings selected by `mask`, e.g.
+        those still feasible after evaluating cheaper costs. The messages
+        are only computed for the selected rows of the time-space graph,
+        as a gathered sparse product.
+
+        Args:
+            state: ones and zeros representing bookings
+                shape = (n_rooms*n_time_slots,)
+            mask: boolean array of the same shape as the state.
+            n_time_slots: number of time slots in the schedule
+                (per day)
+
+        Returns:
+            The costs of the selected bookings, in order.
+        """
+        indices = np.flatnonzero(mask)
+        if self.matrix_free:
+            messages = time_adjacency_gather(
+                self.As, state, indices, n_times=n_time_slots, time_weight=self.t_weight
+            )
+        else:
+            messages = self._get_full_graph(n_time_slots=n_time_slots)[indices] @ state
+
+        # same operations, in the same order, as in `run`
+        out = (
+            self.unavailable_cost * state[indices] - self.message_importance * messages
+        )
+        out += self.heat_cost[indices % self.n_rooms]
+        return out
+
+    def delta(
+        self,
+        state: NDArray,
+        n_time_slots: int,
+        changed_indices: NDArray,
+        new_values: NDArray,
+        **kwargs
+    ) -> tuple[NDArray, NDArray]:
+        """
+        Computes how the costs change when the entries `changed_indices`
+        of the state are set to `new_values`. Only the changed nodes and
+        their neighbors in the time-space graph are updated, which takes
+        O(degree) time per changed node.
+
+        Args:
+            state: ones and zeros representing bookings before the change,
+                shape = (n_rooms*n_time_slots,)
+            n_time_slots: number of time slots in the schedule
+                (per day)
+            changed_indices: flat indices of the entries of the state
+                that change. If an index repeats, its last value wins, as
+                when assigning `state[changed_indices] = new_values`.
+            new_values: new values of those entries.
+
+        Returns:
+            A tuple (indices, differences) with the flat indices of the
+            costs that change and how much they change.
+        """
+        changed_indices = np.asarray(changed_indices, dtype=int)
+        new_values = np.broadcast_to(
+            np.asarray(new_values, dtype=float), changed_indices.shape
+        )
+        # first occurrence of each index from the end, i.e. its last value
+        changed_indices, last = np.unique(changed_indices[::-1], return_index=True)
+        new_values = new_values[::-1][last]
+        change = new_values - state[changed_indices]
+        rows, columns, weights = get_time_neighbors(
+            self._As_csc,
+            changed_indices,
+            n_times=n_time_slots,
+            time_weight=self.t_weight,
+        )
+        indices = np.concatenate([changed_indices, rows])
+        differences = np.concatenate(
+            [
+                self.unavailable_cost * change,
+                -self.message_importance * weights * change[columns],
+            ]
+        )
+        return indices, differences
@@ -1,19 +1,28 @@
 import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.csgraph as csgraph
 from numpy.typing import NDArray
 
 
-def is_symmetric(A: NDArray) -> bool:
+def is_symmetric(A: NDArray | sp.spmatrix) -> bool:
     """
     Function to check if an adjacency matrix A is symmetric.
 
     We are using undirected graphs, so A not being symmetric
     would mean that room 1 shares a wall with room 2 but 2 doesn't
     share a wall with room 1.
+
+    The check is done on the sparse (CSR) structure of A, in time
+    linear in its number of edges.
     """
-    return np.allclose(A, A.T)
+    A = sp.csr_matrix(A, dtype=float)
+    if A.shape[0] != A.shape[1]:
+        return False
+    difference = abs(A - A.T)
+    return difference.nnz == 0 or np.allclose(difference.data, 0)
 
 
-def no_self_interactions(A: NDArray) -> bool:
+def no_self_interactions(A: NDArray | sp.spmatrix) -> bool:
     """
     Function to check that the adjacency matrix does not contain
     self-interactions.
@@ -22,23 +31,23 @@ def no_self_interactions(A: NDArray) -> bool:
     terms of the diagonal were non-zero, it would mean that a room
     shares a wall with itself.
     """
-    return np.sum(np.diag(A) ** 2) == 0.0
+    return not sp.csr_matrix(A).diagonal().any()
 
 
-def get_degree_vector(A: NDArray) -> NDArray:
+def get_degree_vector(A: NDArray | sp.spmatrix) -> NDArray:
     """
     Given an adjacency matrix A of size NxN, returns
     a vector of size N with the degree of each node.
 
     The degree of a node is the number of neighbors it has.
     """
-    return A.sum(axis=1)
+    return np.asarray(A.sum(axis=1)).ravel()
 
 
-def get_laplacian(A: NDArray) -> NDArray:
+def get_laplacian(A: NDArray | sp.spmatrix) -> NDArray | sp.spmatrix:
     """
     Given an adjacency matrix A of size NxN, returns its
-    Laplacian matrix L of size NxN.
+    Laplacian matrix L of size NxN, sparse if A is sparse.
 
     https://en.wikipedia.org/wiki/Laplacian_matrix
 
@@ -49,65 +58,247 @@ def get_laplacian(A: NDArray) -> NDArray:
     if done repeatedly, results in all the entries of v having the
     same value if there is a path that connects any pair of them.
     """
+    if sp.issparse(A):
+        return sp.csr_matrix(sp.diags(get_degree_vector(A), dtype=A.dtype) - A)
     D = np.diag(get_degree_vector(A))
     return D - A
 
 
-def is_connected(A: NDArray) -> bool:
+def connected_components(A: NDArray | sp.spmatrix) -> tuple[int, NDArray]:
+    """
+    Splits a graph into its connected components: groups of nodes with a
+    path between any pair of them, and none to the other nodes (e.g. the
+    wings of a school, or the buildings of a campus).
+
+    It is done with a breadth-first search on the sparse (CSR) structure
+    of A, in time linear in the number of nodes and edges.
+
+    Args:
+        A: adjacency matrix of an undirected graph, dense or sparse.
+
+    Returns:
+        The number of components, and the component of each node,
+            numbered from 0 in the order of their first node.
+    """
+    n_components, labels = csgraph.connected_components(
+        sp.csr_matrix(A), directed=False
+    )
+    return n_components, labels
+
+
+def is_connected(A: NDArray | sp.spmatrix) -> bool:
     """
     Checks if there is a path connecting any pair of nodes.
-    If there is not, then the graph can be split into two subgraphs.
+    If there is not, then the graph can be split into two subgraphs
+    (see `connected_components`).
+    """
+    n_components, _ = connected_components(A)
+    return n_components <= 1
 
-    It is done by looking at the eigenvalues of the Laplacian matrix
-    (there are other ways to do this).
 
-    Since the eigenvalues are computed numerically, they will not be exactly
-    zero. So to check that, we check that the eigenvalue that should be zero
-    divided by the largest eigenvalue are similar to machine precision
-    (which for double floats is about 1e-16).
+def validate_adjacency(A: NDArray | sp.spmatrix) -> list[str]:
+    """
+    Checks that an adjacency matrix is that of an undirected, connected
+    and non-weighted graph without self-interactions, as expected by the
+    costs. All checks run on the sparse structure of the matrix, in time
+    linear in its number of edges.
+
+    Args:
+        A: adjacency matrix of the rooms, dense or sparse.
+
+    Returns:
+        A description of each failed check, empty if the matrix is valid.
     """
-    L = get_laplacian(A)
-    # Get the eigenvalues of the Laplacian matrix.
-    # Use that the laplacian is symmetric to speed-up the computation.
-    v = np.linalg.eigvalsh(L)  # sorted in ascending order
-    # Check the Laplacian has one zero eigenvalue and the others are >= 0
-    # This should be fulfilled by all Laplacians, otherwise A is wrong in some way.
-    is_laplacian = np.abs(v[0] / v[-1]) < 1e-14 and np.all(v[1:] >= 0)
-    # Check that the laplacian has no other zero eigenvalues.
-    # If it had other zero eigenvalues, it would mean the graph can be split.
-    fieldler_icond = v[1] / v[-1]
-    return np.all((is_laplacian, fieldler_icond >= 1e-14)).item()
+    A = sp.csr_matrix(A, dtype=float, copy=True)
+    if A.shape[0] != A.shape[1]:
+        return [f"The adjacency of shape {A.shape} is not square."]
+    A.sum_duplicates()
+    A.eliminate_zeros()
+    errors = []
+    if not is_symmetric(A):
+        errors.append("The adjacency is not symmetric.")
+    if not no_self_interactions(A):
+        errors.append("The graph includes self-interactions.")
+    if not np.all(A.data == 1):
+        errors.append("The graph is a weighted graph.")
+    n_components, _ = connected_components(A)
+    if n_components > 1:
+        errors.append(f"The graph could be split into {n_components} graphs.")
+    return errors
 
 
-def get_time_adjacency(A: NDArray, n_times: int, time_weight: float = 1.0) -> NDArray:
+def get_time_adjacency(
+    A: NDArray | sp.spmatrix, n_times: int, time_weight: float = 1.0
+) -> sp.csr_matrix:
     """
     Get the adjacency matrix of the graph that contains a copy of the school
     for each time slot and where rooms are connected to themselves in the past
     and in the future (see documentation).
 
+    The matrix is built as a sum of Kronecker products,
+    I_t ⊗ A + λ T ⊗ I_r, where T is the tridiagonal matrix connecting
+    consecutive time slots. It is returned in sparse (CSR) format, so its
+    memory grows linearly with the number of rooms times the number of
+    time slots instead of quadratically.
+
     Args:
         A: Adjacency matrix of the school, where 1 represents two rooms share
-            a wall and 0 represents they don't.
+            a wall and 0 represents they don't. Can be dense or sparse.
         n_times: number of time slots.
         time_weight: Relative weight between the time and spatial components.
             (In the documentation it's called lambda).
 
     Returns:
         The time-space adjacency matrix for the graph representing the bookings
-        of a school.
+        of a school, of shape (n_rooms*n_times, n_rooms*n_times).
+    """
+    A = sp.csr_matrix(A, dtype=float)
+    n = A.shape[0]
+    time_links = sp.diags(
+        [np.ones(n_times - 1), np.ones(n_times - 1)], offsets=[-1, 1], format="csr"
+    )
+    space = sp.kron(sp.identity(n_times, format="csr"), A, format="csr")
+    time = sp.kron(time_links, sp.identity(n, format="csr"), format="csr")
+    return (space + time_weight * time).tocsr()
+
+
+def time_adjacency_matvec(
+    A: NDArray | sp.spmatrix, x: NDArray, n_times: int, time_weight: float = 1.0
+) -> NDArray:
+    """
+    Multiply a vector, or a batch of vectors, by the time-space adjacency
+    matrix of the school, without building that matrix
+    (see `get_time_adjacency`).
+
+    Each vector is reshaped to a (n_times, n_rooms) schedule S, so that
+    each time slot receives the spatial messages S @ A.T plus
+    `time_weight` times the schedule of the slots right before and right
+    after it. This takes O(n_times * nnz(A)) time and O(n_times * n_rooms)
+    memory per vector.
+
+    Args:
+        A: Adjacency matrix of the school (n_rooms x n_rooms).
+        x: flat array of shape (n_rooms*n_times,), or a batch of them
+            of shape (n_vectors, n_rooms*n_times).
+        n_times: number of time slots.
+        time_weight: Relative weight between the time and spatial components.
+
+    Returns:
+        The product of the time-space adjacency matrix and x,
+        with the same shape as x.
+    """
+    x = np.asarray(x)
+    n_rooms = A.shape[0]
+    S = x.reshape(-1, n_times, n_rooms)
+    out = np.asarray(A @ S.reshape(-1, n_rooms).T, dtype=float).T
+    out = out.reshape(S.shape)
+    out[:, 1:] += time_weight * S[:, :-1]
+    out[:, :-1] += time_weight * S[:, 1:]
+    return out.reshape(x.shape)
+
+
+def _get_stored_entries(A: sp.spmatrix, slices: NDArray) -> tuple[NDArray, NDArray]:
+    """
+    For a compressed sparse matrix (CSR or CSC), finds the stored entries of
+    some of its rows (CSR) or columns (CSC).
+
+    Returns:
+        A tuple (positions, entries), where positions are the positions in
+        `slices` each entry belongs to, and entries are the indices of the
+        entries in `A.data` and `A.indices`.
+    """
+    starts = A.indptr[slices]
+    counts = A.indptr[slices + 1] - starts
+    positions = np.repeat(np.arange(slices.size), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return positions, np.repeat(starts, counts) + offsets
+
+
+def get_time_neighbors(
+    A: NDArray | sp.spmatrix, indices: NDArray, n_times: int, time_weight: float = 1.0
+) -> tuple[NDArray, NDArray, NDArray]:
+    """
+    Get the non-zero entries of some columns of the time-space adjacency
+    matrix (see `get_time_adjacency`), without building it. These are the
+    nodes that receive a message from each of the nodes in `indices`.
+
+    It runs in O(degree) time per node, which is what allows to update
+    the costs locally when a single booking changes.
+
+    Args:
+        A: Adjacency matrix of the school (n_rooms x n_rooms). Passing it in
+            CSC format avoids a conversion.
+        indices: flat indices of the nodes in the time-space graph.
+        n_times: number of time slots.
+        time_weight: Relative weight between the time and spatial components.
+
+    Returns:
+        A tuple (rows, columns, weights), where rows are the flat indices of
+        the neighbors, columns are the positions in `indices` of the node
+        they are connected to and weights are the entries of the time-space
+        adjacency matrix.
     """
+    A = sp.csc_matrix(A)
     n = A.shape[0]
-    eye = time_weight * np.eye(n)
-    zero = np.zeros((n, n))
-
-    def choose_block(i: int, j: int) -> NDArray:
-        if i == j:
-            return A
-        elif i - 1 == j or i + 1 == j:
-            return eye
-        else:
-            return zero
-
-    return np.block(
-        [[choose_block(i, j) for i in range(n_times)] for j in range(n_times)]
+    indices = np.asarray(indices, dtype=int)
+    times, rooms = np.divmod(indices, n)
+
+    # neighbors in space: rooms sharing a wall, in the same time slot
+    space_cols, entries = _get_stored_entries(A, rooms)
+    space_rows = times[space_cols] * n + A.indices[entries]
+
+    # neighbors in time: the same room, right before and right after
+    before = np.flatnonzero(times > 0)
+    after = np.flatnonzero(times < n_times - 1)
+    time_cols = np.concatenate([before, after])
+    time_rows = np.concatenate([indices[before] - n, indices[after] + n])
+
+    rows = np.concatenate([space_rows, time_rows])
+    columns = np.concatenate([space_cols, time_cols])
+    weights = np.concatenate(
+        [A.data[entries], np.full(time_cols.size, time_weight, dtype=float)]
     )
+    return rows, columns, weights
+
+
+def time_adjacency_gather(
+    A: NDArray | sp.spmatrix,
+    x: NDArray,
+    indices: NDArray,
+    n_times: int,
+    time_weight: float = 1.0,
+) -> NDArray:
+    """
+    Computes some entries of the product of the time-space adjacency matrix
+    (see `get_time_adjacency`) and a vector, without building the matrix nor
+    computing the other entries. Only the rows of `A` of the rooms in
+    `indices` are gathered, so it takes O(degree) time per entry.
+
+    Args:
+        A: Adjacency matrix of the school (n_rooms x n_rooms). Passing it in
+            CSR format avoids a conversion.
+        x: flat array of shape (n_rooms*n_times,).
+        indices: flat indices of the entries of the product to compute.
+        n_times: number of time slots.
+        time_weight: Relative weight between the time and spatial components.
+
+    Returns:
+        The entries `indices` of the product, of shape (len(indices),).
+    """
+    A = sp.csr_matrix(A)
+    n = A.shape[0]
+    S = np.asarray(x).reshape(n_times, n)
+    indices = np.asarray(indices, dtype=int)
+    times, rooms = np.divmod(indices, n)
+
+    # messages in space: rooms sharing a wall, in the same time slot
+    positions, entries = _get_stored_entries(A, rooms)
+    messages = A.data[entries] * S[times[positions], A.indices[entries]]
+    out = np.bincount(positions, weights=messages, minlength=indices.size)
+
+    # messages in time: the same room, right before and right after
+    before = times > 0
+    after = times < n_times - 1
+    out[before] += time_weight * S[times[before] - 1, rooms[before]]
+    out[after] += time_weight * S[times[after] + 1, rooms[after]]
+    return out
@@ -0,0 +1,170 @@
+"""
+Process-wide cache of time-space adjacency matrices.
+
+The time-space adjacency of a building only depends on its spatial
+adjacency, the number of time slots and the weight of time. The matrices
+are cached once per process, keyed by a hash of the content of the
+spatial adjacency, so that every cost model (and every recommender) of
+the same building shares them. The cache is bounded by the memory of the
+stored matrices, and the least recently used ones are evicted first.
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Hashable
+
+import numpy as np
+import scipy.sparse as sp
+
+from thermo.config import GRAPH_CACHE_MAX_BYTES
+from thermo.graph.adjacency import get_time_adjacency
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    """Statistics of a `GraphCache`."""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    nbytes: int
+    max_bytes: int
+
+
+def sparse_nbytes(matrix: sp.spmatrix) -> int:
+    """Memory used by the arrays of a sparse matrix in CSR/CSC format"""
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def adjacency_hash(A: sp.spmatrix) -> str:
+    """
+    Hash of the content of an adjacency matrix. Equal matrices have equal
+    hashes, however they were stored or built.
+
+    Args:
+        A: adjacency matrix, dense or sparse
+
+    Returns:
+        The hexadecimal digest of the matrix.
+    """
+    # a copy, since the matrix may be shared or read-only (memory-mapped)
+    A = sp.csr_matrix(A, dtype=float, copy=True)
+    A.sum_duplicates()
+    A.eliminate_zeros()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(A.shape, dtype=np.int64).tobytes())
+    for array in (A.indptr, A.indices):
+        digest.update(array.astype(np.int64).tobytes())
+    digest.update(A.data.tobytes())
+    return digest.hexdigest()
+
+
+class GraphCache:
+    def __init__(self, max_bytes: int = GRAPH_CACHE_MAX_BYTES):
+        """
+        Thread-safe LRU cache of sparse matrices, bounded by the memory
+        of the stored matrices. A matrix larger than the whole budget is
+        returned but not stored.
+
+        Args:
+            max_bytes: memory budget of the stored matrices
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, sp.csr_matrix] = OrderedDict()
+        self._lock = Lock()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, build: Callable[[], sp.csr_matrix]) -> sp.csr_matrix:
+        """
+        Gets the matrix stored for `key`, building and storing it on a
+        miss. The matrix is built outside the lock, so concurrent misses
+        of the same key may build it twice, but only the first one is kept.
+
+        Args:
+            key: key of the matrix
+            build: function building the matrix
+
+        Returns:
+            The cached matrix
+        """
+        with self._lock:
+            matrix = self._entries.get(key)
+            if matrix is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return matrix
+            self._misses += 1
+
+        matrix = build()
+        nbytes = sparse_nbytes(matrix)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            if nbytes > self.max_bytes:
+                return matrix
+            while self._nbytes + nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= sparse_nbytes(evicted)
+                self._evictions += 1
+            self._entries[key] = matrix
+            self._nbytes += nbytes
+        return matrix
+
+    def info(self) -> CacheInfo:
+        """Current statistics of the cache"""
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+                nbytes=self._nbytes,
+                max_bytes=self.max_bytes,
+            )
+
+    def clear(self) -> None:
+        """Removes all matrices and resets the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+
+GRAPH_CACHE = GraphCache()
+
+
+def get_cached_time_adjacency(
+    A: sp.spmatrix,
+    n_times: int,
+    time_weight: float = 1.0,
+    adjacency_key: str | None = None,
+) -> sp.csr_matrix:
+    """
+    Time-space adjacency matrix (see `get_time_adjacency`), shared through
+    `GRAPH_CACHE` by all callers with the same spatial adjacency.
+
+    Args:
+        A: spatial adjacency matrix (n_rooms x n_rooms)
+        n_times: number of time slots
+        time_weight: weight of the edges between consecutive time slots
+        adjacency_key: `adjacency_hash(A)`, if already known.
+
+    Returns:
+        The (read-only) time-space adjacency matrix, in CSR format.
+    """
+    if adjacency_key is None:
+        adjacency_key = adjacency_hash(A)
+
+    def build() -> sp.csr_matrix:
+        graph = get_time_adjacency(A=A, n_times=n_times, time_weight=time_weight)
+        for array in (graph.data, graph.indices, graph.indptr):
+            array.flags.writeable = False
+        return graph
+
+    return GRAPH_CACHE.get((adjacency_key, n_times, float(time_weight)), build)
@@ -1,4 +1,3 @@
-import networkx as nx
 from numpy.typing import NDArray
 
 
@@ -34,6 +33,8 @@ def generate_adjacency_matrix(
         NDArray: a random adjacency matrix of shape
         (n_rooms, n_rooms)
     """
+    # networkx is only needed here, and is slow to import
+    import networkx as nx
 
     p = p if p else n_rooms**-0.5
     G = nx.generators.random_graphs.gnp_random_graph(n_rooms, p=p, seed=seed)
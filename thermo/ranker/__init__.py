@@ -3,9 +3,10 @@ from typing import Literal
 from thermo.costs.base import CostModel
 from thermo.ranker.base import Ranker
 from thermo.ranker.full import FullRanker
+from thermo.ranker.topk import TopKRanker
 
-RankerName = Literal["FullRanker"]
-"""Names of all Ranker classes in `thermo`: `FullRanker`"""
+RankerName = Literal["FullRanker", "TopKRanker"]
+"""Names of all Ranker classes in `thermo`: `FullRanker`, `TopKRanker`"""
 
 
 def make_ranker(ranker_name: RankerName, costs: list[CostModel], **kwargs) -> Ranker:
@@ -21,9 +22,12 @@ def make_ranker(ranker_name: RankerName, costs: list[CostModel], **kwargs) -> Ra
     Returns:
         an instance of the `ranker_name` class.
     """
+    ranker: type[Ranker]
     match ranker_name:
         case "FullRanker":
             ranker = FullRanker
+        case "TopKRanker":
+            ranker = TopKRanker
         case _:
             raise NotImplementedError(f"Ranker {ranker_name} not implemented")
 
@@ -1,9 +1,124 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Hashable, Iterable
 
+import numpy as np
 from numpy.typing import NDArray
 
 from thermo.costs import CostModel
+from thermo.costs.base import CostFactor
+
+
+def add_factor(out: NDArray, costs: NDArray, factor: CostFactor) -> NDArray:
+    """
+    Adds, in place, costs in factorized form (see
+    `thermo.costs.CostModel.run_factor`) to `out`, broadcasting them
+    along the axes they do not vary along.
+
+    Args:
+        out: costs of the same shape as the state.
+        costs: factorized costs to add.
+        factor: axes the costs vary along.
+
+    Returns:
+        out, with the costs added.
+    """
+    # views of the output with one axis for time slots and one for rooms
+    match factor:
+        case "room":
+            by_room = out.reshape(*out.shape[:-1], -1, costs.size)
+            by_room += costs
+        case "slot":
+            by_slot = out.reshape(*out.shape[:-1], costs.size, -1)
+            by_slot += costs[:, np.newaxis]
+        case _:
+            out += costs
+    return out
+
+
+def add_factors(
+    out: NDArray, costs: list[CostModel], state: NDArray, **kwargs
+) -> NDArray:
+    """
+    Adds, in place, the costs that only vary with the room or with the
+    time slot (see `thermo.costs.CostModel.factor`) to `out`. They are
+    added up in factorized form and broadcast once. Costs with a `full`
+    factor are skipped.
+
+    Args:
+        out: costs of the same shape as the state.
+        costs: cost models to add.
+        state: a flat array containing 1 if the room is booked
+            at that time a zero otherwise, or a batch of states.
+        kwargs: other possible arguments to the run method of the costs.
+
+    Returns:
+        out, with the factorized costs added.
+    """
+    factorized = [
+        (cost.factor, cost.run_factor(state, **kwargs))
+        for cost in costs
+        if cost.factor != "full"
+    ]
+    return add_factorized(out, factorized)
+
+
+def add_factorized(
+    out: NDArray, factorized: Iterable[tuple[CostFactor, NDArray]]
+) -> NDArray:
+    """
+    Adds, in place, costs already computed in factorized form to `out`,
+    as `add_factors` does: the costs of each factor are added up first,
+    in order, and broadcast once.
+
+    Args:
+        out: costs of the same shape as the state.
+        factorized: factor and factorized costs of each cost model.
+
+    Returns:
+        out, with the factorized costs added.
+    """
+    factors: dict[CostFactor, NDArray] = {}
+    for factor, costs_factor in factorized:
+        if factor in factors:
+            factors[factor] = factors[factor] + costs_factor
+        else:
+            factors[factor] = costs_factor
+
+    for factor, costs_factor in factors.items():
+        add_factor(out, costs_factor, factor)
+    return out
+
+
+def _hashable(value: Any) -> Hashable:
+    """Hashable version of a requirement, e.g. a set of amenities"""
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return value
+
+
+def group_requirements(
+    requirements: list[dict[str, Any]], names: tuple[str, ...]
+) -> list[list[int]]:
+    """
+    Groups the requests of a batch that agree on the requirements `names`.
+
+    Args:
+        requirements: run-time keyword arguments of each request.
+        names: requirements to group by, e.g. `CostModel.requirements`.
+
+    Returns:
+        The indices of the requests of each group.
+    """
+    groups: dict[tuple, list[int]] = {}
+    for i, request in enumerate(requirements):
+        key = tuple(
+            _hashable(request[name]) if name in request else (None, "missing")
+            for name in names
+        )
+        groups.setdefault(key, []).append(i)
+    return list(groups.values())
 
 
 class Ranker(ABC):
@@ -26,10 +141,74 @@ class Ranker(ABC):
 
         Args:
             state: a flat array containing 1 if the room is booked
-                at that time a zero otherwise.
+                at that time a zero otherwise. It can also be a batch
+                of states, of shape (n_states, n_rooms*n_time_slots).
             kwargs: other possible arguments to the run method.
 
         Returns:
             An array of the same shape as the state, containing the costs.
         """
         pass
+
+    def close(self) -> None:
+        """Releases the resources of the ranker and of its costs, e.g. their
+        thread pools"""
+        for cost in self.costs:
+            cost.close()
+
+    def run_batch(
+        self, state: NDArray, requirements: list[dict[str, Any]], **kwargs
+    ) -> NDArray:
+        """
+        Computes the costs of several requests for the same booking state,
+        e.g. users looking for rooms of different capacities on the same
+        day.
+
+        The base implementation runs the ranker once per request.
+
+        Args:
+            state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise.
+            requirements: run-time keyword arguments of each request,
+                e.g. `{"required_capacity": 10}`.
+            kwargs: other possible arguments to the run method, shared
+                by all requests.
+
+        Returns:
+            An array of shape (n_requests, state size), with the costs of
+                each request.
+        """
+        return np.stack(
+            [self.run(state, **kwargs, **request) for request in requirements]
+        ).reshape(len(requirements), np.size(state))
+
+    def apply_delta(
+        self,
+        prev_ranking: NDArray,
+        changed_indices: NDArray,
+        new_values: NDArray,
+        state: NDArray,
+        **kwargs,
+    ) -> NDArray:
+        """
+        Updates, in place, a ranking computed for `state` after the entries
+        `changed_indices` of the state are set to `new_values`, e.g. after
+        a booking is made or cancelled.
+
+        The base implementation runs the ranker on the new state.
+
+        Args:
+            prev_ranking: output of the run method for `state`.
+            changed_indices: flat indices of the entries of the state
+                that change.
+            new_values: new values of those entries.
+            state: the state `prev_ranking` was computed for.
+            kwargs: other possible arguments to the run method.
+
+        Returns:
+            prev_ranking, updated to the new state.
+        """
+        new_state = state.copy()
+        new_state[changed_indices] = new_values
+        prev_ranking[...] = self.run(new_state, **kwargs)
+        return prev_ranking
@@ -1,8 +1,19 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
 import numpy as np
 from numpy.typing import NDArray
 
+from thermo.config import UNAVAILABLE_COST
 from thermo.costs import CostModel
-from thermo.ranker.base import Ranker
+from thermo.costs.base import CostFactor
+from thermo.ranker.base import (
+    Ranker,
+    add_factor,
+    add_factorized,
+    add_factors,
+    group_requirements,
+)
 
 
 class FullRanker(Ranker):
@@ -12,21 +23,241 @@ class FullRanker(Ranker):
     The total cost is computed as the sum of individual costs.
     Args:
         costs: list of instances of costs models to compute the costs from.
+        unavailable_cost: cost from which a room-time combination is
+            considered unavailable, and the remaining costs are not
+            evaluated for it.
+        max_workers: if given, the costs are evaluated concurrently by a
+            pool of this many threads, stopped by `close`. Set it in the
+            ranker section of the building config, e.g.
+            `ranker: {FullRanker: {max_workers: 4}}`.
     """
 
-    def __init__(self, costs: list[CostModel]):
+    def __init__(
+        self,
+        costs: list[CostModel],
+        unavailable_cost: float = UNAVAILABLE_COST,
+        max_workers: int | None = None,
+    ):
         super().__init__(costs=costs)
+        self.unavailable_cost = unavailable_cost
+        self.max_workers = max_workers
+        self._executor = (
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ranker")
+            if max_workers
+            else None
+        )
+
+    def close(self) -> None:
+        """Stops the thread pool, if any, and those of the costs"""
+        super().close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
 
     def run(self, state: NDArray, **kwargs) -> NDArray:
         """
         Adds up costs from individual cost sources, to return
         the cost of booking a given room for a given time slot.
+
+        Costs are evaluated in order of cheapness. Costs that only vary
+        with the room or with the time slot (see
+        `thermo.costs.CostModel.factor`) go first; they are added up in
+        factorized form and broadcast once, into the same output buffer
+        as the rest. The remaining costs are then only evaluated for the
+        room-time combinations that these costs leave available (see
+        `available` and `thermo.costs.CostModel.run_masked`). Unavailable
+        combinations thus get a cost of at least `unavailable_cost`, but
+        not the sum of all the costs.
+
+        With `max_workers`, all costs are instead evaluated concurrently
+        for all entries (see `run_parallel`). The costs with a `full`
+        factor are still only added on the available combinations, so
+        the ranking is the same.
+
         Args:
             state: state: a flat array containing 1 if the room is booked
-                at that time a zero otherwise.
+                at that time a zero otherwise. It can also be a batch
+                of states, of shape (n_states, n_rooms*n_time_slots),
+                in which case the costs with a `full` factor are
+                evaluated for all entries, and added on the available
+                ones.
             kwargs: other possible arguments to the run method.
 
         Returns:
             An array of the same shape as the state, containing the costs.
         """
-        return np.sum([cost.run(state, **kwargs) for cost in self.costs], axis=0)
+        if self._executor is not None:
+            return self.run_parallel(state, **kwargs)
+
+        out = add_factors(np.zeros(np.shape(state)), self.costs, state, **kwargs)
+        mask = out < self.unavailable_cost
+        for cost in self.costs:
+            if cost.factor != "full":
+                continue
+
+            if mask.all():
+                out += cost.run(state, **kwargs)
+            elif np.ndim(state) > 1:
+                out += np.where(mask, cost.run(state, **kwargs), 0.0)
+            elif mask.any():
+                out[mask] += cost.run_masked(state, mask, **kwargs)
+        return out
+
+    def available(self, state: NDArray, **kwargs) -> NDArray:
+        """
+        Room-time combinations for which the costs with a `full` factor
+        are evaluated: those whose costs that only vary with the room or
+        with the time slot (e.g. a room too small for the booking) are
+        below `unavailable_cost`. They do not depend on the booking
+        state, so a ranking updated with `apply_delta` keeps the same
+        ones as a fresh `run`.
+
+        Args:
+            state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise, or a batch of states.
+            kwargs: other possible arguments to the run method.
+
+        Returns:
+            A boolean array of the same shape as the state.
+        """
+        costs = add_factors(np.zeros(np.shape(state)), self.costs, state, **kwargs)
+        return costs < self.unavailable_cost
+
+    def run_parallel(self, state: NDArray, **kwargs) -> NDArray:
+        """
+        Evaluates all costs concurrently in the thread pool. NumPy and
+        SciPy release the GIL for the bulk of the work, so the heating
+        cost and the static costs of large buildings overlap. For a batch
+        of states, the costs with a `full` factor are also split into
+        `max_workers` chunks of states.
+
+        The outputs are then added up in the order of the costs, as in
+        `run`, and the costs with a `full` factor only on the available
+        combinations (see `available`), so that the ranking does not
+        depend on `max_workers` nor on which thread finishes first.
+
+        Args:
+            state: state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise, or a batch of states.
+            kwargs: other possible arguments to the run method.
+
+        Returns:
+            An array of the same shape as the state, containing the costs.
+        """
+        if self._executor is None or self.max_workers is None:
+            raise ValueError("FullRanker.run_parallel requires max_workers.")
+
+        n_states = len(state) if np.ndim(state) > 1 else 1
+        bounds = np.linspace(0, n_states, min(self.max_workers, n_states) + 1)
+        chunks = [
+            slice(*b) for b in zip(bounds[:-1].astype(int), bounds[1:].astype(int))
+        ]
+
+        factorized: list[tuple[CostFactor, Future]] = []
+        full: list[tuple[slice, Future]] = []
+        for cost in self.costs:
+            if cost.factor != "full":
+                future = self._executor.submit(cost.run_factor, state, **kwargs)
+                factorized.append((cost.factor, future))
+            elif np.ndim(state) > 1:
+                for chunk in chunks:
+                    future = self._executor.submit(cost.run, state[chunk], **kwargs)
+                    full.append((chunk, future))
+            else:
+                future = self._executor.submit(cost.run, state, **kwargs)
+                full.append((slice(None), future))
+
+        out = add_factorized(
+            np.zeros(np.shape(state)),
+            [(factor, future.result()) for factor, future in factorized],
+        )
+        mask = out < self.unavailable_cost
+        for chunk, future in full:
+            out[chunk] += np.where(mask[chunk], future.result(), 0.0)
+        return out
+
+    def run_batch(
+        self, state: NDArray, requirements: list[dict[str, Any]], **kwargs
+    ) -> NDArray:
+        """
+        Computes the costs of several requests for the same booking state
+        in one pass. Each cost is evaluated once per distinct combination
+        of the requirements it depends on (see
+        `thermo.costs.CostModel.requirements`), so the heating cost is
+        computed once for the whole batch, and the capacity cost once per
+        distinct capacity. As for a batch of states in `run`, all costs
+        are evaluated for all entries, and the costs with a `full` factor
+        are added on the entries each request leaves available.
+
+        Args:
+            state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise.
+            requirements: run-time keyword arguments of each request,
+                e.g. `{"required_capacity": 10}`.
+            kwargs: other possible arguments to the run method, shared
+                by all requests.
+
+        Returns:
+            An array of shape (n_requests, state size), with the costs of
+                each request.
+        """
+        out = np.zeros((len(requirements), np.size(state)))
+        static = [cost for cost in self.costs if cost.factor != "full"]
+        for cost in static:
+            for group in group_requirements(requirements, cost.requirements):
+                request = requirements[group[0]]
+                params = {n: request[n] for n in cost.requirements if n in request}
+                costs = cost.run_factor(state, **kwargs, **params)
+                if len(group) == len(requirements):
+                    add_factor(out, costs, cost.factor)
+                else:
+                    rows = out[group]
+                    out[group] = add_factor(rows, costs, cost.factor)
+
+        mask = out < self.unavailable_cost
+        for cost in self.costs:
+            if cost.factor != "full":
+                continue
+            for group in group_requirements(requirements, cost.requirements):
+                request = requirements[group[0]]
+                params = {n: request[n] for n in cost.requirements if n in request}
+                costs = cost.run(state, **kwargs, **params)
+                out[group] += np.where(mask[group], costs, 0.0)
+        return out
+
+    def apply_delta(
+        self,
+        prev_ranking: NDArray,
+        changed_indices: NDArray,
+        new_values: NDArray,
+        state: NDArray,
+        **kwargs
+    ) -> NDArray:
+        """
+        Updates, in place, a ranking computed for `state` after the entries
+        `changed_indices` of the state are set to `new_values`. Each cost
+        only patches the entries it changes, so re-ranking after a single
+        booking does not recompute the full schedule. As in `run`, the
+        costs with a `full` factor are only patched on the available
+        room-time combinations (see `available`).
+
+        Args:
+            prev_ranking: output of the run method for `state`.
+            changed_indices: flat indices of the entries of the state
+                that change.
+            new_values: new values of those entries.
+            state: the state `prev_ranking` was computed for.
+            kwargs: other possible arguments to the run method.
+
+        Returns:
+            prev_ranking, updated to the new state.
+        """
+        mask = self.available(state, **kwargs)
+        for cost in self.costs:
+            indices, differences = cost.delta(
+                state, changed_indices=changed_indices, new_values=new_values, **kwargs
+            )
+            if cost.factor == "full":
+                keep = mask[indices]
+                indices, differences = indices[keep], differences[keep]
+            np.add.at(prev_ranking, indices, differences)
+        return prev_ranking
@@ -0,0 +1,101 @@
+import numpy as np
+from numpy.typing import NDArray
+
+from thermo.config import UNAVAILABLE_COST
+from thermo.costs import CostModel
+from thermo.ranker.base import Ranker, add_factors
+
+TOP_DTYPE = np.dtype([("slot", int), ("room", int), ("score", float)])
+"""dtype of the recommendations returned by `TopKRanker.top`"""
+
+
+class TopKRanker(Ranker):
+    """
+    Calculates the cost of the k best room-time combinations only.
+
+    Costs that only vary with the room or with the time slot are cheap,
+    so they are evaluated first. Room-time combinations they already make
+    unavailable are dropped before evaluating the rest of the costs, e.g.
+    the heating cost. The k best combinations are then selected with a
+    partial sort.
+    Args:
+        costs: list of instances of costs models to compute the costs from.
+        k: number of recommendations to return.
+        unavailable_cost: cost from which a room-time combination is
+            considered unavailable.
+    """
+
+    def __init__(
+        self,
+        costs: list[CostModel],
+        k: int = 10,
+        unavailable_cost: float = UNAVAILABLE_COST,
+    ):
+        super().__init__(costs=costs)
+        self.k = k
+        self.unavailable_cost = unavailable_cost
+
+    def _feasible_costs(self, state: NDArray, **kwargs) -> tuple[NDArray, NDArray]:
+        """Flat indices and costs of the available room-time combinations"""
+        cheap = add_factors(np.zeros(np.shape(state)), self.costs, state, **kwargs)
+        mask = cheap < self.unavailable_cost
+        scores = cheap[mask]
+
+        for cost in self.costs:
+            if cost.factor == "full":
+                scores += cost.run_masked(state, mask, **kwargs)
+
+        indices = np.flatnonzero(mask)
+        available = scores < self.unavailable_cost
+        return indices[available], scores[available]
+
+    def top(self, state: NDArray, k: int | None = None, **kwargs) -> NDArray:
+        """
+        Finds the k best room-time combinations to book.
+
+        Args:
+            state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise.
+            k: number of recommendations to return, defaults to `self.k`.
+            kwargs: other possible arguments to the run method of the costs,
+                including `n_time_slots`.
+
+        Returns:
+            A structured array with fields `slot`, `room` and `score`,
+            sorted by score, with at most k entries. Unavailable
+            combinations are never returned.
+        """
+        k = self.k if k is None else k
+        indices, scores = self._feasible_costs(state, **kwargs)
+        if k < scores.size:
+            best = np.argpartition(scores, k)[:k]
+            indices, scores = indices[best], scores[best]
+
+        order = np.lexsort((indices, scores))
+        n_rooms = state.shape[-1] // kwargs["n_time_slots"]
+
+        top = np.empty(order.size, dtype=TOP_DTYPE)
+        top["slot"], top["room"] = np.divmod(indices[order], n_rooms)
+        top["score"] = scores[order]
+        return top
+
+    def run(self, state: NDArray, k: int | None = None, **kwargs) -> NDArray:
+        """
+        Computes the cost of the k best room-time combinations.
+        Args:
+            state: state: a flat array containing 1 if the room is booked
+                at that time a zero otherwise.
+            k: number of recommendations to return, defaults to `self.k`.
+            kwargs: other possible arguments to the run method, including
+                `n_time_slots`.
+
+        Returns:
+            An array of the same shape as the state, containing the costs
+            of the k best combinations and `unavailable_cost` elsewhere.
+        """
+        top = self.top(state, k=k, **kwargs)
+        n_rooms = state.shape[-1] // kwargs["n_time_slots"]
+
+        out = np.full(np.shape(state), self.unavailable_cost)
+        out[top["slot"] * n_rooms + top["room"]] = top["score"]
+        return out
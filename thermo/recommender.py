@@ -1,34 +1,53 @@
 from datetime import date
+from functools import cached_property
+from threading import Lock
+from typing import TYPE_CHECKING, Any
 
-import pandas as pd
 from numpy.typing import NDArray
-from pandas.io.formats.style import Styler
 
+from thermo.adapter.cache import StateCache
+from thermo.adapter.events import BookingLedger
 from thermo.adapter.state_connection import get_state
 from thermo.costs import make_cost
 from thermo.ranker import Ranker, make_ranker
 from thermo.utils import io
+from thermo.utils.artifact import load_compiled
 from thermo.utils.building import Building
-from thermo.utils.postprocessing import (
-    list_recommendations,
-    show_recommendations,
-    to_frame,
-)
 from thermo.utils.time import get_time_slots
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from pandas.io.formats.style import Styler
+
 
 class Recommendation:
     """
     Class to contain the postprocessing of recommendations.
+    pandas is only imported when the ranking is displayed, so ranking
+    does not pay for it.
+
     Args:
         ranking: the output of a Ranker.run call.
         room_names: names of the rooms for display
+        state: the booking state the ranking was computed for.
     """
 
-    def __init__(self, ranking: NDArray, room_names: list[str]):
-        self.ranking = to_frame(ranking, room_names=room_names)
+    def __init__(
+        self, ranking: NDArray, room_names: list[str], state: NDArray | None = None
+    ):
+        self.costs = ranking
+        self.state = state
+        self.room_names = room_names
+
+    @cached_property
+    def ranking(self) -> "pd.DataFrame":
+        """The costs as a DataFrame of shape (n_time_slots, n_rooms), with
+        NaN for the booked and not bookable rooms"""
+        from thermo.utils.postprocessing import to_frame
+
+        return to_frame(self.costs, room_names=self.room_names)
 
-    def show(self) -> Styler:
+    def show(self) -> "Styler":
         """
         Returns a styled DataFrame with a color gradient.
         Formats the DataFrame to 1 decimal place and
@@ -37,6 +56,8 @@ class Recommendation:
         Returns:
             pandas.io.formats.style.Styler: styled DataFrame
         """
+        from thermo.utils.postprocessing import show_recommendations
+
         return show_recommendations(self.ranking)
 
     def __repr__(self) -> str:
@@ -44,13 +65,16 @@ class Recommendation:
 
     @property
     def shape(self) -> tuple[int, int]:
-        return self.ranking.shape
+        n_rooms = len(self.room_names)
+        return self.costs.size // n_rooms, n_rooms
 
-    def top_recommendations(self) -> pd.Series:
+    def top_recommendations(self) -> "pd.Series":
         """
         Returns a sorted list of recommendations, with columns
         "Time Slot", "Room", "Score"
         """
+        from thermo.utils.postprocessing import list_recommendations
+
         return list_recommendations(self.ranking)
 
 
@@ -63,6 +87,7 @@ class Recommender:
         self,
         building: Building,
         ranker: Ranker,
+        state_cache: StateCache | None = None,
     ):
         """
         Init method, intended for testing purposes and not for human
@@ -75,28 +100,83 @@ class Recommender:
             ranker: Object to orchestrate the different costs and how they are
                 combined. Examples of costs are `thermo.costs.HeatingCost` or
                 `thermo.costs.CapacityCost`.
+            state_cache: cache of the booking states, possibly shared by
+                several recommenders. Without it, the state is fetched on
+                every run.
         """
 
         self.building = building
         self._room_names = building.get_room_attr("name")
         self.ranker = ranker
+        self.state_cache = state_cache
+        self._held: dict[date, list[tuple[dict[str, Any], Recommendation]]] = {}
+        self._held_lock = Lock()
 
     @classmethod
-    def from_config(cls, building_name: str) -> "Recommender":
+    def from_config(
+        cls,
+        building_name: str,
+        persist_tables: bool = False,
+        state_cache: StateCache | None = None,
+    ) -> "Recommender":
         """
         Creates a Recommender from the config files of a building.
 
+        If the building was compiled (see `thermo.utils.artifact`) from
+        its current config files, it is memory-mapped from its artifact
+        instead of parsing the config files.
+
+        The lookup tables of the costs that do not depend on the state
+        (see `thermo.costs.CostModel.precompute`) are built here, or
+        loaded if they were compiled or persisted for the current building
+        config.
+
         Args:
             building_name: Name of the building, as in the path to its config
                 files.
+            persist_tables: whether to save the cost lookup tables in the
+                building config dir, for later calls to reuse.
+            state_cache: cache of the booking states, see `__init__`.
 
         Returns:
             A recommender based on the configuration for that building found in
                 `buildings/building_name`.
         """
         building_path = io.get_building_path(building_name)
-        building = io.load_building(building_path)
+        compiled = load_compiled(building_path)
+        if compiled is not None:
+            building, tables = compiled
+        else:
+            building = io.load_building(building_path)
+            tables = io.load_cost_tables(building_path)
+
+        recommender = cls.from_building(building, tables, state_cache=state_cache)
+        if persist_tables:
+            io.save_cost_tables(building_path, tables)
+        return recommender
+
+    @classmethod
+    def from_building(
+        cls,
+        building: Building,
+        tables: dict[str, NDArray] | None = None,
+        state_cache: StateCache | None = None,
+    ) -> "Recommender":
+        """
+        Creates a Recommender from a loaded building, e.g. from a
+        `thermo.utils.registry.BuildingRegistry`.
+
+        Args:
+            building: the building.
+            tables: lookup tables of the costs, by cost name (see
+                `thermo.costs.CostModel.precompute`). The tables that are
+                missing or do not match are built and added to it.
+            state_cache: cache of the booking states, see `__init__`.
 
+        Returns:
+            A recommender for the building.
+        """
+        tables = {} if tables is None else tables
         costs = [
             make_cost(
                 name=key,
@@ -106,18 +186,43 @@ class Recommender:
             )
             for key, values in building.costs.items()
         ]
-        ranker = make_ranker(ranker_name=building.ranker, costs=costs)
+        for name, cost in zip(building.costs, costs):
+            table = cost.precompute(tables.get(name))
+            if table is not None:
+                tables[name] = table
+
+        ranker = make_ranker(
+            ranker_name=building.ranker_name, costs=costs, **building.ranker_params
+        )
 
         return cls(
             building=building,
             ranker=ranker,
+            state_cache=state_cache,
         )
 
+    def close(self) -> None:
+        """Stops the thread pools of the ranker and of the costs, if any.
+        The recommender can also be used as a context manager."""
+        self.ranker.close()
+
+    def __enter__(self) -> "Recommender":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _get_state(self, day: date) -> NDArray:
+        """Booking state of the building for a day, from the cache if any"""
+        if self.state_cache is None:
+            return get_state(day)
+        return self.state_cache.get(self.building.name, day).state
+
     def run(self, day: date, **kwargs) -> Recommendation:
         """
         Produces a recommendation of which rooms to book given a date.
         The method calls internally the schools API to determine which
-        books have been already booked.
+        books have been already booked (or the state cache, if any).
 
         It then calls all the costs and combines them according to the
         ranker, to return an instance of Recommendation, with all
@@ -130,7 +235,138 @@ class Recommender:
         Returns:
             The costs of the recommended possible bookings.
         """
-        state = get_state(day)
+        state = self._get_state(day)
         n_time_slots = get_time_slots(day)
         recommendation = self.ranker.run(state, n_time_slots=n_time_slots, **kwargs)
-        return Recommendation(recommendation, room_names=self._room_names)
+        return Recommendation(recommendation, room_names=self._room_names, state=state)
+
+    def run_batch(
+        self, day: date, requirements: list[dict[str, Any]], **kwargs
+    ) -> list[Recommendation]:
+        """
+        Produces the recommendations of several requests for the same day,
+        e.g. for rooms of different capacities. The booking state is
+        fetched once, and the costs are computed in one batched pass
+        (see `thermo.ranker.Ranker.run_batch`).
+
+        Args:
+            day: date for which the users desire to make a booking.
+            requirements: run-time parameters of each request, e.g.
+                `{"required_capacity": 10}`.
+            kwargs: other possible run-time parameters for the costs,
+                shared by all requests.
+
+        Returns:
+            The recommendation of each request, in order.
+        """
+        state = self._get_state(day)
+        n_time_slots = get_time_slots(day)
+        rankings = self.ranker.run_batch(
+            state, requirements, n_time_slots=n_time_slots, **kwargs
+        )
+        return [
+            Recommendation(ranking, room_names=self._room_names, state=state)
+            for ranking in rankings
+        ]
+
+    def hold(self, day: date, **kwargs) -> Recommendation:
+        """
+        Recommendation for a day that is kept up to date with the booking
+        events of the watched ledgers (see `watch`), through `apply_delta`.
+        It is computed by `run` the first time it is requested, and
+        returned as of the last event afterwards, until `release`.
+
+        Args:
+            day: date for which the user desires make a booking.
+            kwargs: other possible run-time parameters for the costs.
+
+        Returns:
+            The costs of the recommended possible bookings.
+        """
+        with self._held_lock:
+            held = self._held.setdefault(day, [])
+            for held_kwargs, recommendation in held:
+                if held_kwargs == kwargs:
+                    return recommendation
+            recommendation = self.run(day, **kwargs)
+            held.append((kwargs, recommendation))
+            return recommendation
+
+    def release(self, day: date) -> None:
+        """Stops updating the recommendations held for a day"""
+        with self._held_lock:
+            self._held.pop(day, None)
+
+    def watch(self, ledger: BookingLedger) -> None:
+        """
+        Keeps the state cache and the held recommendations (see `hold`) up
+        to date with the booking events of a ledger. After every event on
+        the building, the cells it changed are set in the cached state of
+        the day, with a new version, and the recommendations held for the
+        day are updated with the same cells through `apply_delta`.
+
+        Args:
+            ledger: the booking states, updated by booking events.
+
+        Raises:
+            ValueError: if the recommender has no state cache.
+        """
+        if self.state_cache is None:
+            raise ValueError("The recommender has no state cache to update.")
+        state_cache = self.state_cache
+
+        def update(building: str, day: date, changed: NDArray, values: NDArray):
+            if building != self.building.name:
+                return
+            state_cache.patch(building, day, changed, values)
+            with self._held_lock:
+                held = self._held.get(day)
+                if held:
+                    # an event already in a recommendation held meanwhile
+                    # sets the cells to the values they have: no change
+                    self._held[day] = [
+                        (kwargs, self.apply_delta(rec, changed, values, **kwargs))
+                        for kwargs, rec in held
+                    ]
+
+        ledger.subscribe(update)
+
+    def apply_delta(
+        self,
+        recommendation: Recommendation,
+        changed_indices: NDArray,
+        new_values: NDArray,
+        **kwargs,
+    ) -> Recommendation:
+        """
+        Updates a recommendation after some entries of its booking state
+        change, e.g. right after the user books a slot, without
+        recomputing the costs of the full schedule.
+
+        Args:
+            recommendation: the output of a previous call to `run`.
+            changed_indices: flat indices of the entries of the state
+                that change.
+            new_values: new values of those entries.
+            kwargs: the run-time parameters used for `recommendation`.
+
+        Returns:
+            The costs of the recommended possible bookings for the
+                updated state.
+        """
+        if recommendation.state is None:
+            raise ValueError("The recommendation does not hold its booking state.")
+
+        state = recommendation.state
+        n_time_slots = state.shape[0] // len(self._room_names)
+        ranking = self.ranker.apply_delta(
+            recommendation.costs.copy(),
+            changed_indices=changed_indices,
+            new_values=new_values,
+            state=state,
+            n_time_slots=n_time_slots,
+            **kwargs,
+        )
+        new_state = state.copy()
+        new_state[changed_indices] = new_values
+        return Recommendation(ranking, room_names=self._room_names, state=new_state)
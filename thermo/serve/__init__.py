@@ -0,0 +1,12 @@
+"""
+HTTP service for the recommendations of several buildings. Run it with
+
+    python -m thermo.serve --port 8000
+
+and load test it with `python -m thermo.serve.loadtest`.
+"""
+from thermo.serve.scheduler import BatchScheduler
+from thermo.serve.server import start_server
+from thermo.serve.service import RecommendationService
+
+__all__ = ["BatchScheduler", "RecommendationService", "start_server"]
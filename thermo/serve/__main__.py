@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import logging
+
+from thermo.serve.server import start_server
+from thermo.serve.service import RecommendationService
+
+logger = logging.getLogger("thermo.serve")
+
+
+async def serve(
+    host: str,
+    port: int,
+    building_names: list[str] | None = None,
+    max_workers: int | None = None,
+    batch_window: float | None = None,
+    state_ttl: float | None = None,
+) -> None:
+    """Loads the recommenders of the buildings and serves them forever"""
+    service = RecommendationService.from_config(
+        building_names,
+        state_ttl=state_ttl,
+        max_workers=max_workers,
+        batch_window=batch_window,
+    )
+    server = await start_server(service, host=host, port=port)
+    logger.info("Serving %s on %s:%d", sorted(service.recommenders), host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve booking recommendations.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--building",
+        action="append",
+        dest="buildings",
+        help="building to serve (repeatable). Defaults to all buildings.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker threads for the rankings"
+    )
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=None,
+        help="seconds to collect requests into batches (no batching by default)",
+    )
+    parser.add_argument(
+        "--state-ttl",
+        type=float,
+        default=None,
+        help="seconds the booking states are cached for (no cache by default)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(
+            serve(
+                args.host,
+                args.port,
+                args.buildings,
+                args.workers,
+                args.batch_window,
+                args.state_ttl,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
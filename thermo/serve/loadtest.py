@@ -0,0 +1,138 @@
+"""
+Local load test of the recommendation service. Start the service, e.g.
+with `python -m thermo.serve`, and run
+
+    python -m thermo.serve.loadtest --requests 2000 --concurrency 100
+
+Each client keeps a connection alive and sends requests drawn from a small
+set of buildings, days and capacities, as during a booking window, when
+many users ask for the same days.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Any
+from urllib.parse import urlencode
+
+import numpy as np
+from prettytable import PrettyTable
+
+from thermo.config import get_building_names
+
+
+async def _get(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, target: str
+) -> tuple[int, Any]:
+    """Sends a GET request on an open connection and reads the response"""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while line := (await reader.readline()).strip():
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def make_targets(
+    buildings: list[str], n_days: int, capacities: list[int], start: date
+) -> list[str]:
+    """All the `/recommend` targets of the load test"""
+    queries = [
+        {"building": b, "day": start + timedelta(days=d), "capacity": c}
+        for b in buildings
+        for d in range(n_days)
+        for c in capacities
+    ]
+    return ["/recommend?" + urlencode(query) for query in queries]
+
+
+async def run_load(
+    host: str,
+    port: int,
+    targets: list[str],
+    n_requests: int,
+    concurrency: int,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Sends `n_requests` requests to the service from `concurrency` clients.
+
+    Args:
+        host: host of the service
+        port: port of the service
+        targets: the requests are drawn uniformly from these targets
+        n_requests: total number of requests
+        concurrency: number of concurrent clients (connections)
+        seed: seed of the random draws
+
+    Returns:
+        The latencies of the requests (in seconds), the number of errors,
+            the total time and the counters of the service.
+    """
+    rng = random.Random(seed)
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for _ in range(n_requests):
+        queue.put_nowait(rng.choice(targets))
+    latencies: list[float] = []
+    errors = 0
+
+    async def client() -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while not queue.empty():
+                target = queue.get_nowait()
+                start = time.perf_counter()
+                status, _ = await _get(reader, writer, host, target)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await _get(reader, writer, host, "/stats")
+    writer.close()
+    return {"latencies": latencies, "errors": errors, "time": elapsed, "stats": stats}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the recommendations.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--days", type=int, default=5, help="distinct days")
+    parser.add_argument("--capacities", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--building", action="append", dest="buildings")
+    args = parser.parse_args()
+
+    buildings = get_building_names() if args.buildings is None else args.buildings
+    targets = make_targets(buildings, args.days, args.capacities, date.today())
+    result = asyncio.run(
+        run_load(args.host, args.port, targets, args.requests, args.concurrency)
+    )
+
+    latencies = 1e3 * np.array(result["latencies"])
+    table = PrettyTable(["metric", "value"], align="r")
+    table.add_row(["requests", len(latencies)])
+    table.add_row(["errors", result["errors"]])
+    table.add_row(["throughput (req/s)", f"{len(latencies) / result['time']:.1f}"])
+    for q in [50, 95, 99]:
+        table.add_row([f"p{q} latency (ms)", f"{np.percentile(latencies, q):.2f}"])
+    for name in ["requests", "computations", "coalesced"]:
+        table.add_row([f"service {name}", result["stats"][name]])
+    print(table)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
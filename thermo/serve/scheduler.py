@@ -0,0 +1,163 @@
+import queue
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from threading import Lock, Thread
+from typing import Any
+
+import numpy as np
+
+from thermo.recommender import Recommendation, Recommender
+
+# number of recent requests and batches the metrics are computed over
+METRICS_HISTORY = 10_000
+
+
+@dataclass
+class _Request:
+    building: str
+    day: date
+    requirements: dict[str, Any]
+    future: Future = field(default_factory=Future)
+    submitted: float = field(default_factory=time.perf_counter)
+
+
+class BatchScheduler:
+    def __init__(
+        self,
+        recommenders: dict[str, Recommender],
+        window: float = 0.005,
+        max_batch: int = 64,
+        max_workers: int | None = None,
+    ):
+        """
+        Micro-batching scheduler in front of the recommenders. Requests
+        arriving within `window` seconds of each other are collected and
+        grouped by building and day. The booking state of each group is
+        fetched once, and the costs of all its requests are computed in
+        one batched pass (see `Recommender.run_batch`). The results are
+        then fanned back out to the futures of the requests.
+
+        Args:
+            recommenders: recommender of each building, by building name.
+            window: seconds to wait for more requests after the first
+                request of a batch.
+            max_batch: maximum number of requests of a batch.
+            max_workers: number of worker threads running the groups.
+        """
+        self.recommenders = recommenders
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: queue.SimpleQueue[_Request | None] = queue.SimpleQueue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="thermo-batch"
+        )
+        self._lock = Lock()
+        self._latencies: deque[float] = deque(maxlen=METRICS_HISTORY)
+        self._batch_sizes: deque[int] = deque(maxlen=METRICS_HISTORY)
+        self.n_requests = 0
+        self.n_batches = 0
+        self._thread = Thread(
+            target=self._collect, name="thermo-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, building: str, day: date, **requirements) -> Future:
+        """
+        Schedules a recommendation.
+
+        Args:
+            building: name of the building
+            day: date for which the user desires make a booking.
+            requirements: run-time parameters for the costs, e.g.
+                `required_capacity`.
+
+        Returns:
+            A future with the `Recommendation`.
+
+        Raises:
+            KeyError: if the building is not scheduled.
+        """
+        if building not in self.recommenders:
+            raise KeyError(f"Building {building} is not served.")
+        request = _Request(building, day, requirements)
+        self._queue.put(request)
+        return request.future
+
+    def _collect(self) -> None:
+        """Collects the requests of each window and dispatches the groups"""
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+
+            groups: dict[tuple[str, date], list[_Request]] = {}
+            for request in batch:
+                groups.setdefault((request.building, request.day), []).append(request)
+            for requests in groups.values():
+                self._executor.submit(self._run_group, requests)
+
+    def _run_group(self, requests: list[_Request]) -> None:
+        """Runs the requests of a building and day in one batch"""
+        recommender = self.recommenders[requests[0].building]
+        try:
+            recommendations: list[Recommendation] = recommender.run_batch(
+                requests[0].day, [request.requirements for request in requests]
+            )
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        done = time.perf_counter()
+        with self._lock:
+            self.n_requests += len(requests)
+            self.n_batches += 1
+            self._batch_sizes.append(len(requests))
+            self._latencies.extend(done - request.submitted for request in requests)
+        for request, recommendation in zip(requests, recommendations):
+            request.future.set_result(recommendation)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Metrics of the scheduler: number of requests and batches, mean and
+        largest batch size, and percentiles of the latency of the requests
+        (from submission to result, in milliseconds), over the last
+        `METRICS_HISTORY` batches and requests.
+        """
+        with self._lock:
+            latencies = 1e3 * np.array(self._latencies)
+            batch_sizes = np.array(self._batch_sizes)
+            stats: dict[str, Any] = {
+                "requests": self.n_requests,
+                "batches": self.n_batches,
+            }
+        if batch_sizes.size:
+            stats["mean_batch_size"] = float(batch_sizes.mean())
+            stats["max_batch_size"] = int(batch_sizes.max())
+            for q in [50, 95, 99]:
+                stats[f"p{q}_latency_ms"] = float(np.percentile(latencies, q))
+        return stats
+
+    def close(self) -> None:
+        """Runs the pending requests and stops the scheduler"""
+        self._queue.put(None)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
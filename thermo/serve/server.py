@@ -0,0 +1,183 @@
+"""
+Minimal HTTP/1.1 front end of the `RecommendationService`, built on
+`asyncio` streams. Connections are kept alive between requests.
+
+Endpoints (GET only, JSON responses):
+    - `/recommend?building=<name>&day=<YYYY-MM-DD>`, with the optional
+      parameters `capacity=<int>`, `amenities=<a,b,...>` and
+      `version=<int>`.
+    - `/stats`: counters of the service.
+    - `/health`: liveness check.
+
+Unknown buildings and paths are answered with a 404, missing or malformed
+parameters with a 400, and any other error with a 500, logged.
+"""
+import asyncio
+import json
+import logging
+from datetime import date
+from http import HTTPStatus
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from thermo.serve.service import RecommendationService
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_LINES = 100
+
+
+class HTTPError(Exception):
+    """Error answered to the client with its status and message"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+
+def _parse_query(query: str) -> dict[str, Any]:
+    """Arguments of `RecommendationService.recommend` from a query string"""
+    params = {key: values[-1] for key, values in parse_qs(query).items()}
+    for name in ("building", "day"):
+        if name not in params:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing parameter '{name}'")
+    try:
+        kwargs: dict[str, Any] = {
+            "building": params["building"],
+            "day": date.fromisoformat(params["day"]),
+        }
+        if "capacity" in params:
+            kwargs["required_capacity"] = int(params["capacity"])
+        if params.get("amenities"):
+            kwargs["required_amenities"] = params["amenities"].split(",")
+        if "version" in params:
+            kwargs["version"] = int(params["version"])
+    except ValueError as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, str(e)) from e
+    return kwargs
+
+
+async def _route(service: RecommendationService, target: str) -> Any:
+    """Body of the response to a GET request"""
+    url = urlsplit(target)
+    match url.path:
+        case "/recommend":
+            kwargs = _parse_query(url.query)
+            if kwargs["building"] not in service.recommenders:
+                message = f"Building {kwargs['building']} is not served."
+                raise HTTPError(HTTPStatus.NOT_FOUND, message)
+            # any other error is a bug, answered with a 500 and logged
+            return await service.recommend(**kwargs)
+        case "/stats":
+            return service.stats()
+        case "/health":
+            return {"status": "ok"}
+        case _:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown path {url.path}")
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, bool] | None:
+    """
+    Reads a request from a connection.
+
+    Returns:
+        The method, the target and whether to keep the connection alive,
+            or None if the client closed the connection.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from e
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+    else:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+
+    connection = headers.get("connection", "")
+    keep_alive = connection != "close" and (
+        version == "HTTP/1.1" or connection == "keep-alive"
+    )
+    return method, target, keep_alive
+
+
+def _response(status: HTTPStatus, body: Any, keep_alive: bool) -> bytes:
+    content = json.dumps(body).encode()
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(content)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + content
+
+
+async def handle_connection(
+    service: RecommendationService,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    """Serves the requests of a client connection until it is closed"""
+    try:
+        keep_alive = True
+        while keep_alive:
+            request = None
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, keep_alive = request
+                if method != "GET":
+                    raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Only GET")
+                status, body = HTTPStatus.OK, await _route(service, target)
+            except HTTPError as e:
+                status, body = e.status, {"error": e.message}
+                # the rest of a malformed request cannot be skipped reliably
+                keep_alive = keep_alive and request is not None
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except Exception:
+                logger.exception("Error serving a request")
+                status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal"}
+                keep_alive = False
+
+            writer.write(_response(status, body, keep_alive))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(
+    service: RecommendationService, host: str = "127.0.0.1", port: int = 8000
+) -> asyncio.Server:
+    """
+    Starts serving `service` over HTTP.
+
+    Args:
+        service: the recommendation service
+        host: interface to listen on
+        port: port to listen on. Use 0 to pick a free port.
+
+    Returns:
+        The running server. Its address is in `server.sockets`.
+    """
+    return await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer),
+        host=host,
+        port=port,
+    )
@@ -0,0 +1,191 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+from typing import Any, Iterable
+
+from thermo.adapter.cache import StateCache
+from thermo.config import get_building_names
+from thermo.recommender import Recommendation, Recommender
+from thermo.serve.scheduler import BatchScheduler
+
+RequestKey = tuple[str, date, int | None, frozenset[str], int | None]
+"""Identifies the requests that share a result: building, day, required
+capacity, required amenities and version of the booking state."""
+
+
+class RecommendationService:
+    def __init__(
+        self,
+        recommenders: dict[str, Recommender],
+        max_workers: int | None = None,
+        top: int = 10,
+        batch_window: float | None = None,
+        state_cache: StateCache | None = None,
+    ):
+        """
+        Serves the recommendations of several buildings, with one warm
+        `Recommender` per building. The rankings are computed in a pool of
+        worker threads, so the event loop keeps accepting requests, and
+        concurrent identical requests are coalesced into a single
+        computation.
+
+        Args:
+            recommenders: recommender of each building, by building name.
+            max_workers: number of worker threads for the rankings.
+                Defaults to the `ThreadPoolExecutor` default.
+            top: number of recommendations returned per request.
+            batch_window: if given, the distinct requests arriving within
+                this many seconds are computed in batches, by a
+                `BatchScheduler`.
+            state_cache: the cache of booking states used by the
+                recommenders, if any. Requests without a version are then
+                coalesced only while the cached state keeps its version.
+        """
+        self.recommenders = recommenders
+        self.top = top
+        self.state_cache = state_cache
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="thermo-serve"
+        )
+        self.scheduler = (
+            BatchScheduler(recommenders, window=batch_window, max_workers=max_workers)
+            if batch_window is not None
+            else None
+        )
+        # only accessed from the event loop thread
+        self._inflight: dict[RequestKey, asyncio.Future] = {}
+        self.n_requests = 0
+        self.n_computations = 0
+
+    @classmethod
+    def from_config(
+        cls,
+        building_names: Iterable[str] | None = None,
+        state_ttl: float | None = None,
+        **kwargs,
+    ) -> "RecommendationService":
+        """
+        Creates the service from the config files of the buildings.
+
+        Args:
+            building_names: names of the buildings to serve. Defaults to
+                all buildings in `config.BUILDING_NAMES`.
+            state_ttl: if given, the booking states are cached for this
+                many seconds by a `StateCache` shared by all buildings.
+            kwargs: other arguments to the init method.
+        """
+        names = get_building_names() if building_names is None else building_names
+        state_cache = None if state_ttl is None else StateCache(ttl=state_ttl)
+        recommenders = {
+            name: Recommender.from_config(name, state_cache=state_cache)
+            for name in names
+        }
+        return cls(recommenders, state_cache=state_cache, **kwargs)
+
+    async def recommend(
+        self,
+        building: str,
+        day: date,
+        required_capacity: int | None = None,
+        required_amenities: Iterable[str] = (),
+        version: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Best bookings for a building and a day. If an identical request is
+        already being computed, waits for its result instead of computing
+        it again.
+
+        Args:
+            building: name of the building
+            day: day of the booking
+            required_capacity: number of people. If None, the default of
+                the capacity cost is used.
+            required_amenities: amenities the room must have
+            version: version of the booking state the client has seen.
+                Requests for different versions are never coalesced.
+
+        Returns:
+            The `top` recommendations, each with its time slot, room and
+                score, from best to worst.
+
+        Raises:
+            KeyError: if the building is not served.
+        """
+        if building not in self.recommenders:
+            raise KeyError(f"Building {building} is not served.")
+        if version is None and self.state_cache is not None:
+            version = self.state_cache.version(building, day)
+        key: RequestKey = (
+            building,
+            day,
+            required_capacity,
+            frozenset(required_amenities),
+            version,
+        )
+        self.n_requests += 1
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._compute(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.n_computations += 1
+        # a cancelled request does not cancel the requests it is shared with
+        return await asyncio.shield(future)
+
+    async def _compute(self, key: RequestKey) -> list[dict[str, Any]]:
+        """Runs the recommender of a request in a worker thread, or through
+        the scheduler"""
+        building, day, required_capacity, required_amenities, _ = key
+        kwargs: dict[str, Any] = {"required_amenities": set(required_amenities)}
+        if required_capacity is not None:
+            kwargs["required_capacity"] = required_capacity
+
+        loop = asyncio.get_running_loop()
+        if self.scheduler is None:
+            recommendation = await loop.run_in_executor(
+                self._executor,
+                partial(self.recommenders[building].run, day, **kwargs),
+            )
+        else:
+            recommendation = await asyncio.wrap_future(
+                self.scheduler.submit(building, day, **kwargs)
+            )
+        return await loop.run_in_executor(self._executor, self._best, recommendation)
+
+    def _best(self, recommendation: Recommendation) -> list[dict[str, Any]]:
+        """The `top` recommendations, from best to worst"""
+        best = recommendation.top_recommendations().head(self.top)
+        return [
+            {"time_slot": time_slot, "room": room, "score": float(score)}
+            for time_slot, room, score in best.itertuples(index=False)
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        """Number of requests served, of rankings computed and of requests
+        in flight, and the metrics of the scheduler and of the state cache,
+        if any"""
+        stats: dict[str, Any] = {
+            "buildings": sorted(self.recommenders),
+            "requests": self.n_requests,
+            "computations": self.n_computations,
+            "coalesced": self.n_requests - self.n_computations,
+            "in_flight": len(self._inflight),
+        }
+        if self.scheduler is not None:
+            stats["batching"] = self.scheduler.stats()
+        if self.state_cache is not None:
+            stats["states"] = self.state_cache.stats()
+        return stats
+
+    def close(self) -> None:
+        """Waits for the running computations and stops the workers, and
+        those of the recommenders"""
+        if self.scheduler is not None:
+            self.scheduler.close()
+        if self.state_cache is not None:
+            self.state_cache.close()
+        self._executor.shutdown(wait=True)
+        for recommender in self.recommenders.values():
+            recommender.close()
@@ -0,0 +1,67 @@
+from typing import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from thermo.config import AMENITIES
+
+# number of set bits of every possible byte
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def get_vocabulary(room_amenities: Iterable[set[str]]) -> tuple[str, ...]:
+    """
+    Returns the amenities that can be encoded as bits: the
+    amenities in `thermo.config.AMENITIES`, in that order,
+    followed by any other amenity found in the rooms, sorted.
+
+    Args:
+        room_amenities: amenities of each room.
+
+    Returns:
+        tuple of amenity names, where the i-th name is encoded
+        by the i-th bit.
+    """
+    others = set().union(*room_amenities) - set(AMENITIES)
+    vocabulary = AMENITIES + tuple(sorted(others))
+    if len(vocabulary) > 64:
+        raise ValueError(f"Cannot encode {len(vocabulary)} amenities in 64 bits.")
+    return vocabulary
+
+
+def encode_amenities(
+    amenities: Iterable[str], vocabulary: tuple[str, ...] = AMENITIES
+) -> int:
+    """
+    Encodes a set of amenities as a bitmask, where the i-th bit
+    is set if the i-th amenity of the vocabulary is in the set.
+
+    Example:
+        >>> encode_amenities({"screen", "whiteboard"})
+        5
+
+    Raises:
+        KeyError: if an amenity is not in the vocabulary.
+    """
+    bits = {amenity: 1 << i for i, amenity in enumerate(vocabulary)}
+    mask = 0
+    for amenity in amenities:
+        mask |= bits[amenity]
+    return mask
+
+
+def encode_rooms(
+    room_amenities: Iterable[set[str]], vocabulary: tuple[str, ...] = AMENITIES
+) -> NDArray[np.uint64]:
+    """Encodes the amenities of each room as a uint64 bitmask."""
+    return np.array(
+        [encode_amenities(amenities, vocabulary) for amenities in room_amenities],
+        dtype=np.uint64,
+    )
+
+
+def popcount(masks: NDArray) -> NDArray:
+    """Number of set bits of each entry of an array of unsigned integers."""
+    masks = np.ascontiguousarray(masks)
+    counts = _BYTE_POPCOUNT[masks.view(np.uint8)]
+    return counts.reshape(*masks.shape, masks.itemsize).sum(axis=-1)
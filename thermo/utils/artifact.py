@@ -0,0 +1,339 @@
+"""
+Compiled building artifacts: everything `Recommender.from_config` needs to
+know about a building, packed in a single binary file that is loaded with
+one memory map instead of parsing YAML. The pages of the arrays are only
+read when used, and are shared by all the processes that map the file.
+
+The file `building.thermo` in the building config dir is laid out as:
+
+    MAGIC (8 bytes) | header size (uint64, little endian) | JSON header |
+    arrays, each aligned to `ALIGNMENT` bytes
+
+The header holds the format version, the hash of the source files the
+artifact was compiled from (and of how the cost tables are built, see
+`thermo.costs.base.tables_signature`), the non-array fields of the building (name,
+municipality, ranker and costs), the amenity vocabulary, and the dtype,
+shape and offset of every array:
+
+- `adjacency/indptr`, `adjacency/indices`, `adjacency/data`: the
+  adjacency matrix in CSR format.
+- `rooms/capacity`: capacity of each room, -1 if unknown.
+- `rooms/amenities`: amenities of each room, as bitmasks of the
+  vocabulary (see `thermo.utils.amenities`).
+- `rooms/names`, `rooms/name_offsets`: UTF-8 names of the rooms,
+  concatenated, and where each one starts.
+- `tables/<cost name>`: the cost lookup tables (see
+  `thermo.costs.CostModel.precompute`).
+
+Compile the artifacts of all buildings (or of some) with
+
+    python -m thermo.utils.artifact [building_name ...]
+"""
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import scipy.sparse as sp
+from numpy.typing import NDArray
+
+from thermo.config import get_building_names
+from thermo.costs import make_cost
+from thermo.costs.base import tables_signature
+from thermo.utils import io
+from thermo.utils.amenities import encode_rooms, get_vocabulary
+from thermo.utils.building import Building
+from thermo.utils.room import Room
+
+ARTIFACT_FILE = "building.thermo"
+MAGIC = b"THERMOB\0"
+FORMAT_VERSION = 1
+# alignment of the arrays in the file, in bytes
+ALIGNMENT = 64
+
+# files a building is compiled from
+SOURCE_FILES = ("adjacency.npy", "specifications.yaml", "config.yaml")
+
+
+def source_hash(building_path: Path) -> str:
+    """Hash of the files a building artifact is compiled from, and of how
+    its cost tables are built."""
+    digest = hashlib.sha256(tables_signature())
+    for file_name in SOURCE_FILES:
+        digest.update((building_path / file_name).read_bytes())
+    return digest.hexdigest()
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def encode_artifact(
+    building: Building,
+    tables: dict[str, NDArray] | None = None,
+    source: str = "",
+) -> bytes:
+    """
+    Packs a building, and the lookup tables of its costs, in the artifact
+    format.
+
+    Args:
+        building: the building.
+        tables: lookup tables of the costs, by cost name.
+        source: hash of the source files of the building.
+
+    Returns:
+        The content of the artifact.
+    """
+    adjacency = sp.csr_matrix(building.adjacency, dtype=float)
+    room_amenities = building.get_room_attr("amenities")
+    vocabulary = get_vocabulary(room_amenities)
+    names = [name.encode() for name in building.get_room_attr("name")]
+    capacities = [-1 if c is None else c for c in building.get_room_attr("capacity")]
+
+    arrays: dict[str, NDArray] = {
+        "adjacency/indptr": adjacency.indptr.astype(np.int32),
+        "adjacency/indices": adjacency.indices.astype(np.int32),
+        "adjacency/data": adjacency.data,
+        "rooms/capacity": np.array(capacities, dtype=np.int64),
+        "rooms/amenities": encode_rooms(room_amenities, vocabulary),
+        "rooms/names": np.frombuffer(b"".join(names), dtype=np.uint8),
+        "rooms/name_offsets": np.cumsum([0] + [len(n) for n in names], dtype=np.int64),
+    }
+    for name, table in (tables or {}).items():
+        arrays[f"tables/{name}"] = np.asarray(table)
+
+    # the offsets depend on the size of the header, which lists them: lay
+    # the arrays out after a header with placeholder offsets, and pad the
+    # final header to the same size
+    offsets = dict.fromkeys(arrays, 0)
+    specs = {
+        name: {"dtype": array.dtype.str, "shape": list(array.shape), "offset": 0}
+        for name, array in arrays.items()
+    }
+    header: dict[str, Any] = {
+        "format_version": FORMAT_VERSION,
+        "source_hash": source,
+        "name": building.name,
+        "municipality": building.municipality,
+        "ranker": building.ranker,
+        "costs": building.costs,
+        "n_rooms": adjacency.shape[0],
+        "vocabulary": list(vocabulary),
+        "arrays": specs,
+    }
+    header_size = len(json.dumps(header).encode()) + 32 * len(arrays)
+    offset = _aligned(len(MAGIC) + 8 + header_size)
+    for name, array in arrays.items():
+        specs[name]["offset"] = offsets[name] = offset
+        offset = _aligned(offset + array.nbytes)
+
+    data = bytearray(offset)
+    data[: len(MAGIC)] = MAGIC
+    data[len(MAGIC) : len(MAGIC) + 8] = header_size.to_bytes(8, "little")
+    encoded = json.dumps(header).encode().ljust(header_size)
+    data[len(MAGIC) + 8 : len(MAGIC) + 8 + header_size] = encoded
+    for name, array in arrays.items():
+        start = offsets[name]
+        data[start : start + array.nbytes] = np.ascontiguousarray(array).tobytes()
+    return bytes(data)
+
+
+def _decode_header(data: bytes | NDArray) -> dict[str, Any]:
+    """Header of an artifact, from its first bytes"""
+    if bytes(data[: len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a building artifact.")
+    header_size = int.from_bytes(bytes(data[len(MAGIC) : len(MAGIC) + 8]), "little")
+    header = json.loads(bytes(data[len(MAGIC) + 8 : len(MAGIC) + 8 + header_size]))
+    if header["format_version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Artifact of format version {header['format_version']}, "
+            f"expected {FORMAT_VERSION}."
+        )
+    return header
+
+
+def read_header(path: Path) -> dict[str, Any]:
+    """
+    Reads the header of an artifact, without reading its arrays.
+
+    Raises:
+        ValueError: if the file is not an artifact of the current format
+            version.
+    """
+    with path.open("rb") as f:
+        prefix = f.read(len(MAGIC) + 8)
+        header_size = int.from_bytes(prefix[len(MAGIC) :], "little")
+        return _decode_header(prefix + f.read(header_size))
+
+
+def decode_artifact(buffer: NDArray) -> tuple[Building, dict[str, NDArray]]:
+    """
+    Unpacks a building from the content of its artifact.
+
+    Args:
+        buffer: the artifact, as an array of bytes, e.g. a memory map of
+            the file or a view of a shared memory block.
+
+    Returns:
+        The building, with a sparse adjacency matrix, and the lookup tables
+            of its costs. The tables are read-only views of `buffer`
+            (scipy copies the indices and data of the sparse matrix).
+    """
+    buffer = buffer.view()
+    buffer.flags.writeable = False
+    header = _decode_header(buffer)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        n_bytes = dtype.itemsize * int(np.prod(spec["shape"]))
+        start = spec["offset"]
+        array = buffer[start : start + n_bytes].view(dtype)
+        arrays[name] = array.reshape(spec["shape"])
+
+    n_rooms = header["n_rooms"]
+    adjacency = sp.csr_matrix(
+        (
+            arrays["adjacency/data"],
+            arrays["adjacency/indices"],
+            arrays["adjacency/indptr"],
+        ),
+        shape=(n_rooms, n_rooms),
+    )
+    names = arrays["rooms/names"].tobytes()
+    offsets = arrays["rooms/name_offsets"].tolist()
+    masks = arrays["rooms/amenities"].tolist()
+    vocabulary = header["vocabulary"]
+    rooms = [
+        Room(
+            name=names[offsets[i] : offsets[i + 1]].decode(),
+            index=i,
+            capacity=None if capacity < 0 else capacity,
+            amenities={a for bit, a in enumerate(vocabulary) if masks[i] >> bit & 1},
+        )
+        for i, capacity in enumerate(arrays["rooms/capacity"].tolist())
+    ]
+    building = Building(
+        name=header["name"],
+        municipality=header["municipality"],
+        ranker=header["ranker"],
+        costs=header["costs"],
+        room_descriptions=rooms,  # type: ignore[arg-type]
+        adjacency=adjacency,
+    )
+    tables = {
+        name.removeprefix("tables/"): array
+        for name, array in arrays.items()
+        if name.startswith("tables/")
+    }
+    return building, tables
+
+
+def load_artifact(path: Path) -> tuple[Building, dict[str, NDArray]]:
+    """
+    Loads a building artifact (see `decode_artifact`). Its arrays are
+    views of a single memory map of the file.
+
+    Args:
+        path: path of the artifact.
+
+    Returns:
+        The building, with a sparse adjacency matrix, and the lookup tables
+            of its costs.
+    """
+    return decode_artifact(np.memmap(path, dtype=np.uint8, mode="r"))
+
+
+def build_artifact(building_path: Path) -> bytes:
+    """
+    Packs the config files of a building, and the lookup tables of its
+    costs, in the artifact format (see `encode_artifact`).
+
+    Args:
+        building_path: path to the building config dir.
+
+    Returns:
+        The content of the artifact.
+    """
+    building = io.load_building(building_path)
+    tables: dict[str, NDArray] = {}
+    for name, values in building.costs.items():
+        cost = make_cost(
+            name=name,
+            adjacency=building.adjacency,
+            room_descriptions=building.room_descriptions,
+            **values,
+        )
+        table = cost.precompute()
+        if table is not None:
+            tables[name] = table
+    return encode_artifact(building, tables, source=source_hash(building_path))
+
+
+def compile_building(building_path: Path, path: Path | None = None) -> Path:
+    """
+    Compiles the config files of a building, and the lookup tables of its
+    costs, into an artifact.
+
+    Args:
+        building_path: path to the building config dir.
+        path: path of the artifact. Defaults to `ARTIFACT_FILE` in the
+            building config dir.
+
+    Returns:
+        The path of the artifact.
+    """
+    path = building_path / ARTIFACT_FILE if path is None else path
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_bytes(build_artifact(building_path))
+    os.replace(tmp_path, path)
+    return path
+
+
+def is_compiled(building_path: Path) -> bool:
+    """Whether the building has an artifact compiled from its current
+    config files, with the current format version"""
+    path = building_path / ARTIFACT_FILE
+    if not path.exists():
+        return False
+    try:
+        header = read_header(path)
+    except ValueError:
+        return False
+    return header["source_hash"] == source_hash(building_path)
+
+
+def load_compiled(building_path: Path) -> tuple[Building, dict[str, NDArray]] | None:
+    """
+    Loads the artifact of a building, if it was compiled from the current
+    config files, cost tables version and amenity vocabulary, and with
+    the current format version.
+
+    Args:
+        building_path: path to the building config dir.
+
+    Returns:
+        The building and the lookup tables of its costs, or None if there
+            is no up-to-date artifact.
+    """
+    if not is_compiled(building_path):
+        return None
+    return load_artifact(building_path / ARTIFACT_FILE)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compiles building artifacts.")
+    parser.add_argument(
+        "buildings", nargs="*", help="names of the buildings, by default all"
+    )
+    args = parser.parse_args()
+    for building_name in args.buildings or get_building_names():
+        path = compile_building(io.get_building_path(building_name))
+        print(f"{building_name}: {path} ({path.stat().st_size} bytes)")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
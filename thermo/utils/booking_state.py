@@ -0,0 +1,115 @@
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+
+class BookingState:
+    """
+    Booking state of a building for a day, bit-packed: one bit per
+    room-time combination instead of the 64 bits of the float vectors the
+    costs take. Meant for caches and for storing many days.
+
+    Bits are packed with `np.packbits`, in the order of the flat states
+    (see `get_state`): time slot by time slot, and room by room within a
+    time slot.
+
+    Args:
+        n_slots: number of time slots.
+        n_rooms: number of rooms.
+        bits: packed bits, as returned by `np.packbits`. By default, no
+            room is booked.
+    """
+
+    __slots__ = ("n_slots", "n_rooms", "bits")
+
+    def __init__(self, n_slots: int, n_rooms: int, bits: NDArray | None = None):
+        self.n_slots = n_slots
+        self.n_rooms = n_rooms
+        n_bytes = -(-n_slots * n_rooms // 8)
+        if bits is None:
+            bits = np.zeros(n_bytes, dtype=np.uint8)
+        elif bits.dtype != np.uint8 or bits.shape != (n_bytes,):
+            raise ValueError(f"Expected {n_bytes} packed bytes, got {bits.shape}.")
+        self.bits = bits
+
+    @classmethod
+    def from_array(cls, state: ArrayLike, n_rooms: int | None = None) -> "BookingState":
+        """
+        Packs a state.
+
+        Args:
+            state: 1 if the room is booked at that time and 0 otherwise,
+                of shape (n_slots, n_rooms) or flat.
+            n_rooms: number of rooms, for flat states.
+
+        Returns:
+            The bit-packed state.
+        """
+        state = np.asarray(state)
+        if state.ndim == 1:
+            if n_rooms is None:
+                raise ValueError("n_rooms is required for flat states.")
+            state = state.reshape(-1, n_rooms)
+        n_slots, n_rooms = state.shape
+        return cls(n_slots, n_rooms, bits=np.packbits(state > 0, axis=None))
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.n_slots, self.n_rooms
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def unpack(self) -> NDArray:
+        """Boolean array of shape (n_slots, n_rooms), True if booked"""
+        n_cells = self.n_slots * self.n_rooms
+        # a view of the unpacked bytes, without another copy
+        return np.unpackbits(self.bits, count=n_cells).view(bool).reshape(self.shape)
+
+    def to_vector(self, dtype: type = float) -> NDArray:
+        """Flat vector with 1 if the room is booked at that time and 0
+        otherwise, as taken by `CostModel.run`"""
+        return np.unpackbits(self.bits, count=self.n_slots * self.n_rooms).astype(dtype)
+
+    def _positions(self, slots: ArrayLike, rooms: ArrayLike) -> tuple[NDArray, NDArray]:
+        """Bytes and bit masks of room-time combinations"""
+        slots, rooms = np.broadcast_arrays(np.asarray(slots), np.asarray(rooms))
+        if np.any((slots < 0) | (slots >= self.n_slots)) or np.any(
+            (rooms < 0) | (rooms >= self.n_rooms)
+        ):
+            raise IndexError("Time slot or room out of range.")
+        indices = slots * self.n_rooms + rooms
+        # np.packbits puts the first entry in the most significant bit
+        masks = np.left_shift(1, 7 - indices % 8).astype(np.uint8)
+        return indices // 8, masks
+
+    def book(self, slots: ArrayLike, rooms: ArrayLike) -> None:
+        """Books rooms at time slots (element-wise), in place"""
+        positions, masks = self._positions(slots, rooms)
+        np.bitwise_or.at(self.bits, positions, masks)
+
+    def cancel(self, slots: ArrayLike, rooms: ArrayLike) -> None:
+        """Cancels the bookings of rooms at time slots (element-wise), in
+        place"""
+        positions, masks = self._positions(slots, rooms)
+        np.bitwise_and.at(self.bits, positions, ~masks)
+
+    def query(self, slots: ArrayLike, rooms: ArrayLike) -> NDArray:
+        """Whether rooms are booked at time slots (element-wise)"""
+        positions, masks = self._positions(slots, rooms)
+        return (self.bits[positions] & masks) > 0
+
+    def copy(self) -> "BookingState":
+        return BookingState(self.n_slots, self.n_rooms, self.bits.copy())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BookingState):
+            return NotImplemented
+        return self.shape == other.shape and np.array_equal(self.bits, other.bits)
+
+    def __repr__(self) -> str:
+        n_booked = int(np.unpackbits(self.bits).sum())
+        return (
+            f"BookingState(n_slots={self.n_slots}, n_rooms={self.n_rooms}, "
+            f"booked={n_booked})"
+        )
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import Any
 
 import numpy as np
+import scipy.sparse as sp
 from numpy.typing import NDArray
 
 from thermo.costs import CostName
@@ -15,32 +16,53 @@ class Building:
     """A dataclass that represents a building.
     Holds the static information about a given
     building.
+
+    The ranker is given either by its name or, to pass
+    parameters to it, as a mapping from its name to its
+    parameters, e.g. {"TopKRanker": {"k": 5}}.
     """
 
     name: str
     municipality: str
-    ranker: RankerName
+    ranker: RankerName | dict[RankerName, dict[str, Any]]
     costs: dict[CostName, Any]
     room_descriptions: list[dict[str, Any] | Room]
-    adjacency: list[list[int]] | NDArray
+    adjacency: list[list[int]] | NDArray | sp.spmatrix
 
     def __post_init__(self) -> None:
         """Perform some post-initialization tasks
         1. Room descriptions are converted to Room objects
-        2. The adjacency matrix is converted to a NDArray."""
+        2. The adjacency matrix is converted to a NDArray, unless it
+        is sparse (e.g. loaded from a compiled artifact)."""
 
         self.room_descriptions = [
             Room(index=index, **room) if not isinstance(room, Room) else room
             for index, room in enumerate(self.room_descriptions)
         ]
 
-        if not isinstance(self.adjacency, np.ndarray):
+        if not isinstance(self.adjacency, np.ndarray) and not sp.issparse(
+            self.adjacency
+        ):
             self.adjacency = np.array(self.adjacency)
 
     def get_room_attr(self, attr: str) -> list[Any]:
         """Returns a list of the given attribute for all rooms."""
         return [getattr(room, attr) for room in self.room_descriptions]
 
+    @property
+    def ranker_name(self) -> RankerName:
+        """Returns the name of the building's ranker."""
+        if isinstance(self.ranker, dict):
+            return next(iter(self.ranker))
+        return self.ranker
+
+    @property
+    def ranker_params(self) -> dict[str, Any]:
+        """Returns the parameters of the building's ranker."""
+        if isinstance(self.ranker, dict):
+            return self.ranker[self.ranker_name] or {}
+        return {}
+
     @property
     def specifications(self) -> dict[str, Any]:
         """Returns a dictionary of the building's specifications."""
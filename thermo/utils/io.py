@@ -1,15 +1,31 @@
+import hashlib
 import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from io import TextIOWrapper
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import yaml
 from numpy import load as npload
+from numpy import savez as npsavez
 from numpy.typing import NDArray
 
-from thermo.config import BUILDINGS_DIR
+from thermo.config import BUILDINGS_DIR, VALIDATION_CACHE_DIR
+from thermo.costs.base import tables_signature
+from thermo.graph.adjacency import validate_adjacency
 from thermo.utils.building import Building
 
+# file with the persisted cost lookup tables of a building
+COST_TABLES_FILE = "cost_tables.npz"
+
+# version of the checks of `validate_building`, part of the key of the
+# cached validation results: bump it when the checks change
+VALIDATION_VERSION = 2
+
 
 def get_building_path(building_name: str) -> Path:
     """
@@ -44,18 +60,18 @@ def load_npy(building_path: Path, filename: str, **kwargs) -> NDArray:
 
 
 def load_file(building_path: Path, file_name: str, **kwargs) -> dict[str, Any]:
-    """Loads a file from the given path. Pathlib
-    handles context management for us."""
+    """Loads a file from the given path, closing it
+    once it is parsed."""
     p = Path(building_path / file_name)
-    config = p.open("r")
 
-    match p.suffix:
-        case ".yaml":
-            return load_yaml(config, **kwargs)
-        case ".json":
-            return load_json(config, **kwargs)
-        case _:
-            raise ValueError(f"File type {p.suffix} not supported.")
+    with p.open("r") as config:
+        match p.suffix:
+            case ".yaml":
+                return load_yaml(config, **kwargs)
+            case ".json":
+                return load_json(config, **kwargs)
+            case _:
+                raise ValueError(f"File type {p.suffix} not supported.")
 
 
 def load_building(building_path: Path) -> Building:
@@ -70,15 +86,210 @@ def load_building(building_path: Path) -> Building:
     return Building(**data)  # type: ignore[arg-type]
 
 
-def load_all_buildings() -> list[Building]:
+def _config_hash(building_path: Path) -> str:
+    """Hash of the building specifications and config files, and of how
+    the cost tables are built (see `thermo.costs.base.tables_signature`)."""
+    digest = hashlib.sha256(tables_signature())
+    for file_name in ("specifications.yaml", "config.yaml"):
+        digest.update((building_path / file_name).read_bytes())
+    return digest.hexdigest()
+
+
+def load_cost_tables(building_path: Path) -> dict[str, NDArray]:
+    """
+    Loads the cost lookup tables persisted for a building (see
+    `thermo.costs.CostModel.precompute`). Tables built for a previous
+    version of the building specifications or config, of the tables
+    (`thermo.costs.base.TABLES_VERSION`) or of `config.AMENITIES` are
+    ignored.
+
+    Args:
+        building_path: path to the building config dir.
+
+    Returns:
+        dict mapping cost names to their lookup tables, empty if there
+        are no valid tables.
+    """
+    path = building_path / COST_TABLES_FILE
+    if not path.exists():
+        return {}
+
+    with npload(path) as tables:
+        if str(tables["config_hash"]) != _config_hash(building_path):
+            return {}
+        return {name: tables[name] for name in tables.files if name != "config_hash"}
+
+
+def save_cost_tables(building_path: Path, tables: dict[str, NDArray]) -> None:
+    """
+    Persists the cost lookup tables of a building next to its
+    adjacency matrix, tagged with the hash of the building
+    specifications and config.
+
+    Args:
+        building_path: path to the building config dir.
+        tables: dict mapping cost names to their lookup tables.
+    """
+    arrays: dict[str, Any] = {"config_hash": _config_hash(building_path), **tables}
+    npsavez(building_path / COST_TABLES_FILE, **arrays)
+
+
+@dataclass(frozen=True)
+class BuildingReport:
+    """
+    Outcome of loading a building.
+
+    Args:
+        name: name of the building, as in the path to its config files.
+        load_time: seconds spent loading the config files.
+        validation_time: seconds spent validating the building, or
+            reading its cached validation result.
+        errors: description of each failed check, empty if the building
+            is valid or was not validated.
+        cached: whether the validation result was read from the cache.
+    """
+
+    name: str
+    load_time: float
+    validation_time: float = 0.0
+    errors: tuple[str, ...] = ()
+    cached: bool = False
+
+
+def _content_hash(building_path: Path) -> str:
+    """Hash of the files a building is validated from, and of the version
+    of the checks."""
+    digest = hashlib.sha256(f"validation-v{VALIDATION_VERSION}".encode())
+    for file_name in ("adjacency.npy", "specifications.yaml"):
+        digest.update((building_path / file_name).read_bytes())
+    return digest.hexdigest()
+
+
+def validate_building(building: Building) -> list[str]:
+    """
+    Checks the adjacency matrix of a building (see
+    `thermo.graph.adjacency.validate_adjacency`) and that it has a row
+    for each room.
+
+    Returns:
+        A description of each failed check, empty if the building is valid.
+    """
+    errors = validate_adjacency(building.adjacency)
+    n_rows, n_rooms = np.shape(building.adjacency)[0], len(building.room_descriptions)
+    if n_rows != n_rooms:
+        errors.append(f"The adjacency has {n_rows} rows for {n_rooms} rooms.")
+    return errors
+
+
+def _load_and_validate(
+    building_path: Path, validate: bool, cache_dir: Path | None
+) -> tuple[Building, BuildingReport]:
+    """Loads a building and, if asked, validates it or reads its cached
+    validation result"""
+    start = time.perf_counter()
+    building = load_building(building_path)
+    load_time = time.perf_counter() - start
+    if not validate:
+        return building, BuildingReport(building_path.name, load_time)
+
+    start = time.perf_counter()
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = cache_dir / f"{_content_hash(building_path)}.json"
+        if cache_path.exists():
+            errors = json.loads(cache_path.read_text())["errors"]
+            report = BuildingReport(
+                building_path.name,
+                load_time,
+                validation_time=time.perf_counter() - start,
+                errors=tuple(errors),
+                cached=True,
+            )
+            return building, report
+
+    errors = validate_building(building)
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # other loaders may validate the same building concurrently
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"errors": errors}))
+        os.replace(tmp_path, cache_path)
+    report = BuildingReport(
+        building_path.name,
+        load_time,
+        validation_time=time.perf_counter() - start,
+        errors=tuple(errors),
+    )
+    return building, report
+
+
+def load_buildings(
+    building_paths: list[Path] | None = None,
+    validate: bool = True,
+    max_workers: int | None = None,
+    processes: bool = False,
+    cache_dir: Path | None = VALIDATION_CACHE_DIR,
+) -> tuple[list[Building], list[BuildingReport]]:
+    """
+    Loads and validates buildings concurrently.
+
+    Validation results are cached by the content of the adjacency and
+    specifications files and by `VALIDATION_VERSION`, so that unchanged
+    buildings are not validated again by the same checks.
+
+    Args:
+        building_paths: paths to the building config dirs. Defaults to all
+            the dirs in `BUILDINGS_DIR`.
+        validate: whether to validate the buildings.
+        max_workers: number of buildings loaded concurrently.
+        processes: whether to load the buildings in worker processes
+            rather than threads, e.g. for many large buildings.
+        cache_dir: directory of the cached validation results. Without
+            it, all buildings are validated.
+
+    Returns:
+        The buildings and their load reports, in the order of
+            `building_paths`.
+    """
+    if building_paths is None:
+        building_paths = sorted(p for p in BUILDINGS_DIR.glob("*") if p.is_dir())
+    executor: Executor
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    with executor:
+        results = list(
+            executor.map(
+                _load_and_validate,
+                building_paths,
+                [validate] * len(building_paths),
+                [cache_dir] * len(building_paths),
+            )
+        )
+    return [b for b, _ in results], [r for _, r in results]
+
+
+def load_all_buildings(validate: bool = False, **kwargs) -> list[Building]:
     """
     Returns a list of all buildings found in the
-    BUILDINGS_DIR as Building objects.
+    BUILDINGS_DIR as Building objects, loaded concurrently.
+
+    Args:
+        validate: whether to validate the buildings (see
+            `validate_building`). Off by default: the checks of each
+            building are reported by its own tests, and validation
+            results are written to `VALIDATION_CACHE_DIR`.
+        kwargs: other arguments to `load_buildings`, e.g. `max_workers`.
+
     Returns:
         list[Building]: list of all buildings.
+
+    Raises:
+        ValueError: if a building is not valid.
     """
-    return [
-        load_building(building_dir)
-        for building_dir in BUILDINGS_DIR.glob("*")
-        if building_dir.is_dir()
-    ]
+    buildings, reports = load_buildings(validate=validate, **kwargs)
+    errors = [f"{r.name}: {error}" for r in reports for error in r.errors]
+    if errors:
+        raise ValueError("Invalid buildings:\n" + "\n".join(errors))
+    return buildings
@@ -1,9 +1,13 @@
+from typing import TYPE_CHECKING
+
 import pandas as pd
 from numpy.typing import NDArray
-from pandas.io.formats.style import Styler
 
 from thermo.config import WEEKDAY_HOUR_START, WEEKEND_HOUR_START
 
+if TYPE_CHECKING:
+    from pandas.io.formats.style import Styler
+
 
 def to_frame(
     recommendations: NDArray, room_names: list[str], nan_threshold: float = 1e4
@@ -30,7 +34,7 @@ def to_frame(
     ).where(lambda x: x < nan_threshold)
 
 
-def show_recommendations(df: pd.DataFrame) -> Styler:
+def show_recommendations(df: pd.DataFrame) -> "Styler":
     """Convert DataFrame of booking recommendations
     to a styled DataFrame with a color gradient.
     Formats the DataFrame to 1 decimal place and
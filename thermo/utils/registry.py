@@ -0,0 +1,171 @@
+"""
+Registry of buildings in shared memory, for recommendation workers running
+as separate processes (e.g. gunicorn workers). The buildings are loaded
+once, by the process creating the registry, into one shared memory block
+per building in the artifact format of `thermo.utils.artifact`. Workers
+attach to the blocks and build their buildings and recommenders on
+zero-copy views of the cost lookup tables, so memory stays flat as the
+number of workers grows. Only the sparse adjacency matrices, whose size is
+proportional to the number of neighboring rooms, are copied by each
+worker.
+
+    # in the parent process
+    registry = BuildingRegistry.create()
+    start_workers(registry.block_names)
+
+    # in each worker
+    registry = BuildingRegistry.attach(block_names)
+    recommender = registry.recommender("demo_school")
+"""
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from thermo.adapter.cache import StateCache
+from thermo.config import get_building_names
+from thermo.recommender import Recommender
+from thermo.utils import io
+from thermo.utils.artifact import (
+    ARTIFACT_FILE,
+    build_artifact,
+    decode_artifact,
+    is_compiled,
+)
+from thermo.utils.building import Building
+
+
+class BuildingRegistry:
+    def __init__(self, blocks: dict[str, SharedMemory], owner: bool = False):
+        """
+        Buildings in shared memory blocks. Create the registry with
+        `create`, and attach to it from other processes with `attach`.
+
+        Args:
+            blocks: shared memory block of each building, by name.
+            owner: whether the registry created the blocks, and removes
+                them on `close`.
+        """
+        self._blocks = blocks
+        self.owner = owner
+
+    @classmethod
+    def create(cls, building_names: Iterable[str] | None = None) -> "BuildingRegistry":
+        """
+        Loads buildings into new shared memory blocks. Buildings with an
+        up-to-date artifact are copied from it, the others are compiled
+        from their config files.
+
+        Args:
+            building_names: names of the buildings. Defaults to all
+                buildings in `config.BUILDING_NAMES`.
+
+        Returns:
+            The registry owning the blocks.
+        """
+        names = get_building_names() if building_names is None else building_names
+        blocks = {}
+        try:
+            for building_name in names:
+                building_path = io.get_building_path(building_name)
+                if is_compiled(building_path):
+                    data = (building_path / ARTIFACT_FILE).read_bytes()
+                else:
+                    data = build_artifact(building_path)
+                block = SharedMemory(create=True, size=len(data))
+                blocks[building_name] = block
+                block.buf[: len(data)] = data  # type: ignore[index]
+        except BaseException:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+            raise
+        return cls(blocks, owner=True)
+
+    @classmethod
+    def attach(cls, block_names: dict[str, str]) -> "BuildingRegistry":
+        """
+        Attaches to the blocks of a registry created by another process.
+
+        Args:
+            block_names: name of the shared memory block of each building,
+                see `block_names`.
+
+        Returns:
+            The registry, which does not own the blocks.
+        """
+        blocks = {}
+        for building_name, block_name in block_names.items():
+            block = SharedMemory(name=block_name)
+            # before Python 3.13, attached blocks are tracked as if the
+            # worker had created them, and removed when the worker exits
+            resource_tracker.unregister(block._name, "shared_memory")  # type: ignore
+            blocks[building_name] = block
+        return cls(blocks)
+
+    @property
+    def block_names(self) -> dict[str, str]:
+        """Name of the shared memory block of each building, for workers to
+        attach to"""
+        return {name: block.name for name, block in self._blocks.items()}
+
+    @property
+    def building_names(self) -> list[str]:
+        return list(self._blocks)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of all the blocks, shared by all the processes"""
+        return sum(block.size for block in self._blocks.values())
+
+    def load(self, building_name: str) -> tuple[Building, dict[str, NDArray]]:
+        """
+        Loads a building from its block (see
+        `thermo.utils.artifact.decode_artifact`).
+
+        Args:
+            building_name: name of the building.
+
+        Returns:
+            The building and the lookup tables of its costs, which are
+                read-only views of the block.
+
+        Raises:
+            KeyError: if the building is not in the registry.
+        """
+        block = self._blocks[building_name]
+        buffer = np.frombuffer(block.buf, dtype=np.uint8)  # type: ignore[arg-type]
+        return decode_artifact(buffer)
+
+    def recommender(
+        self, building_name: str, state_cache: StateCache | None = None
+    ) -> Recommender:
+        """
+        Creates a recommender on the shared arrays of a building.
+
+        Args:
+            building_name: name of the building.
+            state_cache: cache of the booking states, see `Recommender`.
+
+        Returns:
+            The recommender of the building.
+        """
+        building, tables = self.load(building_name)
+        return Recommender.from_building(building, dict(tables), state_cache)
+
+    def close(self) -> None:
+        """
+        Detaches from the blocks, and removes them if the registry owns
+        them. Buildings and recommenders loaded from the registry must be
+        deleted first.
+        """
+        for block in self._blocks.values():
+            block.close()
+            if self.owner:
+                # attached workers may have untracked the block (see
+                # `attach`): track it again so that it is untracked once
+                resource_tracker.register(block._name, "shared_memory")  # type: ignore
+                block.unlink()
+        self._blocks = {}
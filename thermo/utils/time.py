@@ -1,6 +1,18 @@
 from datetime import date, timedelta
+from functools import cache
+from typing import TYPE_CHECKING
 
-from workalendar.europe import Denmark
+if TYPE_CHECKING:
+    from workalendar.europe import Denmark
+
+
+@cache
+def _calendar() -> "Denmark":
+    """Danish calendar, imported on first use since workalendar is slow to
+    import"""
+    from workalendar.europe import Denmark
+
+    return Denmark()
 
 
 def is_schoolday(day: date) -> bool:
@@ -33,7 +45,7 @@ def is_schoolday(day: date) -> bool:
         # Days between Christmas and New Years
         return False
 
-    calendar = Denmark()
+    calendar = _calendar()
 
     if day == (calendar.get_ascension_thursday(day.year) + timedelta(1)):
         # Friday after ascension day